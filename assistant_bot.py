@@ -8,8 +8,9 @@ from prompt_toolkit import prompt
 from prompt_toolkit.completion import WordCompleter
 from rich.console import Console
 from rich.table import Table
-from record import Record, AddressBook, Phone, Name, Email, Address, Birthday, Note
+from record import Record, AddressBook, Phone, Name, Email, Address, Birthday, Note, get_phone_book, get_notebook
 from abc import ABC, abstractmethod
+from persistence import persister
 import questionary
 from termcolor import colored
 
@@ -78,11 +79,10 @@ class Assistant(AssistantBot):
 class ContactAssistant(Assistant, AddressBook):
     def __init__(self):
         super().__init__()
-        self.phone_book = AddressBook()
+        self.phone_book = get_phone_book()
             
     def handler(self):
-        if os.path.isfile(self.phone_book.file):  # запуск файла с сохранеными контактами!!!
-            self.phone_book.read_from_file()
+        self.phone_book.refresh()  # перечитує файл тільки після змін на диску
         commands_text = "How can I help you? Please choose:"
         add_menu = AddAssistant()
         edit_menu = EditAssistant()
@@ -105,17 +105,20 @@ class ContactAssistant(Assistant, AddressBook):
 
             
     # вывод в таблицу rich       
-    def table_print(self, record: Record):
-        table = Table(title="Contact Information", style="cyan", title_style="bold magenta", width = 100)
+    def contact_table(self, title="Contact Information"):
+        table = Table(title=title, style="cyan", title_style="bold magenta", width = 100)
         table.add_column("Name", style="red", justify="center")
         table.add_column("Phones", style="bold blue", justify="center")
         table.add_column("Birthday", style="bold green", justify="center")
         table.add_column("Email", style="bold blue", justify="center")
         table.add_column("Address", style="yellow", justify="center")
         table.add_column("Days to birthday", style="yellow", justify="center")
+        return table
+
+    def contact_row(self, record: Record):
         phone_str = "\n".join(
             "; ".join(p.value for p in record.phones[i:i + 2]) for i in range(0, len(record.phones), 2))
-        table.add_row(
+        return (
             str(record.name.value),
             str(phone_str),
             str(record.birthday),
@@ -123,25 +126,38 @@ class ContactAssistant(Assistant, AddressBook):
             str(record.address),
             str(record.days_to_birthday())
         )
+
+    def table_print(self, record: Record):
+        table = self.contact_table()
+        table.add_row(*self.contact_row(record))
         return table
 
     # отдельная функция по поиску рекорд, чтобы избежать ошибку с несущестующим контактом 
     @input_error
     def find_record(self):
-        if os.path.isfile(self.phone_book.file):  # запуск файла с сохранеными контактами!!!
-            self.phone_book.read_from_file()
+        self.phone_book.refresh()  # перечитує файл тільки після змін на диску
         print('=' * 150)
-        completer = WordCompleter(list(self.phone_book.keys()), ignore_case=True)
+        completer = WordCompleter(self.phone_book.names(), ignore_case=True)
         name = prompt('Enter the name of an existing contact=> ', completer=completer)
-        record: Record = self.phone_book.find(name)
-        if record:
-            return record
+        records = self.phone_book.find_all(name)
+        if len(records) == 1:
+            return records[0]
+        if records:
+            # кілька контактів з таким ім'ям: розрізняємо за номером і телефонами
+            choices = [questionary.Choice(f'#{rec.id} {rec.name.value} {"; ".join(p.value for p in rec.phones)}',
+                                          value=rec) for rec in records]
+            return questionary.select('Which one?', choices=choices + [questionary.Choice('None of these', value=None)]).ask()
+        # точного збігу немає - пропонуємо схожі імена (опечатки, неповне ім'я)
+        similar = self.phone_book.fuzzy_search(name, 5)
+        if similar:
+            choices = [questionary.Choice(f'{rec.name.value} {"; ".join(p.value for p in rec.phones)}', value=rec)
+                       for rec in similar]
+            return questionary.select('Did you mean:', choices=choices + [questionary.Choice('None of these', value=None)]).ask()
     
     # отдельная функция по saving рекорд
     @input_error    
     def save_record(self, record: Record):
-        if os.path.isfile(self.phone_book.file):  # запуск файла с сохранеными контактами!!!
-            self.phone_book.read_from_file()
+        self.phone_book.refresh()  # перечитує файл тільки після змін на диску
         self.phone_book.add_record(record)
         self.phone_book.write_to_file()
         return
@@ -149,101 +165,56 @@ class ContactAssistant(Assistant, AddressBook):
     # поиск по имени и по совпадениям
     @input_error
     def search(self):
-        table = Table(title="Search results", style="cyan", title_style="bold magenta", width = 100)
-        table.add_column("Name", style="red", justify="center")
-        table.add_column("Phones", style="bold blue", justify="center")
-        table.add_column("Birthday", style="bold green", justify="center")
-        table.add_column("Email", style="bold blue", justify="center")
-        table.add_column("Address", style="yellow", justify="center")
-        table.add_column("Days to birthday", style="yellow", justify="center")
         while True:
             print('=' * 150)
             print(f'\033[38;2;10;235;190mEnter at least 3 letters or numbers to search or press ENTER to exit.\033[0m')
             res = input('Enter your text=>  ').lower()
             if res:
-                result = self.phone_book.search(res)
-                
-                if result:
-                    result = result.split('\n')
-                    for item in result:
-                        record = item.split(',')
-                        table.add_row(record[0], record[1], record[2], record[3], record[4], record[5])
-                        self.console.print(table)
-                print(f'\033[38;2;10;235;190mNo matches found.\033[0m')        
+                try:
+                    records = self.phone_book.search(res)
+                except ValueError as e:
+                    print(e)
+                    continue
+                table = self.contact_table("Search results")
+                for record in records:
+                    table.add_row(*self.contact_row(record))
+                if not table.row_count:
+                    table = self.contact_table("Did you mean")
+                    for record in self.phone_book.fuzzy_search(res):
+                        table.add_row(*self.contact_row(record))
+                if table.row_count:
+                    self.console.print(table)
+                else:
+                    print(f'\033[38;2;10;235;190mNo matches found.\033[0m')
             else:
                 break
             
 
     # работа через интератор или показать все контакты
-    def show_all(self):
+    # сторінки беруться з книги по одній, тож перша з'являється одразу навіть на великій книзі
+    def show_all(self, page_size=50):
         while True:
-            table = Table(title="Contact Information", style="cyan", title_style="bold magenta", width = 100)
-            table.add_column("Name", style="red", justify="center")
-            table.add_column("Phones", style="bold blue", justify="center")
-            table.add_column("Birthday", style="bold green", justify="center")
-            table.add_column("Email", style="bold blue", justify="center")
-            table.add_column("Address", style="yellow", justify="center")
-            table.add_column("Days to birthday", style="yellow", justify="center")
             print('=' * 150)
             print(f'\033[38;2;10;235;190mEnter how many records to display or press ENTER to skip.\033[0m')
             item_number = input('Enter number=> ')
-            if item_number.isdigit():
-                if self.phone_book :
-                    # Введено число
-                    item_number = int(item_number)
-                    metka = 0
-                    # phones = 'Contacts:\n'
-                    iteration_count = 0
-                    for name, record in self.phone_book.data.items() :
-                        phone_str = "\n".join(
-                            "; ".join(p.value for p in record.phones[i :i + 2]) for i in range(0, len(record.phones), 2))
-                        table.add_row(str(record.name.value),
-                                      str(phone_str),
-                                      str(record.birthday),
-                                      str(record.email),
-                                      str(record.address),
-                                      str(record.days_to_birthday())
-                                      )
-                        iteration_count += 1
-                        metka = 1
-
-                        if iteration_count % item_number == 0 :
-                            self.console.print(table)
-                            metka = 0
-                            table = Table(title = "Contact Information", style = "cyan", title_style = "bold magenta",
-                                          width = 100)
-                            table.add_column("Name", style = "red", justify = "center")
-                            table.add_column("Phones", style = "bold blue", justify = "center")
-                            table.add_column("Birthday", style = "bold green", justify = "center")
-                            table.add_column("Email", style = "bold blue", justify = "center")
-                            table.add_column("Address", style = "yellow", justify = "center")
-                            table.add_column("Days to birthday", style = "yellow", justify = "center")
-
-                    if metka == 1:
-                        self.console.print(table)
-                    return
-                else:
-                    print(f'\033[91mNo contacts.\033[0m')
-            elif item_number.isalpha() :
+            if item_number.isalpha():
                 # Введены буквы
                 print(f'You entered letters: {item_number}')
-            else :
-                if self.phone_book :
-                    for name, record in self.phone_book.data.items() :
-                        phone_str = "\n".join(
-                            "; ".join(p.value for p in record.phones[i :i + 2]) for i in range(0, len(record.phones), 2))
-                        table.add_row(str(record.name.value),
-                                      str(phone_str),
-                                      str(record.birthday),
-                                      str(record.email),
-                                      str(record.address),
-                                      str(record.days_to_birthday())
-                                      )
-                    self.console.print(table)
-                    return
-                else:
-                    print(f'\033[91mNo contacts.\033[0m')
-                    return
+                continue
+            if item_number.isdigit() and int(item_number) == 0:
+                continue
+            if not self.phone_book:
+                print(f'\033[91mNo contacts.\033[0m')
+                return
+            by_pages = item_number.isdigit()
+            for records in self.phone_book.iter_pages(int(item_number) if by_pages else page_size):
+                table = self.contact_table()
+                for record in records:
+                    table.add_row(*self.contact_row(record))
+                self.console.print(table)
+                if by_pages and input('Press ENTER for the next page or enter q to stop=> ').lower() == 'q':
+                    break
+            return
 
     # выход из програмы и сохранение файла!
     def exit(self):
@@ -279,11 +250,13 @@ class AddAssistant(ContactAssistant):
     def add_contact(self):
         name = input('Enter name=> ')
         record = Record(name)
-        self.add_phone(record)
-        self.add_birthday(record)
-        self.add_email(record)
-        self.add_address(record)
-        self.save_record(record)
+        # один запис на диск за весь контакт замість запису після кожного поля
+        with self.phone_book.transaction():
+            self.add_phone(record)
+            self.add_birthday(record)
+            self.add_email(record)
+            self.add_address(record)
+            self.save_record(record)
         contact = self.table_print(record)
         print(f'\033[92mYou have created a new contact:\033[0m')
         self.console.print(contact)
@@ -406,7 +379,8 @@ class AddAssistant(ContactAssistant):
             if not record:
                 print('\033[91mThe contact was not found.\033[0m')
                 return
-            self.add_phone(record)
+            with self.phone_book.transaction():
+                self.add_phone(record)
             self.console.print(self.table_print(record))
             return
 
@@ -442,8 +416,9 @@ class EditAssistant(ContactAssistant):
             if not record:
                 print('\033[91mThe contact was not found.\033[0m')
                 return
-            AddAssistant.add_address(record)
-            self.save_record(record)
+            with self.phone_book.transaction():
+                AddAssistant.add_address(self, record)
+                self.save_record(record)
             print(f'\033[38;2;10;235;190mYou changed the contact:\n\033[0m')
             self.console.print(self.table_print(record))
             return
@@ -457,8 +432,9 @@ class EditAssistant(ContactAssistant):
                 print('\033[91mThe contact was not found.\033[0m')
                 return
             self.console.print(self.table_print(record))
-            AddAssistant.add_birthday(record)
-            self.save_record(record)
+            with self.phone_book.transaction():
+                AddAssistant.add_birthday(self, record)
+                self.save_record(record)
             print(f'\033[38;2;10;235;190mYou changed the contact:\n\033[0m')
             self.console.print(self.table_print(record))
             return
@@ -471,8 +447,9 @@ class EditAssistant(ContactAssistant):
             if not record:
                 print('\033[91mThe contact was not found.\033[0m')
                 return
-            AddAssistant.add_email(record)
-            self.save_record(record)
+            with self.phone_book.transaction():
+                AddAssistant.add_email(self, record)
+                self.save_record(record)
             print(f'\033[38;2;10;235;190mYou changed the contact:\n\033[0m')
             self.console.print(self.table_print(record))
             return    
@@ -488,8 +465,8 @@ class EditAssistant(ContactAssistant):
             new_name = input('Enter new name=> ')
             if new_name:
                 old_name = record.name.value
-                self.phone_book.data[new_name] = self.phone_book.data.pop(old_name)
-                record.name.value = new_name
+                # номер запису не змінюється, тож досить оновити індекси і зберегти запис
+                record.rename(new_name)
                 self.save_record(record)
                 print(f'\033[38;2;10;235;190mName changed successfully from {old_name} to {new_name}.\n\033[0m')
                 self.console.print(self.table_print(record))
@@ -563,7 +540,7 @@ class DeleteAssistant(ContactAssistant):
             if not record:
                 print('\033[91mThe contact was not found.\033[0m')
                 return
-            record.birthday = None
+            record.remove_birthday()
             self.save_record(record)
             print(f'\033[38;2;10;235;190mThe date of birth was removed.\033[0m')
             self.console.print(self.table_print(record))
@@ -581,7 +558,7 @@ class DeleteAssistant(ContactAssistant):
             print('\033[91mDo you really want to delete this contact? Please enter the number: 1.YES or press ENTER to skip.\033[0m')
             res = input('Enter your text=>  ').lower()
             if res in ('1', 'yes'):
-                self.phone_book.delete(record.name.value)
+                self.phone_book.delete_record(record)
                 print(f'\033[38;2;10;235;190mThe contact {record.name.value} was removed.\033[0m')
                 self.phone_book.write_to_file()
                 return 
@@ -596,7 +573,7 @@ class DeleteAssistant(ContactAssistant):
             if not record:
                 print('\033[91mThe contact was not found.\033[0m')
                 return
-            record.email = None
+            record.remove_email()
             self.save_record(record)
             print(f'\033[38;2;10;235;190mThe email was removed.\033[0m')
             self.console.print(self.table_print(record))
@@ -627,8 +604,7 @@ class BirthAssistant(ContactAssistant):
 
         
     def handler(self):
-        if os.path.isfile(self.phone_book.file):  # запуск файла с сохранеными контактами!!!
-            self.phone_book.read_from_file()
+        self.phone_book.refresh()  # перечитує файл тільки після змін на диску
         exit_menu = ExitAssistant()
         commands_text = "How can I help you? Please choose:"
         commands_menu = {
@@ -647,15 +623,7 @@ class BirthAssistant(ContactAssistant):
     # список имен у кого день рождения на указанною дату
     def birthdays_for_date(self, day):
         date = datetime.strptime(day, '%Y.%m.%d').date()
-        date_today = date.today()             
-        contact_birth = []
-        for n, rec in self.phone_book.data.items():
-            name = n
-            if rec.birthday:
-                birth = rec.birthday.value.replace(year=date_today.year)
-                if birth == date:
-                    contact_birth.append(name)
-            
+        contact_birth = [rec.name.value for rec in self.phone_book.birthdays_on(date)]
         if len(contact_birth) == 0:
             print(f'\033[38;2;10;235;190mNo Birthday this day.\033[0m')
             return None
@@ -684,16 +652,10 @@ class BirthAssistant(ContactAssistant):
     def get_birthdays_per_week(self):
         date_today = date.today()          
         birthday_per_week = []
-        for n, rec in self.phone_book.data.items():
-            if rec.birthday:
-                name = f'{n}: {rec.birthday.value}'
-                birth = rec.birthday.value.replace(year=date_today.year)
-                if birth < date_today - timedelta(days=1):
-                    birth = birth.replace(year=date_today.year+1)
-                day_week = birth.isoweekday()
-                end_date = date_today + timedelta(days=7)
-                if date_today <= birth <= end_date:
-                    birthday_per_week.append([name, birth, day_week])
+        for rec, days in self.phone_book.upcoming_birthdays(date_today, 7):
+            name = f'{rec.name.value}: {rec.birthday.value}'
+            birth = date_today + timedelta(days=days)
+            birthday_per_week.append([name, birth, birth.isoweekday()])
         if len(birthday_per_week) == 0:
             print(f'\033[38;2;10;235;190mNo Birthday this week.\033[0m')
             return None
@@ -734,17 +696,9 @@ class BirthAssistant(ContactAssistant):
 
     # виводити список контактів, у яких день народження через задану кількість днів від поточної дати
     def birthday_in_given_days(self, value):
-        date_today = date.today()
-        date_value = date_today + timedelta(days=value)         
         contact_birth = []
-        for n, rec in self.phone_book.data.items():
-            name = n
-            if rec.birthday:
-                birth = rec.birthday.value.replace(year=date_today.year)
-                if birth < date_today - timedelta(days=1):
-                    birth = birth.replace(year=date_today.year+1)
-                if date_today <=  birth <= date_value:
-                    contact_birth.append(f'{name}; {rec.birthday.value}; {rec.days_to_birthday()}')
+        for rec, days in self.phone_book.upcoming_birthdays(date.today(), value):
+            contact_birth.append(f'{rec.name.value}; {rec.birthday.value}; {days or "Birthday today"}')
 
         if len(contact_birth) == 0:
             print(f'\033[38;2;10;235;190mNo Birthday during this period.\033[0m')
@@ -765,7 +719,7 @@ class BirthAssistant(ContactAssistant):
             print(f'\033[38;2;10;235;190mEnter the required number of days (no more than one year) or press ENTER to skip.\033[0m')
             item_number = input('\033[38;2;10;235;190mEnter the number=> \033[0m')
             if item_number:
-                if item_number.isdigit() and item_number > '365':
+                if item_number.isdigit() and int(item_number) <= 365:
                     # Введено число
                     item_number = int(item_number)
                     days_birth = self.birthday_in_given_days(item_number)
@@ -790,13 +744,10 @@ class NotesAssistant(Assistant):
     def __init__(self):
         super().__init__()
         self.colors = 'cyan'
-        self.notes = []
-        self.file = 'Save_Notes.bin'
-        self.read_from_file()
+        self.notes = get_notebook()  # файл читається при першому відкритті меню
         
     def handler(self):
-        if os.path.isfile(self.file):  # запуск файла с сохранеными контактами!!!
-            self.read_from_file()
+        self.read_from_file()
         exit_menu = ExitAssistant()
         commands_text = "How can I assist you? Please select an option:"
         commands_menu = {
@@ -804,6 +755,7 @@ class NotesAssistant(Assistant):
             'EDIT NOTE': [self.note_charge_menu, "blue"],
             'DELETE NOTE': [self.note_delete_menu, "red"],
             'SEARCH NOTE': [self.note_search_menu, "blue"],
+            'FULL TEXT SEARCH': [self.note_text_search_menu, "blue"],
             'SHOW ALL NOTE': [self.note_show_menu, "blue"],
             'RETURN TO MAIN MENU': [Assistant, ""],
             'EXIT': [exit_menu.handler, ""],
@@ -826,10 +778,7 @@ class NotesAssistant(Assistant):
         return table
 
     def add_note(self, content, tags=None):
-        if tags is None:
-            tags = []
-        note = Note(content, tags)
-        self.notes.append(note)
+        return self.notes.add_note(content, tags)
         
     def note_add_menu(self):
         content = input('Enter your text for the note: ')
@@ -838,39 +787,34 @@ class NotesAssistant(Assistant):
         self.write_to_file()
 
     def search_notes_by_tag(self, tag):
-        return [note for note in self.notes if tag in note.tags]
+        return self.notes.search_notes_by_tag(tag)
             
     def display_all_notes(self):
         table = Table(title="Note Information", style="cyan", title_style="bold magenta", width = 100)
+        table.add_column("ID", style="bold green", justify="center")
         table.add_column("Content", style="bold blue", justify="center")
         table.add_column("Tags", style="bold blue", justify="center")
         if not self.notes:
             print('\033[91mList empty.\033[0m')
         else:
-            for i, note in enumerate(self.notes, 1):
-                table.add_row(str(note.content), str(note.tags))
+            for note in self.notes:
+                table.add_row(str(note.id), str(note.content), str(note.tags))
             self.console.print(table)
 
     def edit_note_content(self, tag, new_content):
-        for note in self.notes:
-            if tag not in note.tags:
-                print('\033[91mInvalid note index.\033[0m')
-            if tag in note.tags:
-                note.content = new_content
-                print(f'\033[92mNote update successfully.\033[0m')
+        if self.notes.edit_note_content(tag, new_content):
+            print(f'\033[92mNote update successfully.\033[0m')
+        else:
+            print('\033[91mInvalid note index.\033[0m')
 
     def search_and_sort_notes(self, keyword):
-        found_notes = [note for note in self.notes if keyword in note.tags]
-        sorted_notes = sorted(found_notes, key=lambda x: x.tags)
-        return sorted_notes
+        return self.notes.search_and_sort_notes(keyword)
 
     def delete_note_by_index(self, tag):
-        initial_len = len(self.notes)
-        self.notes = [note for note in self.notes if tag not in note.tags]
-        if len(self.notes) == initial_len:
-            print(f'\033[91mNo note found with tag "{tag}".\033[0m')
-        else:
+        if self.notes.delete_notes_by_tag(tag):
             print(f'\033[92mNote with tag "{tag}" deleted successfully.\033[0m')
+        else:
+            print(f'\033[91mNo note found with tag "{tag}".\033[0m')
 
     def note_charge_menu(self):
         index = input('Enter tag of the note to edit: ')
@@ -885,6 +829,7 @@ class NotesAssistant(Assistant):
 
     def note_search_menu(self):
         table = Table(title="Note Information", style="cyan", title_style="bold magenta", width = 100)
+        table.add_column("ID", style="bold green", justify="center")
         table.add_column("Content", style="bold blue", justify="center")
         table.add_column("Tags", style="bold blue", justify="center")
         tag_to_search = input('Enter tag for search and sort: ')
@@ -892,25 +837,34 @@ class NotesAssistant(Assistant):
         if sorted_notes:
             print(f'\033[92mFound and Sorted Notes with Tag "{tag_to_search}":\033[0m')
             for note in sorted_notes:
-                table.add_row(str(note.content), str(note.tags))
+                table.add_row(str(note.id), str(note.content), str(note.tags))
             self.console.print(table)
         else:
             print('\033[91mNothing to sort!\033[0m')
 
+    # слова, "фраза в лапках" або початок слова з зірочкою; найрелевантніші першими
+    def note_text_search_menu(self):
+        table = Table(title="Note Information", style="cyan", title_style="bold magenta", width = 100)
+        table.add_column("ID", style="bold green", justify="center")
+        table.add_column("Content", style="bold blue", justify="center")
+        table.add_column("Tags", style="bold blue", justify="center")
+        query = input('Enter words to search for (use "quotes" for a phrase, word* for a prefix): ')
+        found = self.notes.search_text(query)
+        if found:
+            for note in found:
+                table.add_row(str(note.id), str(note.content), str(note.tags))
+            self.console.print(table)
+        else:
+            print('\033[91mNo notes found.\033[0m')
+
     def note_show_menu(self):
         self.display_all_notes()
         
     def write_to_file(self):
-        with open(self.file, 'wb') as file:
-            pickle.dump(self.notes, file)
+        self.notes.write_to_file()
 
     def read_from_file(self):
-        try:
-            with open(self.file, 'rb') as file:
-                self.notes = pickle.load(file)
-            return self.notes
-        except FileNotFoundError:
-            pass
+        return self.notes.read_from_file()
 
     def exit(self):
         self.write_to_file()
@@ -924,8 +878,9 @@ class ExitAssistant(Assistant):
         # self.colors = 'cyan'
           
     def handler(self):
-        ContactAssistant.exit
-        NotesAssistant.exit
+        # дочекатися фонового запису книги і нотаток, щоб нічого не втратити
+        get_phone_book().write_to_file()
+        persister.flush()
         print(colored('Good bye!', self.colors))
         exit()
 
@@ -0,0 +1,49 @@
+# порівняння: цикл по записах (як було в BirthAssistant) проти BirthdayColumns
+# запуск: python benchmarks/bench_birthdays.py [10000 100000 1000000]
+import sys
+import time
+from datetime import date, timedelta
+
+from synthetic import make_book
+from birthday_columns import BirthdayColumns
+from record import birthday_in_year
+
+
+def per_record(book, today, days):
+    end = today + timedelta(days=days)
+    result = []
+    for rec in book.data.values():
+        if rec.birthday:
+            # 29 лютого в невисокосний рік - 28 лютого, як у Record.days_to_birthday
+            birth = birthday_in_year(rec.birthday.value, today.year)
+            if birth < today - timedelta(days=1):
+                birth = birthday_in_year(rec.birthday.value, today.year + 1)
+            if today <= birth <= end:
+                result.append((rec, rec.days_to_birthday()))
+    return result
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(sizes):
+    today = date.today()
+    print(f'{"contacts":>10} {"per-record, s":>15} {"build, s":>10} {"columns, s":>12} {"speedup":>8}')
+    for n in sizes:
+        book = make_book(n)
+        slow = measure(lambda: per_record(book, today, 365))
+        build = measure(lambda: BirthdayColumns(book.data.values()), repeat=1)
+        columns = BirthdayColumns(book.data.values())
+        fast = measure(lambda: (setattr(columns, '_today', None), columns.upcoming(today, 365)))
+        print(f'{n:>10} {slow:>15.4f} {build:>10.4f} {fast:>12.4f} {slow / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10 ** 4, 10 ** 5, 10 ** 6])
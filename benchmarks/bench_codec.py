@@ -0,0 +1,60 @@
+# знімки книги і нотаток: pickle проти стовпцевого формату codec - час запису, читання і розмір
+# запуск: python benchmarks/bench_codec.py [10000 100000 1000000]
+# читання обох форматів іде через record._load_book / _load_notes, тобто з вимкненим збирачем сміття
+import gc
+import pickle
+import sys
+import time
+
+from synthetic import make_records, make_notes
+from codec import BookColumns
+from record import Note, _dump_book, _load_book, _dump_notes, _load_notes
+
+REPEAT = 3
+
+
+# найкращий з REPEAT запусків, секунди
+def best(call, *args):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = call(*args)
+        times.append(time.perf_counter() - start)
+        del result
+        gc.collect()
+    return min(times)
+
+
+def compare(kind, n, data, dump, load):
+    old, new = pickle.dumps(data), dump(data)
+    rows = [('pickle', best(pickle.dumps, data), best(load, old), len(old)),
+            ('codec', best(dump, data), best(load, new), len(new))]
+    for name, dumped, loaded, size in rows:
+        print(f'{kind:>6} {n:>9} {name:>7} {dumped:>8.3f} {loaded:>8.3f} {size / 2 ** 20:>9.1f}')
+    (_, old_dump, old_load, old_size), (_, new_dump, new_load, new_size) = rows
+    print(f'{kind:>6} {n:>9} {"speedup":>7} {old_dump / new_dump:>7.1f}x {old_load / new_load:>7.1f}x '
+          f'{old_size / new_size:>8.1f}x')
+
+
+# запис книги - це і прохід по записах за стовпцями, як у AddressBook._compact
+def dump_book(data):
+    return _dump_book(BookColumns.of(data.values()))
+
+
+def main(sizes):
+    print(f'{"kind":>6} {"size":>9} {"format":>7} {"dump, s":>8} {"load, s":>8} {"size, MB":>9}')
+    for n in sizes:
+        data = {}
+        for key, record in enumerate(make_records(n), 1):
+            record.id = key
+            data[key] = record
+        compare('book', n, data, dump_book, _load_book)
+        del data
+        notes = [Note(content, tags, key) for key, (content, tags) in enumerate(make_notes(n), 1)]
+        compare('notes', n, notes, _dump_notes, _load_notes)
+        del notes
+        gc.collect()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10 ** 4, 10 ** 5, 10 ** 6])
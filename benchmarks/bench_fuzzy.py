@@ -0,0 +1,71 @@
+# затримка пошуку з помилками; бюджет - 10 мс на запит
+# запуск: python benchmarks/bench_fuzzy.py [10000 100000 1000000] [--book]
+# без --book міряється сам FuzzyIndex над іменами (повна книга з усіма індексами на
+# мільйон контактів займає кілька гігабайтів), з --book - AddressBook.fuzzy_search
+import random
+import statistics
+import sys
+import time
+
+from synthetic import make_book, make_names
+from fuzzy import FuzzyIndex, words
+
+BUDGET_MS = 10
+
+
+# запит, як його набирає людина: ім'я, прізвище або обидва з наявного контакту, початок
+# слова, одна-дві помилки
+def typo_query(rnd, name):
+    query = []
+    for word in rnd.sample(words(name), rnd.randint(1, 2)):
+        word = list(word[:rnd.randint(min(4, len(word)), len(word))])
+        for _ in range(rnd.randint(0, 2)):
+            i = rnd.randrange(len(word))
+            kind = rnd.random()
+            if kind < 0.3 and len(word) > 3:
+                del word[i]
+            elif kind < 0.6 and i + 1 < len(word):
+                word[i], word[i + 1] = word[i + 1], word[i]
+            else:
+                word[i] = rnd.choice('abcdefghijklmnopqrstuvwxyz')
+        query.append(''.join(word))
+    return ' '.join(query)
+
+
+# функція пошуку, імена контактів і кількість різних слів в індексі
+def build(n, full_book):
+    if full_book:
+        book = make_book(n)
+        search = book.fuzzy_search
+        search('warm up', 1)
+        return search, [record.name.value for record in book.data.values()], len(book._fuzzy_index.postings)
+    names = make_names(n)
+    index = FuzzyIndex(lambda name: [name])
+    index.add_all(enumerate(names))
+    return index.search, names, len(index.postings)
+
+
+def main(sizes, full_book):
+    print(f'{"contacts":>10} {"words":>8} {"build, s":>9} {"p50, ms":>8} {"p99, ms":>8} {"max, ms":>8} {"found":>6}')
+    failed = False
+    for n in sizes:
+        start = time.perf_counter()
+        search, names, distinct = build(n, full_book)
+        elapsed = time.perf_counter() - start
+        rnd = random.Random(0)
+        queries = [typo_query(rnd, rnd.choice(names)) for _ in range(500)]
+        latencies, found = [], 0
+        for query in queries:
+            start = time.perf_counter()
+            found += bool(search(query, 10))
+            latencies.append((time.perf_counter() - start) * 1000)
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        failed = failed or p99 > BUDGET_MS
+        print(f'{n:>10} {distinct:>8} {elapsed:>9.1f} {statistics.median(latencies):>8.2f} {p99:>8.2f} '
+              f'{max(latencies):>8.2f} {found / len(queries):>6.0%}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--book']
+    sys.exit(main([int(arg) for arg in args] or [10000, 100000, 1000000], '--book' in sys.argv))
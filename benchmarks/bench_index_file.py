@@ -0,0 +1,90 @@
+# холодний старт з файлом індексів (Phone_Book.idx) і без нього: час читання книги
+# і перших запитів одразу після нього
+# запуск: python benchmarks/bench_index_file.py [10000 100000 1000000]
+# без файлу індексів книга перебудовує всі індекси в пам'яті; на мільйоні контактів
+# це не вміщується в пам'ять, тому перебудова міряється тільки до 100000
+import gc
+import os
+import sys
+import tempfile
+import time
+import zlib
+from datetime import date
+
+from synthetic import make_records
+from codec import BookColumns
+from record import AddressBook, _dump_book
+from index_file import write_index
+from persistence import persister
+
+REBUILD_LIMIT = 100000
+
+
+def timed(call):
+    start = time.perf_counter()
+    result = call()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def first_queries(book, sample):
+    phone = sample.phones[0].value
+    queries = {
+        'find': lambda: book.find(sample.name.value),
+        'phone': lambda: book.find_by_phone(phone),
+        'search': lambda: list(book.search(phone[2:8])),
+        'page': lambda: book.page(50, after=f'{sample.id}:{sample.name.value}'),
+        'birthdays': lambda: book.birthdays_on(date(2024, 3, 5)),
+    }
+    return {name: timed(query)[1] for name, query in queries.items()}
+
+
+def load(path):
+    book = AddressBook()
+    book.file = path
+    _, elapsed = timed(book.read_from_file)
+    return book, elapsed
+
+
+def main(sizes):
+    print(f'{"contacts":>10} {"mode":>8} {"write, s":>9} {"load, s":>8}  first queries, ms')
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'Phone_Book.bin')
+            data = {record.id: record for record in make_records_with_ids(n)}
+            columns = BookColumns.of(data.values())
+            snapshot = _dump_book(columns)
+            with open(path, 'wb') as file:
+                file.write(snapshot)
+            sample = data[n // 2]
+            if n <= REBUILD_LIMIT:
+                book, elapsed = load(path)
+                latencies = first_queries(book, book.data[sample.id])
+                print(f'{n:>10} {"rebuild":>8} {"-":>9} {elapsed / 1000:>8.2f}  {format_latencies(latencies)}')
+                # без файлу індексів книга ще й стискає знімок у фоні, щоб записати його
+                persister.flush()
+                # у книги є цикли посилань (запис <-> книга), без збирача сміття вона лишилась би в пам'яті
+                del book
+                gc.collect()
+            _, written = timed(lambda: write_index(os.path.splitext(path)[0] + '.idx', columns, zlib.crc32(snapshot),
+                                                   len(snapshot)))
+            del data, columns, snapshot
+            gc.collect()
+            book, elapsed = load(path)
+            latencies = first_queries(book, book.data[sample.id])
+            print(f'{n:>10} {"mmap":>8} {written / 1000:>9.2f} {elapsed / 1000:>8.2f}  {format_latencies(latencies)}'
+                  f'  (max {max(latencies.values()):.2f})')
+            book._close_index_file()
+
+
+def make_records_with_ids(n):
+    for key, record in enumerate(make_records(n), 1):
+        record.id = key
+        yield record
+
+
+def format_latencies(latencies):
+    return ' '.join(f'{name}={value:.2f}' for name, value in latencies.items())
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
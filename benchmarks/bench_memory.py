@@ -0,0 +1,109 @@
+# скільки байтів займає один контакт: розкладка до __slots__ (об'єкти з __dict__)
+# проти поточних Record/Field, і скільки на контакт додає кожен індекс книги
+# запуск: python benchmarks/bench_memory.py [100000]
+import random
+import sys
+import tracemalloc
+from datetime import date
+
+import synthetic
+from record import AddressBook, Record, Name, Phone, Birthday, Email, Address
+
+
+# так Record і Field виглядали до __slots__: __dict__ і по два name-mangled атрибути
+class LegacyField:
+    def __init__(self, value):
+        self._Field__value = None
+        self._Typed__value = value
+
+
+class LegacyName:
+    def __init__(self, value):
+        self._Field__value = value
+
+
+class LegacyRecord:
+    def __init__(self, name):
+        self.name = LegacyName(name)
+        self.phones = []
+        self.birthday = None
+        self.email = None
+        self.address = None
+
+
+def legacy_contact(name, phones, birthday, email, address):
+    record = LegacyRecord(name)
+    record.phones = [LegacyField(phone) for phone in phones]
+    record.birthday = LegacyField(birthday)
+    record.email = LegacyField(email)
+    record.address = LegacyField(address)
+    return record
+
+
+def slotted_contact(name, phones, birthday, email, address):
+    record = Record(name)
+    for phone in phones:
+        record.phones.append(Phone(phone))
+    record.birthday = Birthday.__new__(Birthday)
+    record.birthday._value = birthday
+    record.email = Email(email)
+    record.address = Address(address)
+    return record
+
+
+def make_rows(n, seed=0):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        name = f'{rnd.choice(synthetic.FIRST_NAMES)} {rnd.choice(synthetic.LAST_NAMES)} {i}'
+        phones = [''.join(rnd.choice('0123456789') for _ in range(10)) for _ in range(rnd.randint(1, 3))]
+        birthday = date(rnd.randint(1950, 2010), rnd.randint(1, 12), rnd.randint(1, 28))
+        rows.append((name, phones, birthday, f'user{i}@example.com', f'Kyiv, street {i}'))
+    return rows
+
+
+def bytes_per_contact(build, rows):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    contacts = [build(*row) for row in rows]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(contacts)
+
+
+# індекси будуються так само, як AddressBook._rebuild_indexes, але кожен окремо
+def index_bytes_per_contact(n):
+    book = AddressBook()
+    for key, record in enumerate(synthetic.make_records(n), 1):
+        record.id = key
+        book.data[key] = record
+    book._new_indexes()
+    sizes = {}
+    tracemalloc.start()
+    for index in book._indexes:
+        before = tracemalloc.get_traced_memory()[0]
+        if hasattr(index, 'add_all'):
+            index.add_all(book.data.items())
+        else:
+            for key, record in book.data.items():
+                index.add(key, record)
+        sizes[type(index).__name__] = sizes.get(type(index).__name__, 0) + tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {name: size / n for name, size in sizes.items()}
+
+
+def main(n):
+    rows = make_rows(n)
+    legacy = bytes_per_contact(legacy_contact, rows)
+    slotted = bytes_per_contact(slotted_contact, rows)
+    print(f'contacts: {n}')
+    print(f'__dict__ layout: {legacy:8.1f} bytes per contact')
+    print(f'__slots__ layout: {slotted:7.1f} bytes per contact ({1 - slotted / legacy:.0%} less)')
+    indexes = index_bytes_per_contact(n)
+    for name, size in indexes.items():
+        print(f'{name:>16}: {size:7.1f} bytes per contact')
+    print(f'{"all indexes":>16}: {sum(indexes.values()):7.1f} bytes per contact')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,44 @@
+# затримка Notebook.search_text (BM25) на різних запитах
+# запуск: python benchmarks/bench_notes.py [10000 50000]
+import random
+import statistics
+import sys
+import time
+
+from synthetic import make_notebook, make_vocabulary, TAGS
+
+
+def make_queries(rnd, count=300):
+    vocabulary = make_vocabulary()
+    common, rare = vocabulary[:50], vocabulary[1000:]
+    kinds = {
+        'rare word': lambda: rnd.choice(rare),
+        'two words': lambda: f'{rnd.choice(rare)} {rnd.choice(vocabulary)}',
+        'common word': lambda: rnd.choice(common),
+        'prefix': lambda: rnd.choice(rare)[:4] + '*',
+        'phrase': lambda: f'"{rnd.choice(vocabulary)} {rnd.choice(vocabulary)}"',
+        'tag': lambda: rnd.choice(TAGS),
+    }
+    return {kind: [make() for _ in range(count)] for kind, make in kinds.items()}
+
+
+def main(sizes):
+    queries = make_queries(random.Random(0))
+    print(f'{"notes":>8} {"query":>12} {"p50, ms":>8} {"p99, ms":>8}')
+    for n in sizes:
+        notebook = make_notebook(n)
+        start = time.perf_counter()
+        notebook.search_text('warmup')
+        print(f'{n:>8} {"index build":>12} {(time.perf_counter() - start) * 1000:>8.0f}')
+        for kind, items in queries.items():
+            latencies = []
+            for query in items:
+                start = time.perf_counter()
+                notebook.search_text(query, 10)
+                latencies.append((time.perf_counter() - start) * 1000)
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            print(f'{n:>8} {kind:>12} {statistics.median(latencies):>8.3f} {p99:>8.3f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 50000])
@@ -0,0 +1,54 @@
+# час імпорту модулів за даними python -X importtime; перевищення бюджету - код виходу 1
+# запуск: python benchmarks/bench_startup.py [--repeat 5]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# бюджет у мілісекундах на сукупний час імпорту модуля
+BUDGET_MS = {
+    'record': 80,
+    'cli': 150,
+    'main': 20,
+}
+# модель і неінтерактивний режим не повинні тягнути бібліотеки інтерфейсу
+UI_MODULES = ('rich', 'prompt_toolkit', 'questionary', 'termcolor', 'assistant_bot')
+
+
+def import_time(module):
+    # importtime пише в stderr рядки "import time: self | cumulative | name"
+    code = f'import sys, {module}; print(",".join(m for m in {UI_MODULES!r} if m in sys.modules))'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module and not parts[2].startswith('  '):
+            cumulative = int(parts[1])
+    return cumulative / 1000, [name for name in result.stdout.strip().split(',') if name]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    print(f'{"module":>8} {"median, ms":>11} {"budget, ms":>11}  UI modules loaded')
+    for module, budget in BUDGET_MS.items():
+        times, loaded = [], []
+        for _ in range(args.repeat):
+            elapsed, loaded = import_time(module)
+            times.append(elapsed)
+        median = statistics.median(times)
+        over = median > budget or loaded
+        failed = failed or over
+        print(f'{module:>8} {median:>11.1f} {budget:>11}  {", ".join(loaded) or "-"}{"  OVER" if over else ""}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# навантаження на server.py: кілька keep-alive з'єднань шлють змішані GET-запити
+# до синтетичної книги, наприкінці - запитів за секунду і p99 затримки
+# запуск: python benchmarks/load_test.py [--contacts 100000] [--connections 16] [--seconds 10]
+import argparse
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import quote
+
+from synthetic import make_book, FIRST_NAMES, LAST_NAMES
+from record import Notebook
+from server import AssistantServer
+
+
+def start_server(server, port):
+    # сервер у своєму потоці зі своїм циклом подій, щоб клієнти не ділили з ним цикл
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    async def run():
+        listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', port)
+        ready.set()
+        async with listener:
+            await listener.serve_forever()
+
+    threading.Thread(target=loop.run_until_complete, args=(run(),), daemon=True).start()
+    ready.wait()
+
+
+def make_targets(book, rnd, count=1000):
+    names = book.names()
+    targets = []
+    for _ in range(count):
+        kind = rnd.random()
+        if kind < 0.4:
+            query = rnd.choice(FIRST_NAMES + LAST_NAMES)[:rnd.randint(3, 6)].lower()
+            targets.append(f'/contacts?q={quote(query)}&limit=20')
+        elif kind < 0.7:
+            targets.append(f'/contacts/{quote(rnd.choice(names))}')
+        elif kind < 0.85:
+            targets.append(f'/contacts?page_size=50&after={quote(rnd.choice(names))}')
+        else:
+            targets.append(f'/birthdays/days?n={rnd.randint(1, 7)}')
+    return targets
+
+
+async def client(port, targets, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            target = targets[i % len(targets)]
+            i += 1
+            start = time.perf_counter()
+            writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.decode('latin-1').split('\r\n')[1:]:
+                if line.lower().startswith('content-length:'):
+                    length = int(line.split(':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not head.startswith(b'HTTP/1.1 2'):
+                errors.append(target)
+    finally:
+        writer.close()
+
+
+async def run(port, targets, connections, seconds):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    rnd = random.Random(1)
+    await asyncio.gather(*(client(port, rnd.sample(targets, len(targets)), deadline, latencies, errors)
+                           for _ in range(connections)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--contacts', type=int, default=100000)
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    book = make_book(args.contacts)
+    start_server(AssistantServer(book=book, notebook=Notebook(), workers=args.workers), args.port)
+    targets = make_targets(book, random.Random(0))
+    latencies, errors, elapsed = asyncio.run(run(args.port, targets, args.connections, args.seconds))
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'contacts: {args.contacts}, connections: {args.connections}, requests: {len(latencies)}, '
+          f'errors: {len(errors)}')
+    print(f'{len(latencies) / elapsed:.0f} req/s, p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# набір бенчмарків книги і нотаток на синтетичних даних для порівняння між комітами:
+#   python benchmarks/suite.py [1000 10000 100000 1000000] [--output results.json]
+#   python benchmarks/suite.py 1000 10000 --compare results.json   # код виходу 1, якщо щось повільніше
+# на кожному розмірі: add_record, find, search, delete, write_to_file / read_from_file,
+# три запити BirthAssistant і операції з тегами нотаток. Книга на мільйон контактів з усіма
+# індексами займає кілька гігабайтів пам'яті
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from synthetic import make_records, make_notes, FIRST_NAMES, LAST_NAMES, TAGS
+import record
+from record import AddressBook, Notebook
+from persistence import persister
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# скільки разів повторюється кожна швидка операція на кожному розмірі
+SAMPLES = 1000
+
+
+class Results:
+    def __init__(self):
+        self.rows = []
+
+    # latencies - секунди на кожен виклик
+    def add(self, scenario, size, latencies):
+        latencies = sorted(latencies)
+        row = {
+            'scenario': scenario,
+            'size': size,
+            'calls': len(latencies),
+            'median_ms': round(statistics.median(latencies) * 1000, 4),
+            'p95_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 4),
+            'total_s': round(sum(latencies), 4),
+        }
+        self.rows.append(row)
+        print(f'{scenario:>32} {size:>9} {row["calls"]:>6} {row["median_ms"]:>11.3f} {row["p95_ms"]:>10.3f}',
+              flush=True)
+
+
+def timed(calls):
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_book(n, results, directory):
+    rnd = random.Random(n)
+    records = list(make_records(n))
+    book = AddressBook()
+    book.file = os.path.join(directory, 'Phone_Book.bin')
+    results.add('book.add_record', n, timed(lambda record=record: book.add_record(record) for record in records))
+
+    names = [rnd.choice(records).name.value for _ in range(SAMPLES)]
+    results.add('book.find', n, timed(lambda name=name: book.find(name) for name in names))
+    queries = [rnd.choice(FIRST_NAMES + LAST_NAMES)[:rnd.randint(3, 6)] for _ in range(SAMPLES // 2)]
+    queries += [rnd.choice(rnd.choice(records).phones).value[:rnd.randint(3, 6)] for _ in range(SAMPLES // 2)]
+    results.add('book.search', n, timed(lambda query=query: list(book.search(query)) for query in queries))
+
+    # новий знімок на диску, потім дописування змін у журнал і читання всього з диска;
+    # записи, додані при побудові книги, спершу йдуть у журнал, щоб не потрапити в заміри нижче
+    book.write_to_file()
+    persister.flush()
+    results.add('book.compact', n, timed([lambda: book.compact(wait=True)]))
+    extra = list(make_records(min(SAMPLES, n), seed=1))
+    for item in extra:
+        item.name.value += ' new'
+    results.add('book.add_record (existing book)', n,
+                timed(lambda item=item: book.add_record(item) for item in extra))
+    results.add('book.write_to_file', n, timed([lambda: (book.write_to_file(), persister.flush())]))
+    results.add('book.delete', n, timed(lambda item=item: book.delete(item.name.value) for item in extra))
+    book.write_to_file()
+    persister.flush()
+    fresh = AddressBook()
+    fresh.file = book.file
+    # журнал не порожній, тож файл індексів застарів: повна перебудова і стискання у фоні
+    results.add('book.read_from_file', n, timed([fresh.read_from_file]))
+    persister.flush()
+    fresh = AddressBook()
+    fresh.file = book.file
+    results.add('book.read_from_file (compacted)', n, timed([fresh.read_from_file]))
+    del fresh
+
+    bench_birthdays(book, n, results)
+    # записи посилаються на книгу, а книга на записи: без збирача сміття пам'ять не звільниться
+    del book, records
+    gc.collect()
+
+
+# три запити меню днів народження; 28.02.2023 - невисокосний рік, тож туди потрапляють і 29 лютого
+def bench_birthdays(book, n, results):
+    from assistant_bot import BirthAssistant
+    record._phone_book = book
+    assistant = BirthAssistant()
+    repeat = 20
+    results.add('birthdays.birthdays_for_date', n,
+                timed([lambda: assistant.birthdays_for_date('2023.02.28')] * repeat))
+    results.add('birthdays.get_birthdays_per_week', n, timed([assistant.get_birthdays_per_week] * repeat))
+    results.add('birthdays.birthday_in_given_days', n,
+                timed([lambda: assistant.birthday_in_given_days(30)] * repeat))
+    record._phone_book = None
+
+
+def bench_notes(n, results):
+    notes = list(make_notes(n, words_per_note=(3, 20)))
+    notebook = Notebook()
+    results.add('notes.add_note', n, timed(lambda item=item: notebook.add_note(*item) for item in notes))
+    results.add('notes.search_notes_by_tag', n,
+                timed(lambda tag=tag: notebook.search_notes_by_tag(tag) for tag in TAGS))
+    results.add('notes.search_and_sort_notes', n,
+                timed(lambda tag=tag: notebook.search_and_sort_notes(tag) for tag in TAGS))
+    # найрідкісніші теги в кінці списку: зміна і видалення торкаються сотень, а не половини нотаток
+    results.add('notes.edit_note_content', n,
+                timed(lambda tag=tag: notebook.edit_note_content(tag, 'edited') for tag in TAGS[-3:]))
+    results.add('notes.delete_notes_by_tag', n,
+                timed(lambda tag=tag: notebook.delete_notes_by_tag(tag) for tag in TAGS[-3:]))
+    del notebook, notes
+    gc.collect()
+
+
+def commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+# порівняння з попереднім запуском: медіана повільніша більш ніж на threshold - регресія;
+# різниця менша за min_ms - шум таймера на мікросекундних операціях
+def compare(rows, baseline, threshold, min_ms):
+    old = {(row['scenario'], row['size']): row for row in baseline['results']}
+    print(f'\ncompared with {baseline["meta"].get("commit")}:')
+    print(f'{"scenario":>32} {"size":>9} {"old, ms":>10} {"new, ms":>10} {"ratio":>7}')
+    regressions = 0
+    for row in rows:
+        before = old.get((row['scenario'], row['size']))
+        if before is None or not before['median_ms']:
+            continue
+        ratio = row['median_ms'] / before['median_ms']
+        slower = ratio > 1 + threshold and row['median_ms'] - before['median_ms'] > min_ms
+        regressions += slower
+        print(f'{row["scenario"]:>32} {row["size"]:>9} {before["median_ms"]:>10.3f} {row["median_ms"]:>10.3f} '
+              f'{ratio:>6.2f}x{"  SLOWER" if slower else ""}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sizes', type=int, nargs='*', default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='results JSON of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--min-ms', type=float, default=0.05)
+    parser.add_argument('--only', choices=['book', 'notes'])
+    args = parser.parse_args()
+
+    results = Results()
+    print(f'{"scenario":>32} {"size":>9} {"calls":>6} {"median, ms":>11} {"p95, ms":>10}')
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.sizes:
+            if args.only in (None, 'book'):
+                bench_book(n, results, directory)
+            if args.only in (None, 'notes'):
+                bench_notes(n, results)
+    report = {
+        'meta': {
+            'commit': commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'argv': sys.argv[1:],
+        },
+        'results': results.rows,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'\nresults: {args.output}')
+    if args.compare:
+        with open(args.compare) as file:
+            return 1 if compare(results.rows, json.load(file), args.threshold, args.min_ms) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
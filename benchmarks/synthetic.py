@@ -0,0 +1,145 @@
+import os
+import random
+import sys
+from datetime import date
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from record import AddressBook, Record, Notebook
+
+
+FIRST_NAMES = ['Anna', 'Bohdan', 'Olena', 'Taras', 'Iryna', 'Dmytro', 'Maria', 'Pavel', 'Stiv', 'Masha']
+LAST_NAMES = ['Shevchenko', 'Kovalenko', 'Bondarenko', 'Tkachenko', 'Kravets', 'Melnyk', 'Boyko', 'Moroz']
+DOMAINS = ['gmail.com', 'ukr.net', 'i.ua', 'example.com']
+CITIES = ['Kyiv', 'Lviv', 'Odesa', 'Kharkiv', 'Dnipro']
+STREETS = ['Khreshchatyk', 'Shevchenka', 'Franka', 'Sadova', 'Zelena', 'Lesi Ukrainky']
+
+# прізвища складаються зі складів і закінчення: на мільйоні контактів виходять сотні тисяч
+# різних слів, як у справжній книзі, а не 18 слів на всіх; кожне п'яте прізвище - з
+# LAST_NAMES, тож пошук за поширеними прізвищами має що знаходити
+NAME_SYLLABLES = ['ko', 'va', 'len', 'shev', 'bon', 'dar', 'tka', 'mel', 'boy', 'mo', 'roz', 'kra', 'pe', 'tro',
+                  'sy', 'dor', 'hry', 'lo', 'ban', 'za', 'ru', 'ba', 'li', 'sen', 'ha', 'ne', 'vol', 'yar', 'stu', 'ost']
+SURNAME_ENDINGS = ['enko', 'chuk', 'yak', 'skyi', 'uk', 'ets', 'ych', 'iv', 'ko', 'ian']
+FIRST_NAME_ENDINGS = ['a', 'o', 'an', 'ii', 'ina', 'slav', 'ana', 'ir']
+
+
+def make_surname(rnd):
+    if rnd.random() < 0.2:
+        return rnd.choice(LAST_NAMES)
+    syllables = ''.join(rnd.choice(NAME_SYLLABLES) for _ in range(rnd.randint(1, 3)))
+    return (syllables + rnd.choice(SURNAME_ENDINGS)).capitalize()
+
+
+# кілька тисяч імен, частоти спадають за Ціпфом: FIRST_NAMES - найпоширеніші
+def make_first_names(size=3000, seed=0):
+    rnd = random.Random(seed)
+    names = list(FIRST_NAMES)
+    known = set(names)
+    while len(names) < size:
+        name = (''.join(rnd.choice(NAME_SYLLABLES) for _ in range(rnd.randint(1, 2)))
+                + rnd.choice(FIRST_NAME_ENDINGS)).capitalize()
+        if name not in known:
+            known.add(name)
+            names.append(name)
+    return names
+
+
+FIRST_NAME_POOL = make_first_names()
+FIRST_NAME_WEIGHTS = list(accumulate(1 / rank for rank in range(1, len(FIRST_NAME_POOL) + 1)))
+
+
+def make_name(rnd):
+    return rnd.choices(FIRST_NAME_POOL, cum_weights=FIRST_NAME_WEIGHTS)[0], make_surname(rnd)
+
+
+FIRST_BIRTHDAY = date(1950, 1, 1).toordinal()
+LAST_BIRTHDAY = date(2010, 12, 31).toordinal()
+LEAP_YEARS = [year for year in range(1952, 2011, 4)]
+
+
+# дата народження: будь-який день 1950-2010 і окремо leap_share з них - 29 лютого,
+# щоб запити на 28 лютого невисокосного року мали що знаходити
+def make_birthday(rnd, leap_share=0.01):
+    if rnd.random() < leap_share:
+        return date(rnd.choice(LEAP_YEARS), 2, 29)
+    return date.fromordinal(rnd.randint(FIRST_BIRTHDAY, LAST_BIRTHDAY))
+
+
+# детерміновані контакти: однаковий seed - однакові дані. Телефони - 10 цифр, як вимагає
+# Phone; день народження є в 90% контактів, email - у 70%, адреса - у 50%
+def make_records(n, seed=0):
+    rnd = random.Random(seed)
+    for i in range(n):
+        first, last = make_name(rnd)
+        record = Record(f'{first} {last} {i}')
+        for _ in range(rnd.randint(1, 3)):
+            record.add_phone(''.join(rnd.choice('0123456789') for _ in range(10)))
+        if rnd.random() < 0.9:
+            record.add_birthday(make_birthday(rnd).strftime('%Y.%m.%d'))
+        if rnd.random() < 0.7:
+            record.add_email(f'{first.lower()}.{last.lower()}{i}@{rnd.choice(DOMAINS)}')
+        if rnd.random() < 0.5:
+            record.add_address(f'{rnd.choice(CITIES)}, {rnd.choice(STREETS)} st. {rnd.randint(1, 200)}')
+        yield record
+
+
+# книга з n контактами з make_records
+def make_book(n, seed=0):
+    book = AddressBook()
+    for record in make_records(n, seed):
+        book.add_record(record)
+    return book
+
+
+# тільки імена, без записів і книги: для бенчмарків окремих індексів на мільйонах контактів
+def make_names(n, seed=0):
+    rnd = random.Random(seed)
+    return ['{} {} {}'.format(*make_name(rnd), i) for i in range(n)]
+
+
+SYLLABLES = ['ka', 'ro', 'mi', 'ta', 'le', 'no', 'vi', 'sa', 'du', 'pe', 'lo', 'ri', 'ne', 'ba', 'zo', 'hu']
+TAGS = ['work', 'home', 'family', 'shopping', 'ideas', 'travel', 'health', 'finance', 'books', 'urgent']
+
+
+# словник зі слів-складів; частоти слів у нотатках спадають за законом Ціпфа,
+# як у справжніх текстах: кілька слів є майже всюди, більшість - рідкісні
+def make_vocabulary(size=5000, seed=0):
+    rnd = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))))
+    return sorted(words)
+
+
+# скільки тегів у нотатки (0-3) і які: теги теж нерівні - "work" є в кожній п'ятій
+# нотатці, "urgent" - у небагатьох
+TAG_COUNTS = [0, 1, 2, 3]
+TAG_COUNT_WEIGHTS = [0.2, 0.4, 0.25, 0.15]
+TAG_WEIGHTS = [1 / rank for rank in range(1, len(TAGS) + 1)]
+
+
+def make_tags(rnd):
+    count = rnd.choices(TAG_COUNTS, TAG_COUNT_WEIGHTS)[0]
+    tags = []
+    while len(tags) < count:
+        tag = rnd.choices(TAGS, TAG_WEIGHTS)[0]
+        if tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+# пари (текст, теги) для n нотаток
+def make_notes(n, seed=0, words_per_note=(5, 60)):
+    rnd = random.Random(seed)
+    vocabulary = make_vocabulary(seed=seed)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    for _ in range(n):
+        yield ' '.join(rnd.choices(vocabulary, weights, k=rnd.randint(*words_per_note))), make_tags(rnd)
+
+
+def make_notebook(n, seed=0, words_per_note=(5, 60)):
+    notebook = Notebook()
+    for content, tags in make_notes(n, seed, words_per_note):
+        notebook.add_note(content, tags)
+    return notebook
@@ -0,0 +1,54 @@
+from datetime import date
+
+from record import birthday_in_year
+
+try:
+    import numpy as np
+except ImportError:  # numpy не обов'язковий, без нього працює календарний індекс
+    np = None
+
+
+# колонкове сховище днів народження: один масив на всю книгу замість
+# datetime-арифметики для кожного запису
+class BirthdayColumns:
+    def __init__(self, records):
+        self.records = [record for record in records if record.birthday is not None]
+        # код дня народження = місяць * 32 + день
+        self.codes = np.fromiter(
+            (record.birthday.value.month * 32 + record.birthday.value.day for record in self.records),
+            dtype=np.int16, count=len(self.records))
+        self._today = None
+        self._order = None
+        self._sorted_days = None
+
+    @staticmethod
+    def _year_table(year):
+        table = np.zeros(13 * 32, dtype=np.int32)
+        for month in range(1, 13):
+            for day in range(1, 32):
+                try:
+                    table[month * 32 + day] = birthday_in_year(date(2000, month, day), year).toordinal()
+                except ValueError:
+                    pass
+        return table
+
+    # скільки днів до наступного дня народження для кожного запису
+    def days_until(self, today: date):
+        this_year = self._year_table(today.year)[self.codes]
+        next_year = self._year_table(today.year + 1)[self.codes]
+        today_ordinal = today.toordinal()
+        return np.where(this_year >= today_ordinal, this_year, next_year) - today_ordinal
+
+    def _sort(self, today):
+        if self._today != today:
+            days = self.days_until(today)
+            self._order = np.argsort(days, kind='stable')
+            self._sorted_days = days[self._order]
+            self._today = today
+
+    # (запис, днів до дня народження) для всіх, у кого він протягом days днів
+    def upcoming(self, today: date, days: int):
+        self._sort(today)
+        end = int(np.searchsorted(self._sorted_days, days, side='right'))
+        return [(self.records[i], int(left))
+                for i, left in zip(self._order[:end].tolist(), self._sorted_days[:end].tolist())]
@@ -0,0 +1,254 @@
+import csv
+import json
+import os
+import re
+from collections import deque
+
+from record import Record
+
+
+FIELDS = ['name', 'phones', 'birthday', 'email', 'address']
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.vcf': 'vcard', '.vcard': 'vcard'}
+ANSI = re.compile(r'\033\[[0-9;]*m')
+
+
+def guess_format(path):
+    return FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+
+# --- читання: кожен формат віддає рядки-словники по одному, не читаючи файл цілком ---
+
+def _phones(value):
+    if isinstance(value, list):
+        return [str(phone).strip() for phone in value if str(phone).strip()]
+    if value is not None and not isinstance(value, str):
+        raise ValueError('Field phones should be a string or a list.')
+    return [phone.strip() for phone in (value or '').split(';') if phone.strip()]
+
+
+def read_csv(file):
+    for line, row in enumerate(csv.DictReader(file), 2):
+        row = {key: (value or '').strip() for key, value in row.items() if key}
+        row['phones'] = _phones(row.get('phones'))
+        yield line, row
+
+
+def read_jsonl(file):
+    for line, text in enumerate(file, 1):
+        if text.strip():
+            try:
+                row = json.loads(text)
+                if not isinstance(row, dict):
+                    raise ValueError('a row should be a JSON object')
+            except ValueError as error:
+                row = {'error': f'Invalid JSON: {error}'}
+            else:
+                try:
+                    row['phones'] = _phones(row.get('phones'))
+                except ValueError as error:
+                    row = {'error': str(error)}
+            yield line, row
+
+
+def _unfold(file):
+    # у vCard довгі рядки переносяться на наступний, що починається з пробілу
+    current = None
+    for text in file:
+        text = text.rstrip('\r\n')
+        if text[:1] in (' ', '\t') and current is not None:
+            current += text[1:]
+            continue
+        if current is not None:
+            yield current
+        current = text
+    if current is not None:
+        yield current
+
+
+def _vcard_escape(value):
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _vcard_unescape(value):
+    return re.sub(r'\\(.)', lambda match: '\n' if match.group(1) in 'nN' else match.group(1), value)
+
+
+def _vcard_birthday(value):
+    digits = value.replace('-', '')[:8]
+    if len(digits) == 8 and digits.isdigit():
+        return f'{digits[:4]}.{digits[4:6]}.{digits[6:]}'
+    return value
+
+
+def read_vcard(file):
+    row, start = None, 0
+    for line, text in enumerate(_unfold(file), 1):
+        key, _, value = text.partition(':')
+        key = key.split(';')[0].upper()
+        if key == 'BEGIN':
+            row, start = {'phones': []}, line
+        elif row is None:
+            continue
+        elif key == 'END':
+            yield start, row
+            row = None
+        elif key == 'FN':
+            row['name'] = _vcard_unescape(value.strip())
+        elif key == 'TEL':
+            row['phones'].append(value.strip())
+        elif key == 'BDAY':
+            row['birthday'] = _vcard_birthday(value.strip())
+        elif key == 'EMAIL':
+            row.setdefault('email', value.strip())
+        elif key == 'ADR':
+            parts = [_vcard_unescape(part).strip() for part in re.split(r'(?<!\\);', value)]
+            row['address'] = ', '.join(part for part in parts if part)
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl, 'vcard': read_vcard}
+
+
+# --- перевірка: ті самі валідатори Phone/Email/Birthday, що й у меню ---
+
+def build_record(row):
+    if row.get('error'):
+        raise ValueError(row['error'])
+    # у JSONL поле може бути числом, списком чи об'єктом
+    for field in ('name', 'birthday', 'email', 'address'):
+        if row.get(field) is not None and not isinstance(row[field], str):
+            raise ValueError(f'Field {field} should be a string.')
+    name = (row.get('name') or '').strip()
+    if not name:
+        raise ValueError('Missing name.')
+    record = Record(name)
+    for phone in row.get('phones', ()):
+        record.add_phone(phone)
+    if row.get('birthday'):
+        record.add_birthday(row['birthday'].replace('-', '.'))
+    if row.get('email'):
+        record.add_email(row['email'])
+    if row.get('address'):
+        record.add_address(row['address'])
+    return record
+
+
+# виконується в окремому процесі, тому функція верхнього рівня
+def validate_chunk(chunk):
+    result = []
+    for line, row in chunk:
+        try:
+            result.append((line, build_record(row), None))
+        except ValueError as error:
+            result.append((line, None, ANSI.sub('', str(error))))
+        except Exception as error:
+            # один зіпсований рядок не повинен зупиняти весь імпорт
+            result.append((line, None, f'{type(error).__name__}: {error}'))
+    return result
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validated(rows, chunk_size, workers):
+    if workers == 0:
+        for chunk in _chunks(rows, chunk_size):
+            yield validate_chunk(chunk)
+        return
+    # пул процесів імпортується тільки тут: він потрібен лише для великих імпортів
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # у роботі тримаємо лише кілька пачок, щоб великий файл не опинився в пам'яті цілком
+        pending = deque()
+        limit = 2 * (workers or os.cpu_count() or 1)
+        for chunk in _chunks(rows, chunk_size):
+            pending.append(pool.submit(validate_chunk, chunk))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# імпортує контакти у книгу однією транзакцією; контакт з таким самим ім'ям,
+# як у книзі, замінює його. Повертає кількість доданих контактів і список
+# помилок (номер рядка, повідомлення). Якщо імпорт обривається винятком
+# (файл не читається, процес перевірки впав), транзакція відкочується і книга
+# лишається такою, як була
+def import_contacts(book, path, file_format=None, workers=None, chunk_size=1000):
+    reader = READERS[file_format or guess_format(path)]
+    imported, errors = 0, []
+    with open(path, newline='', encoding='utf-8') as file, book.transaction():
+        for results in _validated(reader(file), chunk_size, workers):
+            for line, record, error in results:
+                if error:
+                    errors.append((line, error))
+                else:
+                    existing = book.find(record.name.value)
+                    if existing is not None:
+                        record.id = existing.id
+                    book.add_record(record)
+                    imported += 1
+    return imported, errors
+
+
+# --- експорт: книга читається посторінково, у файл пишеться запис за записом ---
+
+def record_row(record):
+    return {
+        'name': record.name.value,
+        'phones': [phone.value for phone in record.phones],
+        'birthday': str(record.birthday) if record.birthday else '',
+        'email': record.email.value if record.email else '',
+        'address': record.address.value if record.address else '',
+    }
+
+
+def _records(book, page_size=1000):
+    for records in book.iter_pages(page_size):
+        yield from records
+
+
+def write_csv(records, file):
+    writer = csv.DictWriter(file, fieldnames=FIELDS)
+    writer.writeheader()
+    for record in records:
+        row = record_row(record)
+        row['phones'] = ';'.join(row['phones'])
+        writer.writerow(row)
+
+
+def write_jsonl(records, file):
+    for record in records:
+        file.write(json.dumps(record_row(record), ensure_ascii=False) + '\n')
+
+
+def write_vcard(records, file):
+    for record in records:
+        row = record_row(record)
+        file.write('BEGIN:VCARD\r\nVERSION:3.0\r\n')
+        file.write(f'FN:{_vcard_escape(row["name"])}\r\n')
+        for phone in row['phones']:
+            file.write(f'TEL:{phone}\r\n')
+        if row['birthday']:
+            file.write(f'BDAY:{row["birthday"].replace(".", "-")}\r\n')
+        if row['email']:
+            file.write(f'EMAIL:{row["email"]}\r\n')
+        if row['address']:
+            file.write(f'ADR:;;{_vcard_escape(row["address"])};;;;\r\n')
+        file.write('END:VCARD\r\n')
+
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'vcard': write_vcard}
+
+
+def export_contacts(book, path, file_format=None):
+    writer = WRITERS[file_format or guess_format(path)]
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer(_records(book), file)
@@ -0,0 +1,358 @@
+# неінтерактивний режим для скриптів, без меню:
+#   python main.py contacts search --q ann --format json
+#   python main.py batch --format json < commands.txt   (одна команда на рядок)
+import argparse
+import json
+import shlex
+import sys
+from datetime import date, datetime
+
+from record import Record, Phone, Birthday, Email, get_phone_book, get_notebook
+from persistence import persister
+from bulk_io import record_row, import_contacts, export_contacts
+
+
+def contact(record):
+    # номер потрібен, щоб розрізнити контакти з однаковим ім'ям (--id, /contacts/id/<id>)
+    row = {'id': record.id, **record_row(record)}
+    row['days_to_birthday'] = record.days_to_birthday()
+    return row
+
+
+def note_row(note):
+    return {'id': note.id, 'content': note.content, 'tags': note.tags}
+
+
+# контакт за номером (--id) або за ім'ям; якщо контактів з цим ім'ям кілька, треба вказати номер
+def _existing(book, name, contact_id=None):
+    if contact_id is not None:
+        record = book.get(contact_id)
+        if record is None:
+            raise ValueError(f'The contact with id {contact_id} not found.')
+        return record
+    if name is None:
+        raise ValueError('Give a contact name or --id.')
+    records = book.find_all(name)
+    if not records:
+        raise ValueError(f'The contact {name} not found.')
+    if len(records) > 1:
+        ids = ', '.join(str(record.id) for record in records)
+        raise ValueError(f'There are {len(records)} contacts named {name}, choose one with --id: {ids}.')
+    return records[0]
+
+
+# --- контакти ---
+
+def contacts_add(args, book, notebook):
+    if book.find(args.name) is not None:
+        raise ValueError(f'The contact {args.name} already exists.')
+    record = Record(args.name)
+    for phone in args.phone:
+        record.add_phone(phone)
+    if args.birthday:
+        record.add_birthday(args.birthday)
+    if args.email:
+        record.add_email(args.email)
+    if args.address:
+        record.add_address(args.address)
+    book.add_record(record)
+    book.write_to_file()
+    return contact(record)
+
+
+def contacts_edit(args, book, notebook):
+    record = _existing(book, args.name, args.id)
+    name = record.name.value
+    # спочатку перевіряємо все, щоб помилка не лишила контакт зміненим наполовину
+    for phone in args.add_phone:
+        Phone(phone)
+    if args.birthday:
+        Birthday(args.birthday)
+    if args.email:
+        Email(args.email)
+    for phone in args.remove_phone:
+        if record.find_phone(phone) is None:
+            raise ValueError(f'Phone: {phone} not found!')
+    if args.rename and args.rename != name and book.find(args.rename) is not None:
+        raise ValueError(f'The contact {args.rename} already exists.')
+    with book.transaction():
+        for phone in args.remove_phone:
+            record.remove_phone(phone)
+        for phone in args.add_phone:
+            record.add_phone(phone)
+        if args.birthday:
+            record.add_birthday(args.birthday)
+        if args.email:
+            record.add_email(args.email)
+        if args.address:
+            record.add_address(args.address)
+        if args.rename and args.rename != name:
+            record.rename(args.rename)
+        book.add_record(record)
+    return contact(record)
+
+
+def contacts_find(args, book, notebook):
+    return contact(_existing(book, args.name, args.id))
+
+
+def contacts_search(args, book, notebook):
+    if args.fuzzy:
+        return [contact(record) for record in book.fuzzy_search(args.q, args.limit)]
+    return [contact(record) for record in book.search(args.q)]
+
+
+def contacts_delete(args, book, notebook):
+    record = _existing(book, args.name, args.id)
+    book.delete_record(record)
+    book.write_to_file()
+    return f'The contact {record.name.value} has been deleted.'
+
+
+def contacts_list(args, book, notebook):
+    records, token = book.page(args.page_size, args.offset, args.after)
+    return {'records': [contact(record) for record in records], 'next': token}
+
+
+def contacts_import(args, book, notebook):
+    imported, errors = import_contacts(book, args.path, args.file_format, args.workers)
+    return {'imported': imported, 'errors': [{'line': line, 'error': error} for line, error in errors]}
+
+
+def contacts_export(args, book, notebook):
+    export_contacts(book, args.path, args.file_format)
+    return f'Exported {len(book)} contacts to {args.path}.'
+
+
+# --- дні народження ---
+
+def birthdays_on(args, book, notebook):
+    day = datetime.strptime(args.date, '%Y.%m.%d').date() if args.date else date.today()
+    return [record.name.value for record in book.birthdays_on(day)]
+
+
+def birthdays_days(args, book, notebook):
+    today = date.today()
+    return [{'name': record.name.value, 'birthday': str(record.birthday), 'days_to_birthday': days}
+            for record, days in book.upcoming_birthdays(today, args.days)]
+
+
+def birthdays_week(args, book, notebook):
+    today = date.today()
+    result = []
+    for record, days in book.upcoming_birthdays(today, 7):
+        day = date.fromordinal(today.toordinal() + days)
+        result.append({'name': record.name.value, 'date': day.strftime('%Y.%m.%d'), 'weekday': day.strftime('%A')})
+    return result
+
+
+# --- нотатки ---
+
+def _tags(value):
+    return [tag.strip() for tag in value.split(',')] if value else []
+
+
+def notes_add(args, book, notebook):
+    note = notebook.add_note(args.content, _tags(args.tags))
+    notebook.write_to_file()
+    return note_row(note)
+
+
+def notes_list(args, book, notebook):
+    return [note_row(note) for note in notebook]
+
+
+def notes_search(args, book, notebook):
+    if args.q is not None:
+        return [note_row(note) for note in notebook.search_text(args.q, args.limit)]
+    return [note_row(note) for note in notebook.search_and_sort_notes(args.tag)]
+
+
+def notes_edit(args, book, notebook):
+    if args.id is not None:
+        note = notebook.edit_note(args.id, args.content, _tags(args.tags) if args.tags is not None else None)
+        if note is None:
+            raise ValueError(f'No note with id {args.id}.')
+        edited = 1
+    else:
+        edited = notebook.edit_note_content(args.tag, args.content)
+    notebook.write_to_file()
+    return {'edited': edited}
+
+
+def notes_delete(args, book, notebook):
+    if args.id is not None:
+        deleted = 1 if notebook.delete_note(args.id) is not None else 0
+    else:
+        deleted = notebook.delete_notes_by_tag(args.tag)
+    notebook.write_to_file()
+    return {'deleted': deleted}
+
+
+class CommandError(Exception):
+    pass
+
+
+class _Parser(argparse.ArgumentParser):
+    # у пакетному режимі помилка в одній команді не повинна завершувати процес
+    def error(self, message):
+        raise CommandError(message)
+
+
+def build_parser(parser_class=argparse.ArgumentParser):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--format', choices=['text', 'json'], default='text')
+
+    parser = parser_class(prog='main.py', description='Contact book and notes without the menus.')
+    groups = parser.add_subparsers(dest='group', required=True)
+
+    contacts = groups.add_parser('contacts').add_subparsers(dest='command', required=True)
+    command = contacts.add_parser('add', parents=[common])
+    command.add_argument('name')
+    command.add_argument('--phone', action='append', default=[])
+    command.add_argument('--birthday', help='YYYY.MM.DD')
+    command.add_argument('--email')
+    command.add_argument('--address')
+    command.set_defaults(handler=contacts_add)
+    command = contacts.add_parser('edit', parents=[common])
+    command.add_argument('name', nargs='?')
+    command.add_argument('--id', type=int, help='contact id, for contacts with the same name')
+    command.add_argument('--add-phone', action='append', default=[])
+    command.add_argument('--remove-phone', action='append', default=[])
+    command.add_argument('--birthday', help='YYYY.MM.DD')
+    command.add_argument('--email')
+    command.add_argument('--address')
+    command.add_argument('--rename')
+    command.set_defaults(handler=contacts_edit)
+    for name, handler in (('find', contacts_find), ('delete', contacts_delete)):
+        command = contacts.add_parser(name, parents=[common])
+        command.add_argument('name', nargs='?')
+        command.add_argument('--id', type=int, help='contact id, for contacts with the same name')
+        command.set_defaults(handler=handler)
+    command = contacts.add_parser('search', parents=[common])
+    command.add_argument('--q', required=True)
+    command.add_argument('--fuzzy', action='store_true', help='tolerate typos, best matches first')
+    command.add_argument('--limit', type=int, default=10, help='with --fuzzy')
+    command.set_defaults(handler=contacts_search)
+    command = contacts.add_parser('list', parents=[common])
+    command.add_argument('--page-size', type=int, default=50)
+    command.add_argument('--offset', type=int, default=0)
+    command.add_argument('--after', help='token returned as "next" by the previous page')
+    command.set_defaults(handler=contacts_list)
+    command = contacts.add_parser('import', parents=[common])
+    command.add_argument('path')
+    command.add_argument('--file-format', choices=['csv', 'jsonl', 'vcard'])
+    command.add_argument('--workers', type=int)
+    command.set_defaults(handler=contacts_import)
+    command = contacts.add_parser('export', parents=[common])
+    command.add_argument('path')
+    command.add_argument('--file-format', choices=['csv', 'jsonl', 'vcard'])
+    command.set_defaults(handler=contacts_export)
+
+    birthdays = groups.add_parser('birthdays').add_subparsers(dest='command', required=True)
+    command = birthdays.add_parser('on', parents=[common])
+    command.add_argument('--date', help='YYYY.MM.DD, today by default')
+    command.set_defaults(handler=birthdays_on)
+    command = birthdays.add_parser('week', parents=[common])
+    command.set_defaults(handler=birthdays_week)
+    command = birthdays.add_parser('days', parents=[common])
+    command.add_argument('days', type=int)
+    command.set_defaults(handler=birthdays_days)
+
+    notes = groups.add_parser('notes').add_subparsers(dest='command', required=True)
+    command = notes.add_parser('add', parents=[common])
+    command.add_argument('--content', required=True)
+    command.add_argument('--tags', help='comma separated')
+    command.set_defaults(handler=notes_add)
+    command = notes.add_parser('list', parents=[common])
+    command.set_defaults(handler=notes_list)
+    command = notes.add_parser('search', parents=[common])
+    target = command.add_mutually_exclusive_group(required=True)
+    target.add_argument('--tag')
+    target.add_argument('--q', help='full text: words, "a phrase", prefix*')
+    command.add_argument('--limit', type=int, default=10)
+    command.set_defaults(handler=notes_search)
+    for name, handler in (('edit', notes_edit), ('delete', notes_delete)):
+        command = notes.add_parser(name, parents=[common])
+        target = command.add_mutually_exclusive_group(required=True)
+        target.add_argument('--id', type=int)
+        target.add_argument('--tag')
+        if name == 'edit':
+            command.add_argument('--content')
+            command.add_argument('--tags', help='comma separated, only with --id')
+        command.set_defaults(handler=handler)
+
+    batch = groups.add_parser('batch', parents=[common], help='read commands from stdin, one per line')
+    batch.set_defaults(handler=None)
+    return parser
+
+
+def render(result, output_format):
+    if output_format == 'json':
+        return json.dumps(result, ensure_ascii=False)
+    if isinstance(result, list):
+        return '\n'.join(render(item, output_format) for item in result)
+    if isinstance(result, dict):
+        return ', '.join(f'{key}: {value}' for key, value in result.items())
+    return str(result)
+
+
+def error_record(error):
+    message = str(error).replace('\033[91m', '').replace('\033[0m', '')
+    if not isinstance(error, (ValueError, CommandError)):
+        # неочікувані помилки (немає файлу, збій обробника) - з назвою типу
+        message = f'{type(error).__name__}: {message}'
+    return {'error': message}
+
+
+def run(args, book, notebook):
+    try:
+        book.refresh()
+        return args.handler(args, book, notebook), True
+    except Exception as error:
+        return error_record(error), False
+
+
+def run_batch(parser, output_format, book, notebook, lines, out):
+    failed = 0
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        try:
+            args = parser.parse_args(shlex.split(line))
+            if args.handler is None:
+                raise CommandError('batch can not be nested')
+            result, ok = run(args, book, notebook)
+        except SystemExit:
+            # --help
+            continue
+        except Exception as error:
+            # помилка розбору, зокрема незакриті лапки в shlex.split
+            result, ok = error_record(error), False
+        failed += not ok
+        out.write(render(result, output_format) + '\n')
+    return failed
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    book = get_phone_book()
+    notebook = get_notebook()
+    if args.group in ('notes', 'batch'):
+        # файл нотаток потрібен лише командам для нотаток
+        notebook.read_from_file()
+    try:
+        if args.handler is None:
+            batch_parser = build_parser(_Parser)
+            return 1 if run_batch(batch_parser, args.format, book, notebook, sys.stdin, sys.stdout) else 0
+        result, ok = run(args, book, notebook)
+        print(render(result, args.format))
+        return 0 if ok else 1
+    finally:
+        book.write_to_file()
+        persister.flush()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
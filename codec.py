@@ -0,0 +1,230 @@
+import struct
+import sys
+from array import array
+from datetime import date
+
+
+# стовпцевий двійковий формат знімків книги і нотаток замість pickle: не залежить від
+# шляхів класів і читається без валідаторів полів (дані вже перевірені при записі).
+#
+# Заголовок: MAGIC, версія, вид ('B' - книга, 'N' - нотатки), кількість записів; далі
+# стовпці по черзі. Стовпець чисел - довжина в байтах і масив little-endian; стовпець
+# рядків - довжини в символах (-1 - None) і всі рядки одним UTF-8 блоком.
+# Телефони - цілі числа (10 цифр з нулями на початку відновлюються при читанні),
+# дні народження - date.toordinal(), 0 - немає. З версії 2 знімок книги першим стовпцем
+# зберігає наступний вільний номер запису: номери видалених записів не видаються знову
+MAGIC = b'ABCC'
+VERSION = 2
+HEADER = struct.Struct('<4sHcxI')
+LENGTH = struct.Struct('<Q')
+BOOK, NOTES = b'B', b'N'
+
+
+def is_encoded(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+class _Writer:
+    def __init__(self, kind, count):
+        self.parts = [HEADER.pack(MAGIC, VERSION, kind, count)]
+
+    def numbers(self, typecode, values):
+        column = array(typecode, values)
+        if sys.byteorder == 'big':
+            column.byteswap()
+        data = column.tobytes()
+        self.parts += [LENGTH.pack(len(data)), data]
+
+    def strings(self, values):
+        values = list(values)
+        self.numbers('i', [-1 if value is None else len(value) for value in values])
+        data = ''.join(value for value in values if value is not None).encode()
+        self.parts += [LENGTH.pack(len(data)), data]
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data, kind):
+        magic, self.version, found, self.count = HEADER.unpack_from(data)
+        if magic != MAGIC or found != kind:
+            raise ValueError('Not an address book snapshot.')
+        if not 1 <= self.version <= VERSION:
+            raise ValueError(f'Unsupported snapshot version {self.version}.')
+        self.data = memoryview(data)
+        self.offset = HEADER.size
+
+    def _chunk(self):
+        size, = LENGTH.unpack_from(self.data, self.offset)
+        start = self.offset + LENGTH.size
+        self.offset = start + size
+        return self.data[start:self.offset]
+
+    def numbers(self, typecode):
+        column = array(typecode)
+        column.frombytes(self._chunk())
+        if sys.byteorder == 'big':
+            column.byteswap()
+        return column
+
+    def strings(self):
+        lengths = self.numbers('i')
+        text = str(self._chunk(), 'utf-8')
+        values, position = [], 0
+        for length in lengths:
+            if length < 0:
+                values.append(None)
+            else:
+                values.append(text[position:position + length])
+                position += length
+        return values
+
+
+# стовпці книги. of() читає кожен запис рівно один раз: кількість телефонів і самі телефони
+# беруться з однієї копії списку, тож рядок запису узгоджений, навіть якщо інший потік
+# тим часом змінює записи (стискання у фоні, поки меню чи сервер редагують книгу)
+class BookColumns:
+    __slots__ = ('next_id', 'ids', 'names', 'phone_counts', 'phones', 'birthdays', 'emails', 'addresses')
+
+    @classmethod
+    def of(cls, records, next_id=0):
+        columns = cls()
+        columns.ids, columns.names, columns.phone_counts, columns.phones = [], [], [], []
+        columns.birthdays, columns.emails, columns.addresses = [], [], []
+        for record in records:
+            phones = [phone.value for phone in record.phones[:]]
+            birthday, email, address = record.birthday, record.email, record.address
+            columns.ids.append(record.id)
+            columns.names.append(record.name.value)
+            columns.phone_counts.append(len(phones))
+            columns.phones += phones
+            columns.birthdays.append(birthday.value.toordinal() if birthday else 0)
+            columns.emails.append(email.value if email else None)
+            columns.addresses.append(address.value if address else None)
+        columns.next_id = max(next_id, max(columns.ids, default=0) + 1)
+        return columns
+
+    def __len__(self):
+        return len(self.ids)
+
+    # швидкий шлях: об'єкти збираються напряму через слоти, без __init__ і перевірок значень
+    def records(self):
+        from record import Record, Name, Phone, Birthday, Email, Address
+
+        new = object.__new__
+        fromordinal = date.fromordinal
+        phones = self.phones
+        result = {}
+        position = 0
+        for key, name, phone_count, birthday, email, address in zip(self.ids, self.names, self.phone_counts,
+                                                                    self.birthdays, self.emails, self.addresses):
+            record = new(Record)
+            record.id = key
+            field = new(Name)
+            field._value = name
+            record.name = field
+            record.phones = items = []
+            for value in phones[position:position + phone_count]:
+                field = new(Phone)
+                field._value = value
+                items.append(field)
+            position += phone_count
+            if birthday:
+                field = new(Birthday)
+                field._value = fromordinal(birthday)
+                record.birthday = field
+            else:
+                record.birthday = None
+            if email is not None:
+                field = new(Email)
+                field._value = email
+                record.email = field
+            else:
+                record.email = None
+            if address is not None:
+                field = new(Address)
+                field._value = address
+                record.address = field
+            else:
+                record.address = None
+            record._book = None
+            record._birthday_cache = None
+            result[key] = record
+        return result
+
+
+def encode_book(data):
+    return encode_columns(BookColumns.of(data.values()))
+
+
+def encode_columns(columns):
+    writer = _Writer(BOOK, len(columns))
+    writer.numbers('q', [columns.next_id])
+    writer.numbers('q', columns.ids)
+    writer.strings(columns.names)
+    writer.numbers('I', columns.phone_counts)
+    phones = columns.phones
+    # int() прийняв би й інші цифри Unicode, а назад відновлюються тільки ASCII
+    joined = ''.join(phones)
+    if len(joined) != 10 * len(phones) or not joined.isascii() or joined and not joined.isdigit():
+        raise ValueError('Phone numbers should be 10 ASCII digits.')
+    writer.numbers('q', map(int, phones))
+    writer.numbers('i', columns.birthdays)
+    writer.strings(columns.emails)
+    writer.strings(columns.addresses)
+    return writer.getvalue()
+
+
+# (записи, наступний вільний номер)
+def decode_book(data):
+    reader = _Reader(data, BOOK)
+    columns = BookColumns()
+    columns.next_id = reader.numbers('q')[0] if reader.version >= 2 else 0
+    columns.ids = reader.numbers('q')
+    columns.names = reader.strings()
+    columns.phone_counts = reader.numbers('I')
+    columns.phones = list(map('{:010d}'.format, reader.numbers('q')))
+    columns.birthdays = reader.numbers('i')
+    columns.emails = reader.strings()
+    columns.addresses = reader.strings()
+    return columns.records(), columns.next_id
+
+
+# теги повторюються від нотатки до нотатки: у файлі словник різних тегів і номери в ньому,
+# і при читанні всі нотатки з одним тегом посилаються на один рядок
+def encode_notes(notes):
+    notes = list(notes)
+    vocabulary = {}
+    for note in notes:
+        for tag in note.tags:
+            vocabulary.setdefault(tag, len(vocabulary))
+    writer = _Writer(NOTES, len(notes))
+    writer.numbers('q', [note.id or 0 for note in notes])
+    writer.strings(note.content for note in notes)
+    writer.numbers('I', [len(note.tags) for note in notes])
+    writer.strings(vocabulary)
+    writer.numbers('I', [vocabulary[tag] for note in notes for tag in note.tags])
+    return writer.getvalue()
+
+
+def decode_notes(data):
+    from record import Note
+
+    reader = _Reader(data, NOTES)
+    ids = reader.numbers('q')
+    contents = reader.strings()
+    tag_counts = reader.numbers('I')
+    vocabulary = reader.strings()
+    tags = list(map(vocabulary.__getitem__, reader.numbers('I')))
+    new = object.__new__
+    notes = []
+    position = 0
+    for note_id, content, tag_count in zip(ids, contents, tag_counts):
+        note = new(Note)
+        note.content = content
+        note.tags = tags[position:position + tag_count]
+        position += tag_count
+        note.id = note_id or None
+        notes.append(note)
+    return notes
@@ -0,0 +1,219 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+
+TOKEN = re.compile(r'\w+')
+# частини запиту: "фраза в лапках", слово* (початок слова) або просто слово
+QUERY = re.compile(r'"([^"]*)"|(\w+)(\*)?')
+
+
+def tokens(text):
+    return TOKEN.findall(text.lower())
+
+
+# повнотекстовий індекс з ранжуванням BM25: слово -> {номер документа: позиції слова}.
+# Документ - це текст нотатки і її теги; теги йдуть після тексту з розривом у позиціях,
+# щоб фраза не склеювала кінець тексту з тегом
+class TextIndex:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.words = {}
+        self.lengths = {}
+        self.total_length = 0
+        # різні слова за абеткою, для запитів за початком слова; сортуються при першому
+        # такому запиті, а не на кожне нове слово під час побудови індексу
+        self._terms = None
+        # слово -> (версія, [(оцінка, номер документа)] від найкращого); оцінки залежать
+        # від кількості і середньої довжини документів, тож будь-яка зміна їх скидає
+        self.version = 0
+        self._ranked = {}
+        self._norms = (None, {})
+        self.cache_size = 256
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, doc_id, text, tags=()):
+        words = tokens(text)
+        for tag in tags:
+            words += [None] + tokens(tag)
+        positions = {}
+        for position, word in enumerate(words):
+            if word is not None:
+                found = positions.get(word)
+                if found is None:
+                    positions[word] = [position]
+                else:
+                    found.append(position)
+        for word, found in positions.items():
+            postings = self.postings[word]
+            if not postings and self._terms is not None:
+                insort(self._terms, word)
+            postings[doc_id] = found
+        self.words[doc_id] = tuple(positions)
+        self.lengths[doc_id] = len(words)
+        self.total_length += len(words)
+        self.version += 1
+
+    def update(self, doc_id, text, tags=()):
+        self.remove(doc_id)
+        self.add(doc_id, text, tags)
+
+    def remove(self, doc_id):
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        self.version += 1
+        for word in self.words.pop(doc_id):
+            postings = self.postings[word]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[word]
+                if self._terms is not None:
+                    del self._terms[bisect_left(self._terms, word)]
+
+    def clear(self):
+        self.postings.clear()
+        self.words.clear()
+        self.lengths.clear()
+        self.total_length = 0
+        self._terms = None
+        self._ranked.clear()
+        self.version += 1
+
+    # оцінка BM25 одного слова для одного документа; tf - скільки разів воно там є
+    def _weight(self, df, tf, length):
+        idf = math.log(1 + (len(self.lengths) - df + 0.5) / (df + 0.5))
+        k1 = self.k1
+        average = self.total_length / len(self.lengths)
+        return idf * tf * (k1 + 1) / (tf + k1 * (1 - self.b + self.b * length / average))
+
+    def _term_score(self, word, doc_id):
+        postings = self.postings.get(word)
+        positions = postings.get(doc_id) if postings else None
+        if not positions:
+            return 0.0
+        return self._weight(len(postings), len(positions), self.lengths[doc_id])
+
+    # знаменник BM25 без tf для кожного документа; спільний для всіх слів до зміни індексу
+    def _doc_norms(self):
+        version, norms = self._norms
+        if version != self.version:
+            k1, b, average = self.k1, self.b, self.total_length / len(self.lengths)
+            norms = {doc_id: k1 * (1 - b + b * length / average) for doc_id, length in self.lengths.items()}
+            self._norms = (self.version, norms)
+        return norms
+
+    # документи зі словом, від найкращого: [(-оцінка, номер документа)], щоб сортувати
+    # без ключа; список кешується до наступної зміни індексу
+    def _ranked_docs(self, word):
+        cached = self._ranked.get(word)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        postings = self.postings.get(word, {})
+        df, norms = len(postings), self._doc_norms()
+        idf = math.log(1 + (len(self.lengths) - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+        ranked = []
+        for doc_id, positions in postings.items():
+            tf = len(positions)
+            ranked.append((-idf * tf / (tf + norms[doc_id]), doc_id))
+        ranked.sort()
+        self._ranked.pop(word, None)
+        self._ranked[word] = (self.version, ranked)
+        if len(self._ranked) > self.cache_size:
+            self._ranked.pop(next(iter(self._ranked)), None)
+        return ranked
+
+    # документи, де слова фрази стоять підряд: {номер документа: скільки разів}
+    def _phrase(self, words):
+        postings = [self.postings.get(word) for word in words]
+        if not all(postings):
+            return {}
+        found = {}
+        rarest, *others = sorted(postings, key=len)
+        for doc_id in rarest:
+            if not all(doc_id in items for items in others):
+                continue
+            starts = set(postings[0][doc_id])
+            for shift, items in enumerate(postings[1:], 1):
+                starts &= {position - shift for position in items[doc_id]}
+                if not starts:
+                    break
+            if starts:
+                found[doc_id] = len(starts)
+        return found
+
+    @property
+    def terms(self):
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        return self._terms
+
+    def _prefix(self, prefix):
+        terms = self.terms
+        i = bisect_left(terms, prefix)
+        while i < len(terms) and terms[i].startswith(prefix):
+            yield terms[i]
+            i += 1
+
+    # частина запиту = (документи від найкращого, [(-оцінка, номер)], і оцінка будь-якого документа)
+    def _parts(self, query):
+        for phrase, word, star in QUERY.findall(query.lower()):
+            words = tokens(phrase) if phrase else [word]
+            if len(words) > 1:
+                found = self._phrase(words)
+                scores = {doc_id: sum(self._weight(len(self.postings[word]), count, self.lengths[doc_id])
+                                      for word in words) for doc_id, count in found.items()}
+                ranked = sorted((-score, doc_id) for doc_id, score in scores.items())
+                yield ranked, lambda doc_id, scores=scores: scores.get(doc_id, 0.0)
+            elif words and star:
+                # за початком слова документ оцінюється за найкращим словом, що підходить;
+                # у злитому списку перша поява документа - і є найкраща
+                terms = list(self._prefix(words[0]))
+                merged = heapq.merge(*(self._ranked_docs(term) for term in terms))
+                yield merged, lambda doc_id, terms=terms: max(self._term_score(term, doc_id) for term in terms)
+            elif words and words[0]:
+                yield self._ranked_docs(words[0]), lambda doc_id, word=words[0]: self._term_score(word, doc_id)
+
+    # до limit пар (номер документа, оцінка), найкращі першими. Запит - слова,
+    # "фрази в лапках" і початки слів з зірочкою: budget*; документ має містити
+    # хоча б одну частину запиту, оцінки частин додаються.
+    # Алгоритм порогу (Fagin): списки частин читаються паралельно від найкращих документів;
+    # коли сума поточних оцінок у списках не перевищує limit-ої знайденої оцінки,
+    # жоден непрочитаний документ уже не потрапить у результат
+    def search(self, query, limit=10):
+        if not self.lengths or limit <= 0:
+            return []
+        parts = list(self._parts(query))
+        streams = [iter(ranked) for ranked, _ in parts]
+        thresholds = [math.inf] * len(parts)
+        top, seen = [], set()
+        while streams:
+            for n, stream in enumerate(streams):
+                if stream is None:
+                    continue
+                item = next(stream, None)
+                if item is None:
+                    streams[n], thresholds[n] = None, 0.0
+                    continue
+                rank, doc_id = item
+                thresholds[n] = -rank
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                entry = (sum(score(doc_id) for _, score in parts), -doc_id)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+            if all(stream is None for stream in streams):
+                break
+            if len(top) == limit and top[0][0] >= sum(thresholds):
+                break
+        return [(-doc_id, score) for score, doc_id in sorted(top, reverse=True)]
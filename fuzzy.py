@@ -0,0 +1,339 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import chain
+
+
+WORD = re.compile(r'[^\W\d_]+')
+
+
+# слова імені в нижньому регістрі; числа не індексуються (для них є пошук за телефоном)
+def words(text):
+    return WORD.findall(text.lower())
+
+
+# усі рядки, які виходять з word видаленням не більше ніж depth символів
+def deletes(word, depth):
+    result = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        result |= frontier
+    return result
+
+
+# відстані Дамерау-Левенштейна (з перестановкою сусідніх літер) від a до кожного з
+# рядків texts і до їх початку довжини len(a): text -> (до всього, до початку).
+# Більші за limit повертаються як limit + 1. Стовпчик матриці відстаней тримається
+# бітами (Мієрс, з перестановками - Хюрьо): на літеру рядка кілька операцій над цілими
+# замість циклу по літерах a. Стан після кожної літери залежить тільки від початку
+# рядка, тож рядки перебираються за абеткою і спільний початок з попереднім не рахується
+def distances_to(a, texts, limit):
+    big = limit + 1
+    length = len(a)
+    if not length:
+        return {text: (min(len(text), big), 0) for text in texts}
+    masks = {}
+    for i, letter in enumerate(a):
+        masks[letter] = masks.get(letter, 0) | 1 << i
+    full = (1 << length) - 1
+    top = 1 << (length - 1)
+    # біти додатних і від'ємних різниць між сусідніми клітинками стовпчика, біти збігів
+    # попередньої літери і відстань від a до початку рядка - після кожної літери
+    states = [(full, 0, 0, 0, length)]
+    result, previous = {}, ''
+    for text in sorted(texts):
+        common = 0
+        for letter, other in zip(text, previous):
+            if letter != other:
+                break
+            common += 1
+        del states[common + 1:]
+        up, down, diagonal, before, score = states[-1]
+        for letter in text[common:]:
+            match = masks.get(letter, 0)
+            swap = ((~diagonal & match) << 1) & before
+            diagonal = (((match & up) + up) ^ up) | match | down | swap
+            right = down | ~(diagonal | up)
+            left = diagonal & up
+            if right & top:
+                score += 1
+            elif left & top:
+                score -= 1
+            right = (right << 1 | 1) & full
+            left = (left << 1) & full
+            up = left | ~(diagonal | right) & full
+            down = diagonal & right
+            before = match
+            states.append((up, down, diagonal, before, score))
+        result[text] = min(score, big), (min(states[length][4], big) if len(text) >= length else big)
+        previous = text
+    return result
+
+
+# відстані від a до всього b і до початку b довжини len(a)
+def distances(a, b, limit):
+    # далі цієї літери b не впливає ні на одну з двох відстаней
+    start = b[:len(a) + limit]
+    full, prefix = distances_to(a, [start], limit)[start]
+    return (full if len(b) == len(start) else limit + 1), prefix
+
+
+def distance(a, b, limit):
+    return distances(a, b, limit)[0]
+
+
+# пошук з помилками за словами імені (symmetric delete): для кожного слова індексуються
+# його перші prefix_length символів з усіма видаленнями до max_distance символів,
+# тоді слова запиту з помилками знаходяться кількома звертаннями до словника
+class FuzzyIndex:
+    # якість збігу слова: повний, початок слова, з помилками, початок слова з помилками
+    EXACT, PREFIX, TYPO, TYPO_PREFIX = range(4)
+
+    def __init__(self, texts, prefix_length=7, max_distance=2):
+        # texts(record) повертає рядки запису, які треба індексувати
+        self.texts = texts
+        self.prefix_length = prefix_length
+        self.max_distance = max_distance
+        self.postings = defaultdict(set)
+        self.keys = {}
+        self.variants = defaultdict(set)
+        # різні слова за абеткою, для пошуку за початком слова
+        self.words = []
+
+    def add(self, key, record):
+        found = tuple({word for text in self.texts(record) for word in words(text)})
+        self.keys[key] = found
+        for word in found:
+            postings = self.postings[word]
+            if not postings:
+                self._add_word(word)
+            postings.add(key)
+
+    # побудова з пар (ключ, запис): слова сортуються один раз у кінці, а не insort на кожне
+    # нове слово - на книзі з сотнями тисяч різних прізвищ це квадратичний час
+    def add_all(self, items):
+        postings, new = self.postings, []
+        for key, record in items:
+            if key in self.keys:
+                self.remove(key)
+            found = tuple({word for text in self.texts(record) for word in words(text)})
+            self.keys[key] = found
+            for word in found:
+                if word not in postings:
+                    new.append(word)
+                postings[word].add(key)
+        for word in new:
+            self._add_variants(word)
+        self.words = sorted(postings)
+
+    def update(self, key, record):
+        self.remove(key)
+        self.add(key, record)
+
+    def remove(self, key):
+        for word in self.keys.pop(key, ()):
+            postings = self.postings[word]
+            postings.discard(key)
+            if not postings:
+                del self.postings[word]
+                self._remove_word(word)
+
+    def clear(self):
+        self.postings.clear()
+        self.keys.clear()
+        self.variants.clear()
+        self.words.clear()
+
+    def _add_word(self, word):
+        insort(self.words, word)
+        self._add_variants(word)
+
+    def _add_variants(self, word):
+        for variant in deletes(word[:self.prefix_length], self.max_distance):
+            self.variants[variant].add(word)
+
+    def _remove_word(self, word):
+        del self.words[bisect_left(self.words, word)]
+        for variant in deletes(word[:self.prefix_length], self.max_distance):
+            words = self.variants[variant]
+            words.discard(word)
+            if not words:
+                del self.variants[variant]
+
+    # слова індексу, схожі на слово запиту: слово -> (відстань, якість збігу).
+    # Далі len(query) + limit літер слова на відстані не впливають, тож відстань
+    # рахується не більше ніж для max_checked різних початків слів: спершу тих, що
+    # знайдені за запитом з меншою кількістю видалених літер - вони найближчі
+    def matches(self, query, max_checked=250):
+        # слова, що починаються з query, лежать у self.words підряд
+        start = bisect_left(self.words, query)
+        found = dict.fromkeys(self.words[start:bisect_left(self.words, query + '\U0010ffff', start)], (0, self.PREFIX))
+        if query in found:
+            found[query] = (0, self.EXACT)
+        limit = self.max_distance
+        end = len(query) + limit
+        candidates, starts = [], set()
+        for word in self._candidates(query, set(found)):
+            if word[:end] not in starts:
+                if len(starts) == max_checked:
+                    break
+                starts.add(word[:end])
+            candidates.append(word)
+        computed = distances_to(query, starts, limit)
+        for word in candidates:
+            full, prefix = computed[word[:end]]
+            if full <= limit and len(word) <= end:
+                found[word] = (full, self.TYPO)
+            elif prefix <= limit and len(word) > len(query):
+                found[word] = (prefix, self.TYPO_PREFIX)
+        return found
+
+    # слова під варіантами запиту, без checked і без повторів: спершу з меншою
+    # кількістю видалених літер
+    def _candidates(self, query, checked):
+        variants = {query[:self.prefix_length]}
+        for depth in range(self.max_distance + 1):
+            if depth:
+                variants = {item[:i] + item[i + 1:] for item in variants for i in range(len(item))}
+            for variant in sorted(variants):
+                for word in self.variants.get(variant, ()):
+                    if word not in checked:
+                        checked.add(word)
+                        yield word
+
+    # до limit ключів, найкращі першими: (ключ, (сума відстаней, сума якості)).
+    # Кожне слово запиту має збігтися з якимось словом запису. Слова запиту групуються
+    # за оцінкою збігу (їх до десятка), і комбінації груп перебираються від найкращої:
+    # на великій книзі не треба оцінювати всі записи, а порожні комбінації дешеві
+    def search(self, query, limit=10):
+        groups = []
+        for word in dict.fromkeys(words(query)):
+            found = self.matches(word)
+            if not found:
+                return []
+            grouped = defaultdict(list)
+            for match, score in found.items():
+                grouped[score].append(match)
+            groups.append(sorted(grouped.items()))
+        if not groups:
+            return []
+
+        def total(combination):
+            scores = [groups[n][i][0] for n, i in enumerate(combination)]
+            return (sum(score[0] for score in scores), sum(score[1] for score in scores))
+
+        start = (0,) * len(groups)
+        heap, seen, result, taken = [(total(start), start)], {start}, [], set()
+        keys = _Keys(self, [[group for _, group in levels] for levels in groups])
+        while heap and len(result) < limit:
+            score, combination = heapq.heappop(heap)
+            for key in keys.common(combination):
+                if key not in taken:
+                    taken.add(key)
+                    result.append((key, score))
+                    if len(result) == limit:
+                        break
+            for n in range(len(groups)):
+                following = combination[:n] + (combination[n] + 1,) + combination[n + 1:]
+                if following[n] < len(groups[n]) and following not in seen:
+                    seen.add(following)
+                    heapq.heappush(heap, (total(following), following))
+        return result
+
+
+# записи, у яких є слова з груп слів запиту. Зазвичай збігів багато, і досить перевірити
+# слова перших записів найменшої групи; повний перетин (множини на мільйоні контактів - до
+# сотень тисяч ключів) рахується, тільки якщо збігів мало або немає
+class _Keys:
+    # скільки записів перевіряється по одному до повного перетину
+    PROBE = 300
+    # перевірка по одному варта, якщо серед PROBE записів очікується стільки збігів
+    PROBE_HITS = 10
+    # приблизна ціна перевірки слів запису в Python проти ключа множини в C
+    RECORD_COST = 20
+    # робота з множинами на запит, у перевірках ключа множиною (кілька мілісекунд)
+    BUDGET = 50000
+    SAMPLE = 256
+
+    def __init__(self, index, groups):
+        self.index = index
+        # для кожного слова запиту - групи слів індексу від найкращої
+        self.groups = groups
+        self.sizes = {}
+        self.sets = {}
+        self.unions = {}
+        self.work = 0
+
+    # кількість ключів групи; для тисяч слів (усі слова з початком "kra") - оцінка за
+    # першими SAMPLE словами, бо точна сума сама коштує мілісекунди
+    def size(self, n, i):
+        if (n, i) not in self.sizes:
+            group = self.groups[n][i]
+            sample = sum(len(self.index.postings[word]) for word in group[:self.SAMPLE])
+            self.sizes[n, i] = sample * len(group) // min(len(group), self.SAMPLE)
+        return self.sizes[n, i]
+
+    def words(self, n, i):
+        if (n, i) not in self.sets:
+            self.sets[n, i] = set(self.groups[n][i])
+        return self.sets[n, i]
+
+    def union(self, n, i):
+        if (n, i) not in self.unions:
+            postings = [self.index.postings[word] for word in self.groups[n][i]]
+            self.unions[n, i] = postings[0] if len(postings) == 1 else set().union(*postings)
+        return self.unions[n, i]
+
+    def common(self, combination):
+        order = sorted(enumerate(combination), key=lambda item: self.size(*item))
+        first = chain.from_iterable(self.index.postings[word] for word in self.groups[order[0][0]][order[0][1]])
+        if len(order) == 1:
+            yield from first
+            return
+        others = [self.words(n, i) for n, i in order[1:]]
+        keys = self.index.keys
+        # перші PROBE записів перевіряються по одному, якщо збігів серед них очікується
+        # досить (вважаючи слова записів незалежними)
+        density = 1
+        for n, i in order[1:]:
+            density *= self.size(n, i) / max(len(keys), 1)
+        if density * self.PROBE >= self.PROBE_HITS:
+            for checked, key in enumerate(first, 1):
+                if all(not group.isdisjoint(keys[key]) for group in others):
+                    yield key
+                if checked == self.PROBE:
+                    break
+            else:
+                return
+            self.work += self.PROBE * self.RECORD_COST
+        if order[0] not in self.unions and not self._spend(self.size(*order[0])):
+            return
+        found = self.union(*order[0])
+        for (n, i), group in zip(order[1:], others):
+            # ціна в перевірках ключа множиною: перетин з кожною множиною групи,
+            # перевірка слів записів found в Python або об'єднання групи
+            by_words = min(len(found) * len(group), self.size(n, i)) + len(group)
+            by_records = len(found) * self.RECORD_COST
+            if (n, i) in self.unions or len(group) == 1 or self.size(n, i) <= 2 * min(by_words, by_records):
+                # об'єднання знадобиться й іншим комбінаціям
+                if not self._spend(len(found) + (0 if (n, i) in self.unions else self.size(n, i))):
+                    return
+                found = found & self.union(n, i)
+            elif by_records < by_words:
+                if not self._spend(by_records):
+                    return
+                found = {key for key in found if not group.isdisjoint(keys[key])}
+            else:
+                if not self._spend(by_words):
+                    return
+                found = set().union(*(found & self.index.postings[word] for word in group))
+        yield from found
+
+    # робота з множинами на запит обмежена: комбінація, якій бракує бюджету, пропускається
+    def _spend(self, cost):
+        if self.work + cost > self.BUDGET:
+            return False
+        self.work += cost
+        return True
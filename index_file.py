@@ -0,0 +1,301 @@
+import mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date
+from itertools import islice
+
+from indexes import TrigramIndex, ExactIndex, BirthdayIndex, SortedKeys, intersect
+from persistence import atomic_write
+
+
+# файл індексів поруч зі знімком книги (Phone_Book.idx): при старті він відкривається
+# через mmap, і пошук іде прямо по сторінках файлу, без перебудови індексів у пам'яті.
+#
+# Заголовок: MAGIC, версія формату, кількість розділів, crc32 і розмір знімка, з якого
+# побудовано індекси; далі каталог розділів (назва, зміщення). Розділ - відсортовані
+# ключі (байти) і для кожного ключа зростаючі номери записів:
+#   n ключів, довжина ключів, n номерів | зміщення ключів (n + 1) x u64 |
+#   зміщення номерів (n + 1) x u64 | номери x u32 | ключі підряд
+MAGIC = b'ABIX'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+SECTION = struct.Struct('<8sQ')
+TABLE = struct.Struct('<QQQ')
+
+# триграми рахуються по байтах UTF-8: якщо запит - підрядок імені, то і його байти -
+# підрядок байтів імені, тож кандидати ті самі, а кодувати кожну триграму окремо не треба.
+#
+# ключ розділу order: ім'я в нижньому регістрі, \0, ім'я - байти UTF-8 порівнюються
+# так само, як кортежі SortedKeys.sort_key
+SEPARATOR = '\0'
+
+
+def order_key(name):
+    return (name.lower() + SEPARATOR + name).encode()
+
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % 8)
+
+
+def _table(postings):
+    keys = sorted(postings)
+    key_offsets, id_offsets, ids = array('Q', [0]), array('Q', [0]), array('I')
+    for key in keys:
+        key_offsets.append(key_offsets[-1] + len(key))
+        ids.extend(sorted(postings[key]))
+        id_offsets.append(len(ids))
+    blob = b''.join(keys)
+    return b''.join([TABLE.pack(len(keys), len(blob), len(ids)), key_offsets.tobytes(), id_offsets.tobytes(),
+                     _pad(ids.tobytes()), _pad(blob)])
+
+
+# розділи файлу зі стовпців книги (codec.BookColumns) - тих самих, з яких записано знімок
+def build(columns):
+    names, phones, emails, days = defaultdict(list), defaultdict(list), defaultdict(list), defaultdict(list)
+    name_grams, phone_grams = defaultdict(list), defaultdict(list)
+    order = defaultdict(list)
+    trigrams = TrigramIndex.trigrams
+    fromordinal = date.fromordinal
+    position = 0
+    for key, name, phone_count, birthday, email in zip(columns.ids, columns.names, columns.phone_counts,
+                                                       columns.birthdays, columns.emails):
+        names[name.encode()].append(key)
+        order[order_key(name)].append(key)
+        for gram in trigrams(name.lower().encode()):
+            name_grams[gram].append(key)
+        grams = set()
+        for phone in {phone.encode() for phone in columns.phones[position:position + phone_count]}:
+            phones[phone].append(key)
+            grams |= trigrams(phone)
+        position += phone_count
+        for gram in grams:
+            phone_grams[gram].append(key)
+        if email is not None:
+            emails[email.lower().encode()].append(key)
+        if birthday:
+            day = fromordinal(birthday)
+            days[bytes((day.month, day.day))].append(key)
+    return {'names': names, 'order': order, 'namegram': name_grams, 'phones': phones, 'phonegrm': phone_grams,
+            'emails': emails, 'birthday': days}
+
+
+def write_index(path, columns, checksum, size):
+    tables = [(name, _table(postings)) for name, postings in build(columns).items()]
+    offset = HEADER.size + SECTION.size * len(tables)
+    directory, body = [], []
+    for name, table in tables:
+        directory.append(SECTION.pack(name.encode(), offset))
+        body.append(table)
+        offset += len(table)
+    atomic_write(path, b''.join([HEADER.pack(MAGIC, VERSION, len(tables), checksum, size)] + directory + body))
+
+
+# відсортовані ключі розділу як послідовність для bisect
+class _Keys:
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, i):
+        return self.table.key(i)
+
+
+class Table:
+    def __init__(self, view, offset):
+        count, blob_length, id_count = TABLE.unpack_from(view, offset)
+        offset += TABLE.size
+        self.key_offsets = view[offset:offset + 8 * (count + 1)].cast('Q')
+        offset += 8 * (count + 1)
+        self.id_offsets = view[offset:offset + 8 * (count + 1)].cast('Q')
+        offset += 8 * (count + 1)
+        self.ids = view[offset:offset + 4 * id_count].cast('I')
+        offset += 4 * id_count + (-4 * id_count % 8)
+        self.blob = view[offset:offset + blob_length]
+        self.keys = _Keys(self)
+
+    def __len__(self):
+        return len(self.key_offsets) - 1
+
+    def key(self, i):
+        return bytes(self.blob[self.key_offsets[i]:self.key_offsets[i + 1]])
+
+    def find(self, key):
+        i = bisect_left(self.keys, key)
+        return i if i < len(self) and self.key(i) == key else -1
+
+    # зростаючі номери записів з цим ключем (зріз файлу, без копіювання)
+    def get(self, key):
+        i = self.find(key)
+        if i < 0:
+            return self.ids[0:0]
+        return self.ids[self.id_offsets[i]:self.id_offsets[i + 1]]
+
+    def release(self):
+        for view in (self.key_offsets, self.id_offsets, self.ids, self.blob):
+            view.release()
+
+
+class IndexFile:
+    def __init__(self, file, buffer):
+        self.file = file
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+        _, _, count, _, _ = HEADER.unpack_from(buffer)
+        self.tables = {}
+        for i in range(count):
+            name, offset = SECTION.unpack_from(buffer, HEADER.size + i * SECTION.size)
+            self.tables[name.rstrip(b'\0').decode()] = Table(self.view, offset)
+
+    # None, якщо файлу немає, він іншої версії або побудований з іншого знімка
+    @classmethod
+    def open(cls, path, checksum, size):
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # порожній файл
+            file.close()
+            return None
+        header = HEADER.unpack_from(buffer) if len(buffer) >= HEADER.size else None
+        if header is None or header[:2] != (MAGIC, VERSION) or header[3:] != (checksum, size):
+            buffer.close()
+            file.close()
+            return None
+        return cls(file, buffer)
+
+    def close(self):
+        for table in self.tables.values():
+            table.release()
+        self.view.release()
+        self.buffer.close()
+        self.file.close()
+
+
+# індекси з файлу з тими самими методами, що й ExactIndex, TrigramIndex, BirthdayIndex
+# і SortedKeys. Файл лише для читання: записи, змінені чи видалені після читання,
+# ховаються з його таблиць (changed), а їхні нові версії лежать у звичайному індексі
+# в пам'яті (memory). Зміна коштує як в індексі в пам'яті, без перебудови всієї книги
+class _Delta:
+    def __init__(self, memory):
+        self.memory = memory
+        self.changed = set()
+
+    def add(self, key, record):
+        self.changed.add(key)
+        self.memory.update(key, record)
+
+    def update(self, key, record):
+        self.add(key, record)
+
+    def remove(self, key):
+        self.changed.add(key)
+        self.memory.remove(key)
+
+    # номери з таблиці файлу, крім змінених
+    def _unchanged(self, ids):
+        changed = self.changed
+        if not changed:
+            return set(ids)
+        return {key for key in ids if key not in changed}
+
+
+class DiskExact(_Delta):
+    def __init__(self, table, values):
+        super().__init__(ExactIndex(values))
+        self.table = table
+
+    @property
+    def owners(self):
+        table, changed = self.table, self.changed
+        values = set(self.memory.owners)
+        for i in range(len(table)):
+            ids = table.ids[table.id_offsets[i]:table.id_offsets[i + 1]]
+            if not changed or any(key not in changed for key in ids):
+                values.add(table.key(i).decode())
+        return values
+
+    def get(self, value):
+        return self._unchanged(self.table.get(value.encode())) | self.memory.get(value)
+
+
+class DiskTrigrams(_Delta):
+    def __init__(self, table, order, texts):
+        super().__init__(TrigramIndex(texts))
+        self.table = table
+        self.order = order
+
+    def candidates(self, query):
+        return self._disk_candidates(query) | self.memory.candidates(query)
+
+    def _disk_candidates(self, query):
+        postings = []
+        for gram in TrigramIndex.trigrams(query.encode()):
+            ids = self.table.get(gram)
+            if not len(ids):
+                return set()
+            postings.append(ids)
+        if not postings:
+            return self._unchanged(self.order.ids)
+        found = intersect(postings)
+        return found - self.changed if self.changed else found
+
+
+class DiskBirthdays(_Delta):
+    def __init__(self, table):
+        super().__init__(BirthdayIndex())
+        self.table = table
+
+    def get(self, month, day):
+        return self._unchanged(self.table.get(bytes((month, day)))) | self.memory.get(month, day)
+
+
+class DiskSortedKeys(_Delta):
+    def __init__(self, table, name):
+        super().__init__(SortedKeys(name))
+        self.table = table
+
+    def slice(self, size, offset=0, after=None):
+        table = self.table
+        start = self._position(*after) if after is not None else offset
+        if not self.changed:
+            return table.ids[start:start + size].tolist()
+        # змінені записи беруться з пам'яті і зливаються з таблицею файлу; зсув рахується
+        # по злитій послідовності, тож сторінки з offset проходять її від початку
+        if after is not None:
+            merged = self._merge(start, bisect_right(self.memory.order, SortedKeys.sort_key(*after)))
+            return list(islice(merged, size))
+        return list(islice(self._merge(0, 0), offset, offset + size))
+
+    # позиція в таблиці одразу після запису (ім'я, номер)
+    def _position(self, name, key):
+        table = self.table
+        encoded = order_key(name)
+        i = bisect_left(table.keys, encoded)
+        if i < len(table) and table.key(i) == encoded:
+            return bisect_right(table.ids, key, table.id_offsets[i], table.id_offsets[i + 1])
+        return table.id_offsets[i]
+
+    # записи з пам'яті стають на свої позиції в таблиці: двійковий пошук на кожен з них,
+    # а не порівняння з кожним записом файлу
+    def _merge(self, start, j):
+        ids, changed = self.table.ids, self.changed
+        i = start
+        for _, name, key in self.memory.order[j:]:
+            position = self._position(name, key)
+            while i < position:
+                if ids[i] not in changed:
+                    yield ids[i]
+                i += 1
+            yield key
+        while i < len(ids):
+            if ids[i] not in changed:
+                yield ids[i]
+            i += 1
@@ -0,0 +1,241 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+
+# індекс по триграмах: для кожних трьох символів підряд зберігає ключі записів,
+# у тексті яких вони зустрічаються. Ключі - номери записів у зростаючому масиві u32:
+# множина Python на кожну триграму займала в десяток разів більше
+class TrigramIndex:
+    def __init__(self, texts):
+        # texts(record) повертає рядки запису, які треба індексувати
+        self.texts = texts
+        self.grams = {}
+        # ключ -> проіндексовані рядки; триграми для видалення рахуються з них заново,
+        # а не зберігаються множиною на кожен запис
+        self.keys = {}
+
+    @staticmethod
+    def trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _grams(self, texts):
+        if len(texts) == 1:
+            return self.trigrams(texts[0])
+        grams = set()
+        for text in texts:
+            grams |= self.trigrams(text)
+        return grams
+
+    def add(self, key, record):
+        texts = tuple(self.texts(record))
+        self.keys[key] = texts
+        grams = self.grams
+        for gram in self._grams(texts):
+            keys = grams.get(gram)
+            if keys is None:
+                grams[gram] = array('I', (key,))
+            elif keys[-1] < key:
+                # нові записи отримують найбільший номер: зазвичай просто в кінець
+                keys.append(key)
+            else:
+                i = bisect_left(keys, key)
+                if i == len(keys) or keys[i] != key:
+                    keys.insert(i, key)
+
+    def update(self, key, record):
+        self.remove(key)
+        self.add(key, record)
+
+    def remove(self, key):
+        texts = self.keys.pop(key, None)
+        if texts is None:
+            return
+        for gram in self._grams(texts):
+            keys = self.grams.get(gram)
+            if keys is None:
+                continue
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+                if not keys:
+                    del self.grams[gram]
+
+    def clear(self):
+        self.grams.clear()
+        self.keys.clear()
+
+    # ключі, в яких є всі триграми запиту; підрядок ще треба перевірити
+    def candidates(self, query):
+        postings = []
+        for gram in self.trigrams(query):
+            keys = self.grams.get(gram)
+            if not keys:
+                return set()
+            postings.append(keys)
+        if not postings:
+            return set(self.keys)
+        return intersect(postings)
+
+
+def _contains(keys, key):
+    i = bisect_left(keys, key)
+    return i < len(keys) and keys[i] == key
+
+
+# перетин зростаючих списків ключів, від найкоротшого
+def intersect(postings):
+    postings = sorted(postings, key=len)
+    result = set(postings[0])
+    for keys in postings[1:]:
+        # кілька кандидатів простіше знайти двійковим пошуком, ніж робити множину з довгого списку
+        if len(result) * 16 < len(keys):
+            result = {key for key in result if _contains(keys, key)}
+        else:
+            result &= set(keys)
+        if not result:
+            break
+    return result
+
+
+# точне значення -> ключі записів (телефон, email); одне значення може бути у кількох записів.
+# Більшість значень належить одному запису: тоді замість множини зберігається сам ключ
+class ExactIndex:
+    def __init__(self, values):
+        # values(record) повертає значення запису, які треба індексувати
+        self.values = values
+        self.owners = {}
+        self.keys = {}
+
+    def add(self, key, record):
+        values = tuple(set(self.values(record)))
+        self.keys[key] = values
+        owners = self.owners
+        for value in values:
+            keys = owners.get(value)
+            if keys is None:
+                owners[value] = key
+            elif isinstance(keys, set):
+                keys.add(key)
+            elif keys != key:
+                owners[value] = {keys, key}
+
+    def update(self, key, record):
+        self.remove(key)
+        self.add(key, record)
+
+    def remove(self, key):
+        owners = self.owners
+        for value in self.keys.pop(key, ()):
+            keys = owners.get(value)
+            if isinstance(keys, set):
+                keys.discard(key)
+                if len(keys) == 1:
+                    owners[value] = next(iter(keys))
+            elif keys == key:
+                del owners[value]
+
+    def clear(self):
+        self.owners.clear()
+        self.keys.clear()
+
+    def get(self, value):
+        keys = self.owners.get(value)
+        if keys is None:
+            return set()
+        return set(keys) if isinstance(keys, set) else {keys}
+
+
+# календар днів народження: (місяць, день) -> ключі записів
+class BirthdayIndex:
+    def __init__(self):
+        self.days = defaultdict(set)
+        self.keys = {}
+
+    def add(self, key, record):
+        if record.birthday is None:
+            return
+        day = (record.birthday.value.month, record.birthday.value.day)
+        self.keys[key] = day
+        self.days[day].add(key)
+
+    def update(self, key, record):
+        self.remove(key)
+        self.add(key, record)
+
+    def remove(self, key):
+        day = self.keys.pop(key, None)
+        if day is None:
+            return
+        keys = self.days[day]
+        keys.discard(key)
+        if not keys:
+            del self.days[day]
+
+    def clear(self):
+        self.days.clear()
+        self.keys.clear()
+
+    def get(self, month, day):
+        return self.days.get((month, day), set())
+
+
+# ключі, впорядковані за іменем без урахування регістру, для посторінкового перегляду;
+# однакові імена йдуть у порядку ключів
+class SortedKeys:
+    def __init__(self, name):
+        # name(record) повертає ім'я, за яким сортуються записи
+        self.name = name
+        self.order = []
+        self.keys = {}
+
+    @staticmethod
+    def sort_key(name, key):
+        return (name.lower(), name, key)
+
+    def add(self, key, record):
+        item = self.sort_key(self.name(record), key)
+        if self.keys.get(key) == item:
+            return
+        self.remove(key)
+        self.keys[key] = item
+        insort(self.order, item)
+
+    # побудова з нуля: одне сортування замість insort на кожен запис
+    def add_all(self, items):
+        for key, record in items:
+            self.keys[key] = self.sort_key(self.name(record), key)
+        self.order = sorted(self.keys.values())
+
+    # після перейменування запис переїжджає на нове місце
+    def update(self, key, record):
+        self.add(key, record)
+
+    def remove(self, key):
+        item = self.keys.pop(key, None)
+        if item is not None:
+            del self.order[bisect_left(self.order, item)]
+
+    def clear(self):
+        self.order.clear()
+        self.keys.clear()
+
+    # size ключів, починаючи з offset або одразу після запису (ім'я, ключ) after
+    def slice(self, size, offset=0, after=None):
+        if after is not None:
+            offset = bisect_right(self.order, self.sort_key(*after))
+        return [item[2] for item in self.order[offset:offset + size]]
+
+
+# токен сторінки - "ключ:ім'я" останнього запису на ній; токен зі старих версій
+# (просто ім'я) означає "після всіх записів з цим ім'ям"
+def page_token(key, name):
+    return f'{key}:{name}'
+
+
+def parse_page_token(token):
+    key, separator, name = token.partition(':')
+    if separator and key.isdigit():
+        return name, int(key)
+    return token, math.inf
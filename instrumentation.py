@@ -0,0 +1,230 @@
+# необов'язкові заміри часу для сеансів у проді:
+#   ASSISTANT_PROFILE=profile.json python main.py      таймери і лічильники, зведення в JSON при виході
+#   ASSISTANT_CPROFILE=profile.prof python main.py     ще й дамп cProfile (python -m pstats profile.prof)
+#
+# Без цих змінних нічого не обгортається і не сповільнюється. Інакше install() обгортає
+# методи AddressBook, Notebook, SQLite-сховища, запис у фоні та кодування знімків, а
+# install_ui() - меню assistant_bot і вивід таблиць rich. Час очікування введення
+# (input, prompt, questionary) рахується окремо і віднімається з часу меню: busy_ms -
+# скільки програма працювала сама, total_ms - разом з людиною за клавіатурою
+import atexit
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+
+SUMMARY = os.environ.get('ASSISTANT_PROFILE')
+CPROFILE = os.environ.get('ASSISTANT_CPROFILE')
+enabled = bool(SUMMARY or CPROFILE)
+
+# назва -> [викликів, загальний час, час без очікування введення, найдовший виклик]
+_timers = {}
+# назва -> [разів, байтів усього, найбільше]
+_sizes = {}
+# назва -> функція, що повертає поточне значення лічильника (None - лічильника немає)
+_counters = {}
+_lock = threading.Lock()
+# скільки цей потік уже чекав на введення
+_local = threading.local()
+_started = time.perf_counter()
+_profiler = None
+_installed = set()
+
+
+def _waited():
+    return getattr(_local, 'waited', 0.0)
+
+
+def _add_time(name, elapsed, busy):
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            _timers[name] = [1, elapsed, busy, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += busy
+            stats[3] = max(stats[3], elapsed)
+
+
+def add_size(name, size):
+    with _lock:
+        stats = _sizes.get(name)
+        if stats is None:
+            _sizes[name] = [1, size, size]
+        else:
+            stats[0] += 1
+            stats[1] += size
+            stats[2] = max(stats[2], size)
+
+
+# лічильники, які об'єкти ведуть самі, читаються тільки під час зведення
+def add_counter(name, read):
+    with _lock:
+        _counters[name] = read
+
+
+# обгортка, що міряє function; size(args, result) - розмір даних виклику в байтах,
+# wait=True - функція чекає на людину, її час не входить у busy_ms того, хто її викликав
+def timed(name, function, size=None, wait=False):
+    if inspect.isgeneratorfunction(function):
+        return _timed_generator(name, function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        waited = _waited()
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if wait:
+                _local.waited = waited + elapsed
+                _add_time(name, elapsed, 0.0)
+            else:
+                _add_time(name, elapsed, elapsed - (_waited() - waited))
+        if size is not None:
+            add_size(name, size(args, result))
+        return result
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+# генератор працює не під час виклику, а під час перебору: міряється час усередині
+# кожного next(), без часу того, хто перебирає; це один виклик, коли перебір закінчено
+# або покинуто. Генератор, який так і не почали перебирати, не рахується
+def _timed_generator(name, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        generator = function(*args, **kwargs)
+        elapsed = busy = 0.0
+        try:
+            while True:
+                waited = _waited()
+                start = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    step = time.perf_counter() - start
+                    elapsed += step
+                    busy += step - (_waited() - waited)
+                yield item
+        finally:
+            generator.close()
+            _add_time(name, elapsed, busy)
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+# для ділянок коду, які не є окремою функцією
+class timer:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.waited = _waited()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _add_time(self.name, elapsed, elapsed - (_waited() - self.waited))
+        return False
+
+
+def _patch(owner, attribute, name, **options):
+    function = getattr(owner, attribute)
+    if not getattr(function, '__instrumented__', False):
+        setattr(owner, attribute, timed(name, function, **options))
+
+
+# публічні методи, оголошені в самому класі (успадковані обгортаються у батька), і private
+def _patch_class(cls, prefix, private=()):
+    for attribute, value in list(vars(cls).items()):
+        if inspect.isfunction(value) and (not attribute.startswith('_') or attribute in private):
+            _patch(cls, attribute, f'{prefix}.{cls.__name__}.{attribute}')
+
+
+def install():
+    global _profiler
+    if not enabled or 'model' in _installed:
+        return
+    _installed.add('model')
+    import record
+    from journal import Journal
+    from persistence import WriteBehind
+
+    _patch_class(record.AddressBook, 'book', private=('_rebuild_indexes', '_use_index_file', '_write_journal',
+                                                      '_compact'))
+    _patch_class(record.Notebook, 'notes', private=('_write_notes',))
+    _patch(record, '_dump_book', 'snapshot.book.dump', size=lambda args, result: len(result))
+    _patch(record, '_load_book', 'snapshot.book.load', size=lambda args, result: len(args[0]))
+    _patch(record, '_dump_notes', 'snapshot.notes.dump', size=lambda args, result: len(result))
+    _patch(record, '_load_notes', 'snapshot.notes.load', size=lambda args, result: len(args[0]))
+    _patch(Journal, 'append', 'journal.append')
+    _patch(WriteBehind, 'flush', 'persistence.flush')
+    # скільки разів refresh обійшовся без перечитування файлу книги
+    add_counter('book.cache_hits', lambda: getattr(record._phone_book, 'cache_hits', None))
+    add_counter('book.cache_misses', lambda: getattr(record._phone_book, 'cache_misses', None))
+    if record.use_sqlite():
+        import sqlite_storage
+        _patch_class(sqlite_storage.SQLiteAddressBook, 'book')
+        _patch_class(sqlite_storage.SQLiteNotebook, 'notes')
+    if CPROFILE:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(_export)
+
+
+def install_ui():
+    if not enabled or 'ui' in _installed:
+        return
+    install()
+    _installed.add('ui')
+    import builtins
+    import questionary
+    from rich.console import Console
+    import assistant_bot
+
+    for cls in vars(assistant_bot).values():
+        if inspect.isclass(cls) and cls.__module__ == 'assistant_bot':
+            _patch_class(cls, 'menu')
+    _patch(Console, 'print', 'render.print')
+    _patch(builtins, 'input', 'input.input', wait=True)
+    _patch(assistant_bot, 'prompt', 'input.prompt', wait=True)
+    _patch(questionary.Question, 'ask', 'input.questionary', wait=True)
+
+
+def summary():
+    with _lock:
+        timers = {name: {'calls': calls, 'total_ms': round(total * 1000, 3), 'busy_ms': round(busy * 1000, 3),
+                         'max_ms': round(longest * 1000, 3)}
+                  for name, (calls, total, busy, longest) in _timers.items()}
+        sizes = {name: {'count': count, 'total_bytes': total, 'max_bytes': largest}
+                 for name, (count, total, largest) in _sizes.items()}
+        counters = {name: read() for name, read in _counters.items()}
+    return {
+        'argv': sys.argv,
+        'session_s': round(time.perf_counter() - _started, 3),
+        # найдорожчі першими
+        'timers': dict(sorted(timers.items(), key=lambda item: -item[1]['busy_ms'])),
+        'sizes': sizes,
+        'counters': {name: value for name, value in counters.items() if value is not None},
+    }
+
+
+def _export():
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(CPROFILE)
+    if SUMMARY:
+        import json
+        with open(SUMMARY, 'w') as file:
+            json.dump(summary(), file, indent=2)
@@ -0,0 +1,62 @@
+import os
+import pickle
+
+
+# журнал змін адресної книги: кожна зміна дописується в кінець файлу,
+# а не переписує всю книгу
+class Journal:
+    def __init__(self, path):
+        self.path = path
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    # одна пачка змін = один pickle, тож пачка або читається повністю, або відкидається
+    @staticmethod
+    def dump(entries):
+        return pickle.dumps(entries)
+
+    # data - одна чи кілька пачок з dump() підряд
+    def append(self, data: bytes):
+        with open(self.path, 'ab') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def replay(self):
+        try:
+            file = open(self.path, 'r+b')
+        except FileNotFoundError:
+            return
+        with file:
+            while True:
+                good = file.tell()
+                try:
+                    entries = pickle.load(file)
+                except EOFError:
+                    return
+                except (pickle.UnpicklingError, AttributeError, ValueError, IndexError):
+                    # обірваний запис у кінці файлу після збою: відрізаємо його,
+                    # щоб наступні пачки не опинились за ним
+                    file.truncate(good)
+                    return
+                yield from entries
+
+    # залишає в журналі тільки те, що було дописано після offset
+    def drop_head(self, offset):
+        if not os.path.isfile(self.path):
+            return
+        tmp = self.path + '.tmp'
+        with open(self.path, 'rb') as src, open(tmp, 'wb') as dst:
+            src.seek(offset)
+            while True:
+                chunk = src.read(1 << 20)
+                if not chunk:
+                    break
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp, self.path)
@@ -0,0 +1,37 @@
+# переносить Phone_Book.bin (разом із журналом) і Save_Notes.bin у базу SQLite
+# запуск: python migrate_to_sqlite.py [--book Phone_Book.bin] [--notes Save_Notes.bin] [--db Phone_Book.db]
+import argparse
+
+from record import AddressBook, Notebook
+from sqlite_storage import SQLiteAddressBook, SQLiteNotebook
+
+
+def migrate(book_file, notes_file, db_file):
+    book = AddressBook()
+    book.file = book_file
+    book.read_from_file()
+    sqlite_book = SQLiteAddressBook(db_file)
+    # одна транзакція на весь перенос замість коміту на кожен запис
+    with sqlite_book.transaction():
+        for record in book.data.values():
+            sqlite_book.add_record(record)
+
+    notebook = Notebook()
+    notebook.file = notes_file
+    notebook.read_from_file()
+    sqlite_notes = SQLiteNotebook(db_file)
+    # нотатки зберігають свої номери, тож повторний перенос нічого не дублює
+    with sqlite_notes.transaction():
+        for note in notebook:
+            sqlite_notes.put_note(note)
+    return len(book), len(notebook)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import pickle files into the SQLite storage.')
+    parser.add_argument('--book', default='Phone_Book.bin')
+    parser.add_argument('--notes', default='Save_Notes.bin')
+    parser.add_argument('--db', default='Phone_Book.db')
+    args = parser.parse_args()
+    contacts, notes = migrate(args.book, args.notes, args.db)
+    print(f'Imported {contacts} contacts and {notes} notes into {args.db}.')
@@ -0,0 +1,62 @@
+import atexit
+import os
+import threading
+
+
+# запис через тимчасовий файл: після збою на диску лишається або старий, або новий файл
+def atomic_write(path, data: bytes):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, path)
+
+
+# фоновий запис на диск: збереження не блокує меню, а повторні збереження
+# того самого об'єкта, що ще чекають у черзі, зливаються в одне
+class WriteBehind:
+    def __init__(self):
+        self._jobs = {}
+        self._busy = False
+        self._error = None
+        self._thread = None
+        self._condition = threading.Condition()
+
+    def submit(self, key, job):
+        with self._condition:
+            self._jobs[key] = job
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._jobs:
+                    self._condition.wait()
+                key = next(iter(self._jobs))
+                job = self._jobs.pop(key)
+                self._busy = True
+            try:
+                job()
+            except Exception as error:
+                self._error = error
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    # чекає, поки все з черги буде записано на диск
+    def flush(self):
+        with self._condition:
+            while self._jobs or self._busy:
+                self._condition.wait()
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+
+persister = WriteBehind()
+atexit.register(persister.flush)
@@ -1,221 +1,990 @@
 from collections import UserDict, defaultdict
+import calendar
 import cmd
+import gc
 from datetime import date, datetime, timedelta
 import pickle
 import os
 import re
-from prompt_toolkit import prompt
-from prompt_toolkit.completion import WordCompleter
-from rich.console import Console
-from rich.table import Table
-
-
+import threading
+import zlib
+from contextlib import contextmanager
+import codec
+from journal import Journal
+from persistence import atomic_write, persister
+from fuzzy import FuzzyIndex
+from fulltext import TextIndex
+from indexes import TrigramIndex, ExactIndex, BirthdayIndex, SortedKeys, page_token, parse_page_token
+from index_file import IndexFile, DiskExact, DiskTrigrams, DiskBirthdays, DiskSortedKeys, write_index
+
+
+# __slots__ замість __dict__: на мільйонах контактів це суттєво менше пам'яті
 class Field:
+    __slots__ = ('_value',)
+
     def __init__(self, value):
-        self.__value = None
+        self._value = None
         self.value = value
 
+    def __getstate__(self):
+        return (self._value,)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # файли, збережені до __slots__: значення лежить у _<Клас>__value
+            values = [v for k, v in state.items() if k.endswith('__value') and v is not None]
+            state = (values[-1] if values else None,)
+        self._value = state[0]
+
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, value):
-        self.__value = value
+        self._value = value
 
     def __str__(self):
-        return str(self.__value)
+        return str(self._value)
 
 
 class Name(Field):
-    pass
+    __slots__ = ()
+
 
 class Address(Field):
+    __slots__ = ()
+
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, value: str):
-        self.__value = value
+        self._value = value
 
     def __str__(self):
-        return str(self.__value)
+        return str(self._value)
 
 
 class Email(Field):
+    __slots__ = ()
+
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, value: str):
         pattern = r"^[a-zA-Z0-9._]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
         if (bool(re.search(pattern, value))) is False:
             raise ValueError('\033[91mInvalid email format.\033[0m')
-        self.__value = value
+        self._value = value
 
     def __str__(self):
-        return str(self.__value)
+        return str(self._value)
 
 
 class Birthday(Field):
+    __slots__ = ()
+
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, value: str):
         try:
-            self.__value = datetime.strptime(value, '%Y.%m.%d').date()
+            self._value = datetime.strptime(value, '%Y.%m.%d').date()
         except ValueError:
             raise ValueError('\033[91mInvalid date format. Correct format: YYYY.MM.DD\033[0m')
 
     def __str__(self):
-        return self.__value.strftime('%Y.%m.%d')
+        return self._value.strftime('%Y.%m.%d')
     
 
 
 class Phone(Field):
+    __slots__ = ()
+
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, value):
         if len(value) != 10 or not value.isdigit():
             raise ValueError('\033[91mThe phone number should be digits only and have 10 symbols.\033[0m')
-        self.__value = value
+        self._value = value
 
     def __str__(self):
-        return(str(self.__value))
+        return(str(self._value))
+
+
+# дата дня народження в заданому році; 29 лютого в невисокосний рік святкуємо 28-го
+def birthday_in_year(birthday: date, year: int):
+    if birthday.month == 2 and birthday.day == 29 and not calendar.isleap(year):
+        return date(year, 2, 28)
+    return birthday.replace(year=year)
+
+
+# поле з уже перевіреним значенням, без валідатора
+def _field(cls, value):
+    field = object.__new__(cls)
+    field._value = value
+    return field
+
+
+# звідки береться сьогоднішня дата; у тестах можна підмінити: record.clock = lambda: date(2024, 2, 29)
+clock = date.today
 
 
 class Record:
+    # id - постійний номер запису, його видає AddressBook і він не змінюється при перейменуванні;
+    # _book - книга, в якій лежить запис; _birthday_cache - (сьогодні, дата народження,
+    # наступний день народження) у вигляді ordinal; обидва не зберігаються у файл
+    __slots__ = ('id', 'name', 'phones', 'birthday', 'email', 'address', '_book', '_birthday_cache')
+
     def __init__(self, name: str):
+        self.id = None
         self.name = Name(name)
         self.phones = []
         self.birthday = None
         self.email = None
         self.address = None
+        self._book = None
+        self._birthday_cache = None
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot not in ('_book', '_birthday_cache')}
+
+    def __setstate__(self, state):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+    # перед зміною на місці: книга запам'ятовує старий стан запису для відкату транзакції
+    def _changing(self):
+        if self._book is not None:
+            self._book.remember(self)
+
+    # повідомляє книгу, щоб вона оновила індекси цього запису
+    def _changed(self):
+        if self._book is not None:
+            self._book.reindex(self)
+
+    def rename(self, name: str):
+        self._changing()
+        self.name.value = name
+        self._changed()
 
     def add_phone(self, value: str):
         phone = Phone(value)
+        self._changing()
         self.phones.append(phone)
+        self._changed()
 
     def add_email(self, value: str):
-        self.email = Email(value)
+        email = Email(value)
+        self._changing()
+        self.email = email
+        self._changed()
+
+    def remove_email(self):
+        self._changing()
+        self.email = None
+        self._changed()
 
     def add_address(self, value: str):
-        self.address = Address(value)
+        address = Address(value)
+        self._changing()
+        self.address = address
+        self._changed()
 
     def add_birthday(self, birthday: str):
-        self.birthday = Birthday(birthday)
+        birthday = Birthday(birthday)
+        self._changing()
+        self.birthday = birthday
+        self._birthday_cache = None
+        self._changed()
+
+    def remove_birthday(self):
+        self._changing()
+        self.birthday = None
+        self._birthday_cache = None
+        self._changed()
 
     def remove_phone(self, phone: str):
         for item in self.phones:
             if item.value == phone:
+                self._changing()
                 self.phones.remove(item)
+                self._changed()
                 return f'The phone number: {phone} has been deleted.'
         return f'The phone number {phone} not found.'
 
     def edit_phone(self, old_phone: str, new_phone: str):
         for phone in self.phones:
             if phone.value == old_phone:
+                self._changing()
                 phone.value = new_phone
+                self._changed()
                 return f'Phones: {"; ".join(p.value for p in self.phones)}'
         return None
 
+    # стан полів для відкату транзакції; ім'я і телефони змінюються на місці, тож
+    # зберігаються їхні значення, а не самі об'єкти
+    def _state(self):
+        return self.name.value, [phone.value for phone in self.phones], self.birthday, self.email, self.address
+
+    def _restore(self, state):
+        name, phones, self.birthday, self.email, self.address = state
+        self.name = _field(Name, name)
+        self.phones = [_field(Phone, value) for value in phones]
+        self._birthday_cache = None
+
     def find_phone(self, phone: str):
         for item in self.phones:
             if item.value == phone:
                 return item
         return None
 
-    #  показывает сколько дней до дня рождения
-    def days_to_birthday(self):
+    # наступний день народження (ordinal); рахується раз на день, поки дата народження та сама
+    def next_birthday(self, date_today=None):
         if self.birthday is None:
             return None
-        date_today = date.today()
-        birthday_date = self.birthday.value.replace(year=date_today.year)
-        if date_today == birthday_date:
-            return 'Birthday today'
-        if birthday_date <= date_today - timedelta(days=1):
-            birthday_date = birthday_date.replace(year=date_today.year + 1)
-        day_to_birthday = (birthday_date - date_today).days
-        return day_to_birthday
+        date_today = date_today or clock()
+        today, born = date_today.toordinal(), self.birthday.value
+        cache = self._birthday_cache
+        if cache is not None and cache[0] == today and cache[1] == born:
+            return cache[2]
+        birthday_date = birthday_in_year(born, date_today.year)
+        if birthday_date < date_today:
+            birthday_date = birthday_in_year(born, date_today.year + 1)
+        self._birthday_cache = (today, born, birthday_date.toordinal())
+        return self._birthday_cache[2]
+
+    #  показывает сколько дней до дня рождения
+    def days_to_birthday(self, date_today=None):
+        date_today = date_today or clock()
+        next_birthday = self.next_birthday(date_today)
+        if next_birthday is None:
+            return None
+        day_to_birthday = next_birthday - date_today.toordinal()
+        return day_to_birthday or 'Birthday today'
 
     def __str__(self):
         
         return f'{self.name.value}, {"; ".join(p.value for p in self.phones)}, {self.birthday}, {self.email}, {self.address}, {self.days_to_birthday()}'
 
+# що індексується з кожного запису: ті самі функції для індексів у пам'яті і поверх файлу
+def _name(record):
+    return [record.name.value]
+
+
+def _lower_name(record):
+    return [record.name.value.lower()]
+
+
+def _phones(record):
+    return [phone.value for phone in record.phones]
+
+
+def _email(record):
+    return [record.email.value.lower()] if record.email else []
+
+
 class AddressBook(UserDict):
+    # журнал стискається у знімок, коли стає більшим за знімок (але не раніше ніж 1 МБ)
+    compact_min_bytes = 1 << 20
+    # файл індексів пишеться разом зі знімком для книг, які довго індексувати при старті
+    index_min_records = 10000
+
     def __init__(self):
         super().__init__()
         self.file = 'Phone_Book.bin'
+        # незбережені зміни: ключ -> останній запис журналу для нього
+        self._pending = {}
+        self._depth = 0
+        # на час транзакції: номер -> (запис, його стан до першої зміни в ній), None - запису не було
+        self._undo = None
+        # стискання, відкладене до кінця транзакції
+        self._compact_later = False
+        # пачки змін, передані на фоновий запис, і скільки з них ще не на диску
+        self._unsaved = []
+        self._in_flight = 0
+        self._compacting = False
+        self._lock = threading.Lock()
+        self._signature = None
+        # скільки разів refresh обійшовся без читання файлу; instrumentation.py показує їх у зведенні
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.next_id = 1
+        # відкритий файл індексів (Phone_Book.idx), якщо індекси читаються з нього
+        self._index_file = None
+        self._new_indexes()
+        # змінюється при кожній зміні книги, щоб кеші знали, коли перебудуватись
+        self.version = 0
+        self._birthday_columns = None
+
+    def _new_indexes(self):
+        # ім'я -> номери записів; однакових імен може бути кілька
+        self._names = ExactIndex(_name)
+        self._name_index = TrigramIndex(_lower_name)
+        # пошук з помилками будується при першому виклику fuzzy_search
+        self._fuzzy_index = None
+        self._phone_index = TrigramIndex(_phones)
+        self._phone_owners = ExactIndex(_phones)
+        self._email_owners = ExactIndex(_email)
+        self._birthday_index = BirthdayIndex()
+        self._sorted_keys = SortedKeys(lambda record: record.name.value)
+        self._indexes = [self._names, self._name_index, self._phone_index, self._phone_owners,
+                         self._email_owners, self._birthday_index, self._sorted_keys]
 
-    def add_record(self, record: Record):
-        self.data[record.name.value] = record
+    @property
+    def journal(self):
+        return Journal(os.path.splitext(self.file)[0] + '.journal')
 
+    @property
+    def index_path(self):
+        return os.path.splitext(self.file)[0] + '.idx'
+
+    # новий запис отримує наступний номер; запис, що вже має номер, замінює запис з цим номером.
+    # Номер видається тільки після перевірки, чи не дописав файли інший процес: інакше
+    # його новий запис і цей отримали б однаковий номер
+    def add_record(self, record: Record):
+        if record.id is None:
+            # книга, що ще не читала й не писала файлів, - просто книга в пам'яті
+            if self._signature is not None and not self._depth:
+                self.refresh()
+            record.id = self.next_id
+        self.next_id = max(self.next_id, record.id + 1)
+        key = record.id
+        self._remember(key)
+        old = self.data.get(key)
+        if old is not None and old is not record:
+            old._book = None
+        self.data[key] = record
+        record._book = self
+        self._index(key, record)
+        self._pending[key] = ('put', key, record)
+
+    def remember(self, record: Record):
+        if self.data.get(record.id) is record:
+            self._remember(record.id)
+
+    def _remember(self, key):
+        if self._undo is not None and key not in self._undo:
+            record = self.data.get(key)
+            self._undo[key] = None if record is None else (record, record._state())
+
+    # запис змінився на місці (add_phone, rename, ...): нові індекси і запис у журнал
+    def reindex(self, record: Record):
+        key = record.id
+        if key is not None and self.data.get(key) is record:
+            self._index(key, record)
+            self._pending[key] = ('put', key, record)
+
+    def _index(self, key, record):
+        self.version += 1
+        for index in self._indexes:
+            index.update(key, record)
+
+    def _rebuild_indexes(self):
+        self._close_index_file()
+        self.version += 1
+        self._new_indexes()
+        # індекси з add_all будуються одним викликом: їм потрібне одне сортування в кінці
+        bulk = [index for index in self._indexes if hasattr(index, 'add_all')]
+        indexes = [index for index in self._indexes if index not in bulk]
+        for key, record in self.data.items():
+            record._book = self
+            for index in indexes:
+                index.add(key, record)
+        for index in bulk:
+            index.add_all(self.data.items())
+
+    # індекси читаються прямо з файлу, зміни книги лягають поверх нього в пам'яті;
+    # пошук з помилками будується при першому виклику
+    def _use_index_file(self, index_file):
+        self._close_index_file()
+        self.version += 1
+        self._index_file = index_file
+        tables = index_file.tables
+        self._names = DiskExact(tables['names'], _name)
+        self._name_index = DiskTrigrams(tables['namegram'], tables['order'], _lower_name)
+        self._fuzzy_index = None
+        self._phone_index = DiskTrigrams(tables['phonegrm'], tables['order'], _phones)
+        self._phone_owners = DiskExact(tables['phones'], _phones)
+        self._email_owners = DiskExact(tables['emails'], _email)
+        self._birthday_index = DiskBirthdays(tables['birthday'])
+        self._sorted_keys = DiskSortedKeys(tables['order'], lambda record: record.name.value)
+        self._indexes = [self._names, self._name_index, self._phone_index, self._phone_owners, self._email_owners,
+                         self._birthday_index, self._sorted_keys]
+        for record in self.data.values():
+            record._book = self
+
+    def _close_index_file(self):
+        if self._index_file is not None:
+            index_file, self._index_file = self._index_file, None
+            index_file.close()
+
+    def _sort_key(self, key):
+        return SortedKeys.sort_key(self.data[key].name.value, key)
+
+    # перший (найстаріший) запис з цим ім'ям
     def find(self, name: str):
-        if name in self.data:
-            return self.data[name]
-        return None
+        keys = self._names.get(name)
+        if not keys:
+            return None
+        return self.data[min(keys)]
+
+    def find_all(self, name: str):
+        return [self.data[key] for key in sorted(self._names.get(name))]
+
+    def names(self):
+        return list(self._names.owners)
+
+    # власник номера телефону або email (без урахування регістру); якщо їх кілька -
+    # перший за іменем
+    def find_by_phone(self, phone: str):
+        return self._owner(self._phone_owners.get(phone))
+
+    def find_by_email(self, email: str):
+        return self._owner(self._email_owners.get(email.lower()))
+
+    def _owner(self, keys):
+        if not keys:
+            return None
+        if len(keys) == 1:
+            return self.data[next(iter(keys))]
+        return self.data[min(keys, key=self._sort_key)]
 
+    # повертає генератор записів, кожен запис не більше одного разу
     def search(self, value: str):
         if len(value) < 3:
-            return '\033[91mYou need at least 3 letters to search by name or 3 didgit to search by phone number.\033[0m'
-        result = ''
-        for name, rec in self.data.items():
-            if value.lower() in name.lower():
-                result += f'{str(rec)}\n'
-            for item in rec.phones:
-                if value in item.value:
-                    result += f'{str(rec)}'
-        if len(result) != 0:
-            return result
-        else:
-            return None
+            raise ValueError('\033[91mYou need at least 3 letters to search by name or 3 didgit to search by phone number.\033[0m')
+        return self._search(value)
+
+    def _search(self, value):
+        lower = value.lower()
+        candidates = self._name_index.candidates(lower) | self._phone_index.candidates(value)
+        for key in candidates:
+            record = self.data.get(key)
+            if record is None:
+                continue
+            if lower in record.name.value.lower() or any(value in item.value for item in record.phones):
+                yield record
+
+    # пошук за іменем з помилками: до limit записів, найближчі першими
+    def fuzzy_search(self, value: str, limit: int = 10):
+        if self._fuzzy_index is None:
+            index = FuzzyIndex(_name)
+            index.add_all(self.data.items())
+            self._fuzzy_index = index
+            self._indexes.append(index)
+        found = self._fuzzy_index.search(value, limit)
+        found.sort(key=lambda item: (item[1], self._sort_key(item[0])))
+        return [self.data[key] for key, _ in found]
+
+    # записи, у яких день народження припадає на цю дату
+    def birthdays_on(self, day: date):
+        keys = self._birthday_index.get(day.month, day.day)
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            keys = keys | self._birthday_index.get(2, 29)
+        return [self.data[key] for key in sorted(keys, key=self._sort_key)]
+
+    # пари (дата, запис) для всіх днів народження з start по end включно
+    def birthdays_between(self, start: date, end: date):
+        day = start
+        while day <= end:
+            for record in self.birthdays_on(day):
+                yield day, record
+            day += timedelta(days=1)
+
+    # (запис, днів до дня народження) у порядку наближення дня народження;
+    # з numpy рахується одним векторним проходом по всій книзі
+    def upcoming_birthdays(self, today: date, days: int):
+        from birthday_columns import BirthdayColumns, np
+        if np is None:
+            # у вікні від року день народження трапляється двічі: лишається найближчий
+            found = {}
+            for day, record in self.birthdays_between(today, today + timedelta(days=days)):
+                found.setdefault(record.id, (record, (day - today).days))
+            return list(found.values())
+        if self._birthday_columns is None or self._birthday_columns[0] != self.version:
+            self._birthday_columns = (self.version, BirthdayColumns(self.data.values()))
+        return self._birthday_columns[1].upcoming(today, days)
 
     def delete(self, name: str):
-        if name in self.data:
-            self.data.pop(name)
+        record = self.find(name)
+        if record is not None:
+            self.delete_record(record)
             return f'The contact {name} has been deleted.'
         else:
             return f'The contact {name} not found.'
 
+    def delete_record(self, record: Record):
+        key = record.id
+        if self.data.get(key) is not record:
+            return
+        self._remember(key)
+        self.data.pop(key)._book = None
+        self.version += 1
+        for index in self._indexes:
+            index.remove(key)
+        self._pending[key] = ('delete', key)
+
+    # сторінка записів, впорядкованих за іменем, і токен для наступної сторінки
+    # (None, якщо сторінка остання); токен лишається дійсним після змін у книзі
+    def page(self, size: int, offset: int = 0, after: str = None):
+        if size <= 0:
+            raise ValueError('\033[91mPage size should be a positive number.\033[0m')
+        keys = self._sorted_keys.slice(size + 1, offset, parse_page_token(after) if after is not None else None)
+        records = [self.data[key] for key in keys[:size]]
+        token = page_token(keys[size - 1], records[-1].name.value) if len(keys) > size else None
+        return records, token
+
+    def iter_pages(self, size: int):
+        token = None
+        while True:
+            records, token = self.page(size, after=token)
+            if records:
+                yield records
+            if token is None:
+                return
+
     def iterator(self, item_number):
-        counter = 0
-        result = f'Contacts:\n'
-        print(result)
-        print(self.data)
-        for item, record in self.data.items():
-            result += f'{item}: {str(record)}\n'
-            counter += 1
-            print(counter)
-            if counter >= item_number:
-                yield result
-                counter = 0
-                result = ''
-        print(result)
-        yield result
+        for records in self.iter_pages(item_number):
+            yield ''.join(f'{record.name.value}: {str(record)}\n' for record in records)
 
+    # дописує в журнал тільки зміни з моменту останнього запису; сам запис
+    # відбувається у фоновому потоці, persister.flush() чекає на нього. Записи
+    # серіалізуються тут, у потоці, який їх змінює: фоновий потік пише готові байти
     def write_to_file(self):
-        with open(self.file, 'wb') as file:
-            pickle.dump(self.data, file)
+        if not self._pending or self._depth:
+            return
+        batch = Journal.dump(list(self._pending.values()))
+        with self._lock:
+            self._unsaved.append(batch)
+            self._pending = {}
+            self._in_flight += 1
+        persister.submit((id(self), 'journal'), self._write_journal)
+
+    def _write_journal(self):
+        with self._lock:
+            batches, self._unsaved = self._unsaved, []
+        synced = False
+        try:
+            if batches:
+                synced = self._signature is None or self._file_signature() == self._signature
+                self.journal.append(b''.join(batches))
+        finally:
+            with self._lock:
+                # якщо файли до цього змінив інший процес, підпис лишається старим і refresh перечитає книгу
+                if synced:
+                    self._signature = self._file_signature()
+                self._in_flight -= len(batches)
+        if self.journal.size() > max(self.compact_min_bytes, self._snapshot_size()):
+            self.compact()
 
     def read_from_file(self):
-        with open(self.file, 'rb') as file:
-            self.data = pickle.load(file)
+        persister.flush()
+        self._signature = self._file_signature()
+        try:
+            with open(self.file, 'rb') as file:
+                snapshot = file.read()
+        except FileNotFoundError:
+            snapshot = None
+        self.data, next_id = _load_book(snapshot) if snapshot is not None else ({}, 1)
+        # файли старих версій: ключ - ім'я, у записів немає номерів
+        legacy = any(isinstance(key, str) for key in self.data)
+        names = None
+        # записи, змінені журналом після знімка
+        touched = set()
+        for entry in self.journal.replay():
+            key = entry[1]
+            touched.add(key)
+            if isinstance(key, int):
+                # номер і видаленого запису вже зайнятий
+                next_id = max(next_id, key + 1)
+            else:
+                legacy = True
+                if names is None:
+                    names = {record.name.value: k for k, record in self.data.items()}
+                key = names.setdefault(key, key)
+            if entry[0] == 'put':
+                self.data[key] = entry[2]
+            elif entry[0] == 'delete':
+                self.data.pop(key, None)
+        if legacy:
+            self._assign_ids()
+        self.next_id = max(next_id, max(self.data, default=0) + 1)
+        self._pending = {}
+        # файл індексів дійсний, тільки якщо побудований з цього самого знімка; зміни
+        # з журналу лягають поверх нього, як і зміни після читання
+        index_file = None
+        if snapshot is not None and not legacy:
+            index_file = IndexFile.open(self.index_path, zlib.crc32(snapshot), len(snapshot))
+        if index_file is not None:
+            self._use_index_file(index_file)
+            for key in touched:
+                record = self.data.get(key)
+                for index in self._indexes:
+                    if record is None:
+                        index.remove(key)
+                    else:
+                        index.update(key, record)
+        else:
+            self._rebuild_indexes()
+            if not legacy and len(self.data) >= self.index_min_records:
+                # знімок разом з новим файлом індексів, щоб наступний старт був швидким
+                self.compact()
+        if legacy:
+            # знімок з номерами, щоб при наступному читанні номери були ті самі
+            self.compact()
         return self.data
 
+    def _assign_ids(self):
+        records = list(self.data.values())
+        next_id = max((record.id or 0 for record in records), default=0) + 1
+        self.data = {}
+        for record in records:
+            if record.id is None:
+                record.id = next_id
+                next_id += 1
+            self.data[record.id] = record
+
+    # усі зміни всередині блоку with записуються в журнал однією пачкою при виході з нього;
+    # вкладені транзакції зливаються з зовнішньою. Виняток, що виходить із зовнішньої
+    # транзакції, скасовує всі її зміни, як ROLLBACK у SQLiteAddressBook
+    @contextmanager
+    def transaction(self):
+        outer = self._depth == 0
+        if outer:
+            # зміни, зроблені до транзакції, спершу в журнал: у _pending лишаються тільки її власні
+            self.write_to_file()
+            self._undo, next_id = {}, self.next_id
+        with self._lock:
+            self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            if outer:
+                self._rollback(next_id)
+            self._leave(outer)
+            raise
+        self._leave(outer)
+        self.write_to_file()
+
+    def _leave(self, outer):
+        with self._lock:
+            self._depth -= 1
+        if outer:
+            self._undo = None
+            if self._compact_later:
+                self._compact_later = False
+                self.compact()
+
+    # повертає записи, змінені в транзакції, у стан до неї; нічого з цього ще не записано
+    def _rollback(self, next_id):
+        undo, self._undo = self._undo, None
+        self._pending = {}
+        self.next_id = next_id
+        if not undo:
+            return
+        self.version += 1
+        for key, saved in undo.items():
+            current = self.data.pop(key, None)
+            if current is not None:
+                current._book = None
+                for index in self._indexes:
+                    index.remove(key)
+            if saved is not None:
+                record, state = saved
+                record._restore(state)
+                record._book = self
+                self.data[key] = record
+                for index in self._indexes:
+                    index.add(key, record)
+
+    # перечитує файл тільки якщо його змінив хтось інший
+    def refresh(self):
+        # посеред транзакції чи з незаписаними змінами перечитування стерло б їх
+        if self._depth or self._pending:
+            self.cache_hits += 1
+            return self.data
+        # власний запис чи стискання теж змінюють файли: спершу дочекатись їх
+        if self._in_flight or self._compacting:
+            persister.flush()
+        if self._file_signature() == self._signature:
+            self.cache_hits += 1
+            return self.data
+        self.cache_misses += 1
+        return self.read_from_file()
+
+    def _file_signature(self):
+        signature = []
+        for path in (self.file, self.journal.path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _snapshot_size(self):
+        try:
+            return os.path.getsize(self.file)
+        except FileNotFoundError:
+            return 0
+
+    # переписує знімок у фоновому потоці; записи журналу, зроблені під час
+    # стискання, залишаються в журналі
+    def compact(self, wait=False):
+        self._compacting = True
+        persister.submit((id(self), 'compact'), self._compact)
+        if wait:
+            persister.flush()
+
+    def _compact(self):
+        try:
+            # стовпці знімаються одним проходом під замком; далі фоновий потік
+            # працює тільки з ними, а не з записами, які тим часом можуть змінюватись
+            with self._lock:
+                if self._depth:
+                    # посеред транзакції в пам'яті є непідтверджені зміни: стискання після неї
+                    self._compact_later = True
+                    return
+                if self._signature is not None and self._file_signature() != self._signature:
+                    # файли дописав інший процес: знімок з цієї книги викинув би його записи журналу
+                    return
+                columns = codec.BookColumns.of(self.data.values(), self.next_id)
+                offset = self.journal.size()
+            snapshot = _dump_book(columns)
+            atomic_write(self.file, snapshot)
+            self.journal.drop_head(offset)
+            if len(columns) >= self.index_min_records:
+                write_index(self.index_path, columns, zlib.crc32(snapshot), len(snapshot))
+            with self._lock:
+                self._signature = self._file_signature()
+        finally:
+            self._compacting = False
+
+
+# на мільйонах щойно створених об'єктів збирач сміття запускається знову і знову, хоча
+# звільняти нічого: без нього читання знімка вдвічі швидше
+def _without_gc(decode, data):
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return decode(data)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# знімки пишуться і читаються тільки через ці функції: instrumentation.py міряє тут час
+# і розмір. Пишуться у форматі codec; файли, збережені pickle, читаються як і раніше
+def _dump_book(columns):
+    try:
+        return codec.encode_columns(columns)
+    except ValueError:
+        # телефони зі старих файлів, записані ще до перевірки на 10 цифр
+        return pickle.dumps((columns.records(), columns.next_id))
+
+
+# (записи, наступний вільний номер; 0 - файл старої версії його не зберігав)
+def _load_book(data):
+    if codec.is_encoded(data):
+        return _without_gc(codec.decode_book, data)
+    loaded = _without_gc(pickle.loads, data)
+    return loaded if isinstance(loaded, tuple) else (loaded, 0)
+
+
+def _dump_notes(notes):
+    return codec.encode_notes(notes)
+
+
+def _load_notes(data):
+    return _without_gc(codec.decode_notes if codec.is_encoded(data) else pickle.loads, data)
+
+
+# одна книга на весь процес, щоб усі меню працювали з тими самими даними
+_phone_book = None
+
+
+# ASSISTANT_STORAGE=sqlite перемикає книгу і нотатки на базу SQLite
+def use_sqlite():
+    return os.environ.get('ASSISTANT_STORAGE', 'pickle') == 'sqlite'
+
+
+def get_phone_book():
+    global _phone_book
+    if _phone_book is None:
+        if use_sqlite():
+            from sqlite_storage import SQLiteAddressBook
+            _phone_book = SQLiteAddressBook()
+        else:
+            _phone_book = AddressBook()
+    return _phone_book
+
+
 # класс по созданию нотаток
 class Note:
-    def __init__(self, content, tags=None):
+    # постійний номер нотатки, його видає Notebook
+    id = None
+
+    def __init__(self, content, tags=None, id=None):
         if tags is None:
             tags = []
         self.content = content
         self.tags = tags
+        self.id = id
+
+
+# нотатки, збережені в Save_Notes.bin; індекс тег -> номери нотаток і повнотекстовий
+# індекс, який будується при першому пошуку за текстом
+class Notebook:
+    def __init__(self):
+        self.file = 'Save_Notes.bin'
+        self.notes = {}
+        self.next_id = 1
+        self._tags = defaultdict(set)
+        self._text = None
+        self._signature = None
+
+    def __iter__(self):
+        return iter(self.notes.values())
+
+    def __len__(self):
+        return len(self.notes)
+
+    def _index(self, note):
+        for tag in note.tags:
+            self._tags[tag].add(note.id)
+        if self._text is not None:
+            self._text.update(note.id, note.content, note.tags)
+
+    def _unindex(self, note):
+        for tag in note.tags:
+            ids = self._tags.get(tag)
+            if ids is not None:
+                ids.discard(note.id)
+                if not ids:
+                    del self._tags[tag]
+        if self._text is not None:
+            self._text.remove(note.id)
+
+    def add_note(self, content, tags=None):
+        note = Note(content, tags, self.next_id)
+        self.next_id += 1
+        self.notes[note.id] = note
+        self._index(note)
+        return note
+
+    def get(self, note_id):
+        return self.notes.get(note_id)
+
+    def edit_note(self, note_id, content=None, tags=None):
+        note = self.notes.get(note_id)
+        if note is None:
+            return None
+        self._unindex(note)
+        if content is not None:
+            note.content = content
+        if tags is not None:
+            note.tags = tags
+        self._index(note)
+        return note
+
+    def delete_note(self, note_id):
+        note = self.notes.pop(note_id, None)
+        if note is not None:
+            self._unindex(note)
+        return note
+
+    def search_notes_by_tag(self, tag):
+        return [self.notes[note_id] for note_id in sorted(self._tags.get(tag, ()))]
+
+    def search_and_sort_notes(self, keyword):
+        return sorted(self.search_notes_by_tag(keyword), key=lambda x: x.tags)
+
+    # повертає кількість змінених нотаток
+    def edit_note_content(self, tag, new_content):
+        found = self.search_notes_by_tag(tag)
+        for note in found:
+            self.edit_note(note.id, new_content)
+        return len(found)
+
+    # пошук за текстом і тегами, найрелевантніші (BM25) першими: слова, "фрази в лапках",
+    # початки слів з зірочкою (budg*)
+    def search_text(self, query, limit=10):
+        if self._text is None:
+            index = TextIndex()
+            for note in self.notes.values():
+                index.add(note.id, note.content, note.tags)
+            self._text = index
+        return [self.notes[note_id] for note_id, _ in self._text.search(query, limit)]
+
+    # повертає кількість видалених нотаток
+    def delete_notes_by_tag(self, tag):
+        found = self.search_notes_by_tag(tag)
+        for note in found:
+            self.delete_note(note.id)
+        return len(found)
+
+    def write_to_file(self):
+        persister.submit((id(self), 'notes'), self._write_notes)
+
+    def _write_notes(self):
+        atomic_write(self.file, _dump_notes(self.notes.values()))
+        self._signature = self._file_signature()
+
+    # перечитує файл тільки якщо його змінив хтось інший; індекси тегів і тексту залишаються
+    def read_from_file(self):
+        persister.flush()
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return self.notes
+        try:
+            with open(self.file, 'rb') as file:
+                notes = _load_notes(file.read())
+        except FileNotFoundError:
+            return self.notes
+        self._signature = signature
+        self.notes = {}
+        self._tags.clear()
+        self._text = None
+        self.next_id = max((note.id or 0 for note in notes), default=0) + 1
+        for note in notes:
+            # нотатки зі старих файлів ще не мають номера
+            if note.id is None:
+                note.id = self.next_id
+                self.next_id += 1
+            self.notes[note.id] = note
+            self._index(note)
+        return self.notes
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+_notebook = None
+
+
+def get_notebook():
+    global _notebook
+    if _notebook is None:
+        if use_sqlite():
+            from sqlite_storage import SQLiteNotebook
+            _notebook = SQLiteNotebook()
+        else:
+            _notebook = Notebook()
+    return _notebook
 
 class Controller(cmd.Cmd):
     def exit(self):
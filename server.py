@@ -0,0 +1,273 @@
+# локальний HTTP/JSON сервер над тією самою книгою і нотатками:
+#   python server.py --port 8080
+#   curl 'http://127.0.0.1:8080/contacts?q=ann'
+#
+# GET    /contacts?q=...&limit=100        пошук (AddressBook.search)
+# GET    /contacts?fuzzy=...&limit=10     пошук з помилками (AddressBook.fuzzy_search)
+# GET    /contacts?page_size=&after=      сторінка контактів
+# GET    /contacts/<name>                 контакт з цим ім'ям; якщо їх кілька - 409 з їхніми номерами
+# GET    /contacts/id/<id>                контакт за номером
+# GET    /contacts?phone=... | ?email=...  власник номера або email (find_by_phone / find_by_email)
+# POST   /contacts                        {"name", "phones", "birthday", "email", "address"}
+# DELETE /contacts/<name>   DELETE /contacts/id/<id>
+# GET    /birthdays/on?date=YYYY.MM.DD   /birthdays/week   /birthdays/days?n=30
+# GET    /notes?q=...&limit=10            пошук за текстом нотаток (Notebook.search_text)
+# GET    /notes?tag=...   POST /notes {"content", "tags"}
+# PATCH  /notes/<id> {"content", "tags"}   DELETE /notes/<id>
+import argparse
+import asyncio
+import json
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import cli
+import instrumentation
+from record import get_phone_book, get_notebook, use_sqlite
+from persistence import persister
+
+
+STATUS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+          409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+MAX_BODY = 1 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+# багато читачів одночасно або один письменник
+class ReadWriteLock:
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._condition = asyncio.Condition()
+
+    async def acquire_read(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer)
+            self._readers += 1
+
+    async def release_read(self):
+        async with self._condition:
+            self._readers -= 1
+            self._condition.notify_all()
+
+    async def acquire_write(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer and self._readers == 0)
+            self._writer = True
+
+    async def release_write(self):
+        async with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+
+class AssistantServer:
+    def __init__(self, book=None, notebook=None, workers=4):
+        # з'єднання SQLite працює тільки в потоці, який його відкрив: у режимі SQLite всі
+        # обробники виконує один потік, і книга з нотатками відкриваються в ньому ж
+        if use_sqlite():
+            workers = 1
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.book = book if book is not None else self.executor.submit(get_phone_book).result()
+        self.notebook = notebook if notebook is not None else self.executor.submit(get_notebook).result()
+        self.lock = ReadWriteLock()
+
+    # меню чи CLI могли змінити файли, поки сервер працює: перед кожною зміною книга
+    # перечитується, інакше сервер видавав би вже зайняті номери і писав поверх чужих змін
+    def refresh(self):
+        self.book.refresh()
+        self.notebook.read_from_file()
+
+    def existing(self, name):
+        records = self.book.find_all(name)
+        if not records:
+            raise HTTPError(404, f'The contact {name} not found.')
+        if len(records) > 1:
+            raise HTTPError(409, f'There are {len(records)} contacts named {name}, use /contacts/id/<id>.',
+                            candidates=[cli.contact(record) for record in records])
+        return records[0]
+
+    def existing_id(self, contact_id):
+        record = self.book.get(int(contact_id))
+        if record is None:
+            raise HTTPError(404, f'The contact with id {contact_id} not found.')
+        return record
+
+    def delete(self, record):
+        return cli.contacts_delete(Namespace(name=None, id=record.id), self.book, self.notebook)
+
+    @staticmethod
+    def owner(record, value):
+        if record is None:
+            raise HTTPError(404, f'No contact with {value}.')
+        return record
+
+    # --- маршрути: повертають (чи змінює дані, обробник) ---
+
+    def route(self, method, parts, query, body):
+        def one(name, default=None):
+            return query.get(name, [default])[0]
+
+        book, notebook = self.book, self.notebook
+        if parts[:1] == ['contacts']:
+            if method == 'GET' and len(parts) == 1 and one('phone') is not None:
+                return False, lambda: cli.contact(self.owner(book.find_by_phone(one('phone')), one('phone')))
+            if method == 'GET' and len(parts) == 1 and one('email') is not None:
+                return False, lambda: cli.contact(self.owner(book.find_by_email(one('email')), one('email')))
+            if method == 'GET' and len(parts) == 1 and one('fuzzy') is not None:
+                limit = int(one('limit', 10))
+                return False, lambda: [cli.contact(record) for record in book.fuzzy_search(one('fuzzy'), limit)]
+            if method == 'GET' and len(parts) == 1 and one('q') is not None:
+                limit = int(one('limit', 100))
+                return False, lambda: [cli.contact(record) for record in islice(book.search(one('q')), limit)]
+            if method == 'GET' and len(parts) == 1:
+                args = Namespace(page_size=int(one('page_size', 50)), offset=int(one('offset', 0)), after=one('after'))
+                return False, lambda: cli.contacts_list(args, book, notebook)
+            if method == 'GET' and len(parts) == 3 and parts[1] == 'id':
+                return False, lambda: cli.contact(self.existing_id(parts[2]))
+            if method == 'GET' and len(parts) == 2:
+                return False, lambda: cli.contact(self.existing(parts[1]))
+            if method == 'POST' and len(parts) == 1:
+                args = Namespace(name=body.get('name', ''), phone=body.get('phones', []), birthday=body.get('birthday'),
+                                 email=body.get('email'), address=body.get('address'))
+                return True, lambda: cli.contacts_add(args, book, notebook)
+            if method == 'DELETE' and len(parts) == 3 and parts[1] == 'id':
+                return True, lambda: self.delete(self.existing_id(parts[2]))
+            if method == 'DELETE' and len(parts) == 2:
+                return True, lambda: self.delete(self.existing(parts[1]))
+        if parts[:1] == ['birthdays'] and method == 'GET' and len(parts) == 2:
+            if parts[1] == 'on':
+                return False, lambda: cli.birthdays_on(Namespace(date=one('date')), book, notebook)
+            if parts[1] == 'week':
+                return False, lambda: cli.birthdays_week(Namespace(), book, notebook)
+            if parts[1] == 'days':
+                return False, lambda: cli.birthdays_days(Namespace(days=int(one('n', 7))), book, notebook)
+        if parts[:1] == ['notes']:
+            if method == 'GET' and len(parts) == 1 and one('q') is not None:
+                args = Namespace(tag=None, q=one('q'), limit=int(one('limit', 10)))
+                return False, lambda: cli.notes_search(args, book, notebook)
+            if method == 'GET' and len(parts) == 1 and one('tag') is not None:
+                return False, lambda: cli.notes_search(Namespace(tag=one('tag'), q=None), book, notebook)
+            if method == 'GET' and len(parts) == 1:
+                return False, lambda: cli.notes_list(Namespace(), book, notebook)
+            if method == 'POST' and len(parts) == 1:
+                tags = body.get('tags') or []
+                args = Namespace(content=body.get('content', ''), tags=','.join(tags) if isinstance(tags, list) else tags)
+                return True, lambda: cli.notes_add(args, book, notebook)
+            if method == 'PATCH' and len(parts) == 2:
+                tags = body.get('tags')
+                args = Namespace(id=int(parts[1]), tag=None, content=body.get('content'),
+                                 tags=','.join(tags) if isinstance(tags, list) else tags)
+                return True, lambda: cli.notes_edit(args, book, notebook)
+            if method == 'DELETE' and len(parts) == 2:
+                return True, lambda: cli.notes_delete(Namespace(id=int(parts[1]), tag=None), book, notebook)
+        raise HTTPError(404, 'Unknown endpoint.')
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        try:
+            body = json.loads(body) if body else {}
+            writes, handler = self.route(method, parts, parse_qs(url.query), body)
+        except (ValueError, AttributeError) as error:
+            raise HTTPError(400, str(error))
+        loop = asyncio.get_running_loop()
+        if writes:
+            await self.lock.acquire_write()
+            try:
+                await loop.run_in_executor(self.executor, self.refresh)
+                return await loop.run_in_executor(self.executor, handler)
+            finally:
+                await self.lock.release_write()
+        await self.lock.acquire_read()
+        try:
+            return await loop.run_in_executor(self.executor, handler)
+        finally:
+            await self.lock.release_read()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        writer.write(
+            f'HTTP/1.1 {status} {STATUS.get(status, "")}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(data)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + data)
+        await writer.drain()
+
+    # одне з'єднання обслуговує багато запитів (HTTP/1.1 keep-alive)
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'Malformed request line.'}, False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {'error': 'Request body is too large.'}, False)
+                    return
+                body = await reader.readexactly(length) if length else b''
+                try:
+                    result = await self.dispatch(method.upper(), target, body)
+                    status = 201 if method.upper() == 'POST' else 200
+                except HTTPError as error:
+                    status, result = error.status, {'error': str(error), **error.details}
+                except ValueError as error:
+                    status, result = 400, {'error': str(error).replace('\033[91m', '').replace('\033[0m', '')}
+                except Exception as error:
+                    # помилка в обробнику не повинна обривати з'єднання без відповіді
+                    status, result = 500, {'error': f'{type(error).__name__}: {error}'}
+                await self.respond(writer, status, result, keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.book.refresh)
+        await loop.run_in_executor(self.executor, self.notebook.read_from_file)
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local HTTP/JSON API for the contact book and notes.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+    instrumentation.install()
+    server = AssistantServer()
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.submit(server.book.write_to_file).result()
+        persister.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,437 @@
+import calendar
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from record import Record, Birthday, Email, Address, Note
+from fuzzy import FuzzyIndex
+from fulltext import TextIndex
+from indexes import page_token, parse_page_token
+
+
+CONTACTS = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    birthday TEXT,
+    birth_month INTEGER,
+    birth_day INTEGER,
+    email TEXT,
+    email_lower TEXT,
+    address TEXT
+);
+'''
+
+SCHEMA = CONTACTS.format(table='contacts') + '''
+CREATE INDEX IF NOT EXISTS contacts_name ON contacts (name);
+CREATE INDEX IF NOT EXISTS contacts_name_lower ON contacts (name_lower, name, id);
+CREATE INDEX IF NOT EXISTS contacts_birth ON contacts (birth_month, birth_day);
+CREATE INDEX IF NOT EXISTS contacts_email ON contacts (email_lower);
+CREATE TABLE IF NOT EXISTS phones (
+    contact_id INTEGER NOT NULL REFERENCES contacts (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    phone TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phones_phone ON phones (phone);
+CREATE INDEX IF NOT EXISTS phones_contact ON phones (contact_id, position);
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_tags (
+    note_id INTEGER NOT NULL REFERENCES notes (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS note_tags_tag ON note_tags (tag);
+CREATE INDEX IF NOT EXISTS note_tags_note ON note_tags (note_id, position);
+'''
+
+
+def connect(path):
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.execute('PRAGMA journal_mode = WAL')
+    _upgrade_contacts(connection)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+# у базах старих версій ім'я було унікальним, а номери без AUTOINCREMENT видавались
+# знову після видалення останнього контакту; SQLite не вміє змінити ні те, ні те,
+# тому таблицю контактів переписуємо (номери контактів і телефони лишаються ті самі)
+def _upgrade_contacts(connection):
+    row = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'contacts'").fetchone()
+    if row is None or 'UNIQUE' not in row[0] and 'AUTOINCREMENT' in row[0]:
+        return
+    connection.execute('PRAGMA foreign_keys = OFF')
+    connection.execute('BEGIN')
+    connection.execute(CONTACTS.format(table='contacts_new'))
+    connection.execute('INSERT INTO contacts_new SELECT id, name, name_lower, birthday, birth_month, birth_day, '
+                       'email, email_lower, address FROM contacts')
+    connection.execute('DROP TABLE contacts')
+    connection.execute('ALTER TABLE contacts_new RENAME TO contacts')
+    connection.execute('COMMIT')
+    connection.execute('PRAGMA foreign_keys = ON')
+
+
+class Transactional:
+    _depth = 0
+
+    # вкладені транзакції зливаються в одну, коміт робить зовнішня
+    @contextmanager
+    def transaction(self):
+        if self._depth == 0:
+            self.connection.execute('BEGIN')
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self.connection.execute('ROLLBACK')
+                # індекси в пам'яті вже бачили скасовані зміни, а data_version власні зміни
+                # з'єднання не рахує: індекс будується заново при наступному пошуку
+                self._drop_indexes()
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            self.connection.execute('COMMIT')
+
+
+# адресна книга в SQLite з тим самим API, що й AddressBook; у пам'яті тримаються
+# тільки записи, які зараз потрібні
+class SQLiteAddressBook(Transactional):
+    def __init__(self, file='Phone_Book.db'):
+        self.file = file
+        self.connection = connect(file)
+        # індекс для fuzzy_search будується з імен при першому пошуку
+        self._fuzzy_index = None
+        self._data_version = None
+
+    def _drop_indexes(self):
+        self._fuzzy_index = None
+
+    def __len__(self):
+        return self.connection.execute('SELECT count(*) FROM contacts').fetchone()[0]
+
+    def __contains__(self, contact_id):
+        return self.connection.execute('SELECT 1 FROM contacts WHERE id = ?', (contact_id,)).fetchone() is not None
+
+    def __iter__(self):
+        return self.keys()
+
+    def keys(self):
+        for (contact_id,) in self.connection.execute('SELECT id FROM contacts ORDER BY name_lower, name, id'):
+            yield contact_id
+
+    def names(self):
+        return [name for (name,) in self.connection.execute('SELECT DISTINCT name FROM contacts')]
+
+    # новий запис отримує номер від бази; запис, що вже має номер, замінює запис з цим номером
+    def add_record(self, record: Record):
+        birthday = record.birthday.value if record.birthday else None
+        email = record.email.value if record.email else None
+        with self.transaction():
+            cursor = self.connection.execute(
+                '''INSERT INTO contacts (id, name, name_lower, birthday, birth_month, birth_day, email, email_lower, address)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (id) DO UPDATE SET name = excluded.name, name_lower = excluded.name_lower,
+                       birthday = excluded.birthday, birth_month = excluded.birth_month, birth_day = excluded.birth_day,
+                       email = excluded.email, email_lower = excluded.email_lower, address = excluded.address''',
+                (record.id, record.name.value, record.name.value.lower(),
+                 str(record.birthday) if birthday else None,
+                 birthday.month if birthday else None, birthday.day if birthday else None,
+                 email, email.lower() if email else None,
+                 record.address.value if record.address else None))
+            if record.id is None:
+                record.id = cursor.lastrowid
+            contact_id = record.id
+            self.connection.execute('DELETE FROM phones WHERE contact_id = ?', (contact_id,))
+            self.connection.executemany(
+                'INSERT INTO phones (contact_id, position, phone) VALUES (?, ?, ?)',
+                [(contact_id, i, phone.value) for i, phone in enumerate(record.phones)])
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.update(record.id, record.name.value)
+
+    def _records(self, where='', params=(), tail=''):
+        rows = self.connection.execute(
+            f'SELECT id, name, birthday, email, address FROM contacts {where} {tail}', params).fetchall()
+        if not rows:
+            return []
+        ids = [row[0] for row in rows]
+        phones = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for contact_id, phone in self.connection.execute(
+                    f'SELECT contact_id, phone FROM phones WHERE contact_id IN ({",".join("?" * len(chunk))}) '
+                    f'ORDER BY contact_id, position', chunk):
+                phones.setdefault(contact_id, []).append(phone)
+        records = []
+        for contact_id, name, birthday, email, address in rows:
+            record = Record(name)
+            record.id = contact_id
+            for phone in phones.get(contact_id, ()):
+                record.add_phone(phone)
+            record.birthday = Birthday(birthday) if birthday else None
+            record.email = Email(email) if email else None
+            record.address = Address(address) if address else None
+            record._book = self
+            records.append(record)
+        return records
+
+    def get(self, contact_id, default=None):
+        records = self._records('WHERE id = ?', (contact_id,))
+        return records[0] if records else default
+
+    def find(self, name: str):
+        records = self._records('WHERE name = ?', (name,), 'ORDER BY id LIMIT 1')
+        return records[0] if records else None
+
+    def find_all(self, name: str):
+        return self._records('WHERE name = ?', (name,), 'ORDER BY id')
+
+    def find_by_phone(self, phone: str):
+        records = self._records('WHERE id IN (SELECT contact_id FROM phones WHERE phone = ?)', (phone,),
+                                'ORDER BY name_lower, name, id LIMIT 1')
+        return records[0] if records else None
+
+    def find_by_email(self, email: str):
+        records = self._records('WHERE email_lower = ?', (email.lower(),), 'ORDER BY name_lower, name, id LIMIT 1')
+        return records[0] if records else None
+
+    def search(self, value: str):
+        if len(value) < 3:
+            raise ValueError('\033[91mYou need at least 3 letters to search by name or 3 didgit to search by phone number.\033[0m')
+        return self._search(value)
+
+    def _search(self, value):
+        pattern = '%' + value.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        yield from self._records(
+            '''WHERE name_lower LIKE ? ESCAPE '\\'
+               OR id IN (SELECT contact_id FROM phones WHERE instr(phone, ?) > 0)''',
+            (pattern, value), 'ORDER BY name_lower, name, id')
+
+    def delete(self, name: str):
+        record = self.find(name)
+        if record is not None:
+            self.delete_record(record)
+            return f'The contact {name} has been deleted.'
+        return f'The contact {name} not found.'
+
+    def delete_record(self, record: Record):
+        with self.transaction():
+            self.connection.execute('DELETE FROM contacts WHERE id = ?', (record.id,))
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.remove(record.id)
+
+    # індекс перебудовується, якщо базу змінило інше з'єднання (PRAGMA data_version)
+    def fuzzy_search(self, value: str, limit: int = 10):
+        version = self.connection.execute('PRAGMA data_version').fetchone()[0]
+        if self._fuzzy_index is None or version != self._data_version:
+            self._fuzzy_index = FuzzyIndex(lambda name: [name])
+            self._fuzzy_index.add_all(self.connection.execute('SELECT id, name FROM contacts'))
+            self._data_version = version
+        found = self._fuzzy_index.search(value, limit)
+        if not found:
+            return []
+        scores = dict(found)
+        records = self._records(f'WHERE id IN ({",".join("?" * len(found))})', list(scores))
+        return sorted(records, key=lambda record: (scores[record.id], record.name.value.lower(),
+                                                   record.name.value, record.id))
+
+    def page(self, size: int, offset: int = 0, after: str = None):
+        if size <= 0:
+            raise ValueError('\033[91mPage size should be a positive number.\033[0m')
+        if after is not None:
+            name, contact_id = parse_page_token(after)
+            records = self._records('WHERE (name_lower, name, id) > (?, ?, ?)', (name.lower(), name, contact_id),
+                                    f'ORDER BY name_lower, name, id LIMIT {size + 1}')
+        else:
+            records = self._records('', (), f'ORDER BY name_lower, name, id LIMIT {size + 1} OFFSET {offset}')
+        last = records[size - 1] if len(records) > size else None
+        return records[:size], page_token(last.id, last.name.value) if last else None
+
+    def iter_pages(self, size: int):
+        token = None
+        while True:
+            records, token = self.page(size, after=token)
+            if records:
+                yield records
+            if token is None:
+                return
+
+    def iterator(self, item_number):
+        for records in self.iter_pages(item_number):
+            yield ''.join(f'{record.name.value}: {str(record)}\n' for record in records)
+
+    def birthdays_on(self, day: date):
+        days = [(day.month, day.day)]
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            days.append((2, 29))
+        records = []
+        for month, birth_day in days:
+            records += self._records('WHERE birth_month = ? AND birth_day = ?', (month, birth_day))
+        return sorted(records, key=lambda record: (record.name.value.lower(), record.name.value, record.id))
+
+    def birthdays_between(self, start: date, end: date):
+        day = start
+        while day <= end:
+            for record in self.birthdays_on(day):
+                yield day, record
+            day += timedelta(days=1)
+
+    # кожен запис один раз, з найближчим днем народження, як і в AddressBook
+    def upcoming_birthdays(self, today: date, days: int):
+        found = {}
+        for day, record in self.birthdays_between(today, today + timedelta(days=days)):
+            found.setdefault(record.id, (record, (day - today).days))
+        return list(found.values())
+
+    # зміни пишуться одразу, тож файл не треба ні перечитувати, ні дописувати;
+    # запис, змінений на місці (add_phone, rename, ...), одразу ж і зберігається
+    def reindex(self, record: Record):
+        if record.id is not None:
+            self.add_record(record)
+
+    # відкат транзакції робить сама база
+    def remember(self, record: Record):
+        pass
+
+    def refresh(self):
+        pass
+
+    def read_from_file(self):
+        pass
+
+    def write_to_file(self):
+        pass
+
+    def close(self):
+        self.connection.close()
+
+
+# нотатки в SQLite з тим самим API, що й Notebook
+class SQLiteNotebook(Transactional):
+    def __init__(self, file='Phone_Book.db'):
+        self.file = file
+        self.connection = connect(file)
+        # індекс для search_text будується при першому пошуку, як і для fuzzy_search
+        self._text = None
+        self._data_version = None
+
+    def __iter__(self):
+        return iter(self._notes('', ()))
+
+    def _drop_indexes(self):
+        self._text = None
+
+    def __len__(self):
+        return self.connection.execute('SELECT count(*) FROM notes').fetchone()[0]
+
+    def _notes(self, where, params):
+        rows = self.connection.execute(f'SELECT id, content FROM notes {where} ORDER BY id', params).fetchall()
+        tags = {}
+        for note_id, tag in self.connection.execute(
+                f'SELECT note_id, tag FROM note_tags WHERE note_id IN (SELECT id FROM notes {where}) '
+                f'ORDER BY note_id, position', params):
+            tags.setdefault(note_id, []).append(tag)
+        return [Note(content, tags.get(note_id, []), note_id) for note_id, content in rows]
+
+    def add_note(self, content, tags=None):
+        note = Note(content, tags)
+        with self.transaction():
+            note.id = self.connection.execute('INSERT INTO notes (content) VALUES (?)', (content,)).lastrowid
+            self._insert_tags(note)
+        if self._text is not None:
+            self._text.add(note.id, note.content, note.tags)
+        return note
+
+    # записує нотатку під її власним номером, повторний запис замінює вміст і теги
+    def put_note(self, note):
+        with self.transaction():
+            self.connection.execute(
+                'INSERT INTO notes (id, content) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET content = excluded.content',
+                (note.id, note.content))
+            self.connection.execute('DELETE FROM note_tags WHERE note_id = ?', (note.id,))
+            self._insert_tags(note)
+        if self._text is not None:
+            self._text.update(note.id, note.content, note.tags)
+        return note
+
+    def _insert_tags(self, note):
+        self.connection.executemany(
+            'INSERT INTO note_tags (note_id, position, tag) VALUES (?, ?, ?)',
+            [(note.id, i, tag) for i, tag in enumerate(note.tags)])
+
+    def get(self, note_id):
+        notes = self._notes('WHERE id = ?', (note_id,))
+        return notes[0] if notes else None
+
+    def edit_note(self, note_id, content=None, tags=None):
+        note = self.get(note_id)
+        if note is None:
+            return None
+        with self.transaction():
+            if content is not None:
+                note.content = content
+                self.connection.execute('UPDATE notes SET content = ? WHERE id = ?', (content, note_id))
+            if tags is not None:
+                note.tags = tags
+                self.connection.execute('DELETE FROM note_tags WHERE note_id = ?', (note_id,))
+                self._insert_tags(note)
+        if self._text is not None:
+            self._text.update(note.id, note.content, note.tags)
+        return note
+
+    def delete_note(self, note_id):
+        note = self.get(note_id)
+        if note is not None:
+            with self.transaction():
+                self.connection.execute('DELETE FROM notes WHERE id = ?', (note_id,))
+            if self._text is not None:
+                self._text.remove(note_id)
+        return note
+
+    def search_notes_by_tag(self, tag):
+        return self._notes('WHERE id IN (SELECT note_id FROM note_tags WHERE tag = ?)', (tag,))
+
+    def search_and_sort_notes(self, keyword):
+        return sorted(self.search_notes_by_tag(keyword), key=lambda x: x.tags)
+
+    # зміни за тегом торкаються багатьох нотаток, індекс простіше перебудувати
+    def edit_note_content(self, tag, new_content):
+        self._text = None
+        with self.transaction():
+            return self.connection.execute(
+                'UPDATE notes SET content = ? WHERE id IN (SELECT note_id FROM note_tags WHERE tag = ?)',
+                (new_content, tag)).rowcount
+
+    def delete_notes_by_tag(self, tag):
+        self._text = None
+        with self.transaction():
+            return self.connection.execute(
+                'DELETE FROM notes WHERE id IN (SELECT note_id FROM note_tags WHERE tag = ?)', (tag,)).rowcount
+
+    def search_text(self, query, limit=10):
+        version = self.connection.execute('PRAGMA data_version').fetchone()[0]
+        if self._text is None or version != self._data_version:
+            index = TextIndex()
+            for note in self._notes('', ()):
+                index.add(note.id, note.content, note.tags)
+            self._text, self._data_version = index, version
+        found = [note_id for note_id, _ in self._text.search(query, limit)]
+        if not found:
+            return []
+        notes = {note.id: note for note in self._notes(f'WHERE id IN ({",".join("?" * len(found))})', found)}
+        return [notes[note_id] for note_id in found]
+
+    def read_from_file(self):
+        return self
+
+    def write_to_file(self):
+        pass
+
+    def close(self):
+        self.connection.close()
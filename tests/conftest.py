@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# модулі лежать у корені репозиторію, без пакета
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# книга і нотатки пишуть файли в поточну теку: кожен тест працює в своїй; запис
+# у фоні закінчується до виходу з теки, інакше шляхи вказували б уже на чужу
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    from persistence import persister
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('ASSISTANT_STORAGE', raising=False)
+    yield tmp_path
+    persister.flush()
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+
+
+# кожен бенчмарк на кількох сотнях записів: перевіряється, що він доходить до кінця, а не цифри;
+# днів народження 2000, щоб серед них точно були 29 лютого
+@pytest.mark.parametrize('command', [
+    ['bench_birthdays.py', '2000'],
+    ['bench_codec.py', '300'],
+    ['bench_fuzzy.py', '300'],
+    ['bench_fuzzy.py', '300', '--book'],
+    ['bench_index_file.py', '300'],
+    ['bench_memory.py', '300'],
+    ['bench_notes.py', '300'],
+    ['bench_startup.py', '--repeat', '1'],
+    ['load_test.py', '--contacts', '300', '--connections', '2', '--seconds', '1', '--port', '18765'],
+    ['suite.py', '100', '--output', 'results.json'],
+], ids=' '.join)
+def test_benchmark_runs(command):
+    result = subprocess.run([sys.executable, os.path.join(BENCHMARKS, command[0])] + command[1:],
+                            capture_output=True, text=True, timeout=300)
+    assert 'Traceback' not in result.stderr, result.stderr
+    # bench_startup виходить з кодом 1, якщо імпорт не вклався в бюджет: на повільній машині це не збій
+    assert result.returncode in ((0, 1) if command[0] == 'bench_startup.py' else (0,)), result.stderr
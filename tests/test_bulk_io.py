@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from bulk_io import import_contacts
+from persistence import persister
+from record import AddressBook, Record
+
+
+def write_jsonl(path, rows):
+    with open(path, 'w', encoding='utf-8') as file:
+        for row in rows:
+            file.write((row if isinstance(row, str) else json.dumps(row)) + '\n')
+
+
+def test_rows_of_wrong_type_are_reported():
+    write_jsonl('contacts.jsonl', [
+        {'name': 'Ann Lee', 'phones': ['0501234567']},
+        '[1, 2, 3]',
+        '"just a string"',
+        {'name': 5},
+        {'name': 'Bob', 'phones': 5},
+        {'name': 'Eve', 'email': ['eve@example.com']},
+        {'name': 'Dan', 'address': {'city': 'Kyiv'}},
+        '{broken',
+        {'name': 'Kate Moss', 'phones': '0671234567'},
+    ])
+    book = AddressBook()
+    imported, errors = import_contacts(book, 'contacts.jsonl', workers=0)
+    assert imported == 2
+    assert [line for line, _ in errors] == [2, 3, 4, 5, 6, 7, 8]
+    assert sorted(book.names()) == ['Ann Lee', 'Kate Moss']
+
+
+def test_failed_import_leaves_book_unchanged():
+    book = AddressBook()
+    record = Record('Ann Lee')
+    record.add_phone('0501234567')
+    book.add_record(record)
+    book.write_to_file()
+    persister.flush()
+    # невалідний UTF-8 далеко від початку: кілька пачок уже додано, коли читання падає
+    rows = [json.dumps({'name': f'Contact {i}', 'phones': ['0501234567']}).encode() for i in range(50)]
+    with open('contacts.jsonl', 'wb') as file:
+        file.write(b'\n'.join(rows) + b'\n\xff\xfe\n')
+    with pytest.raises(UnicodeDecodeError):
+        import_contacts(book, 'contacts.jsonl', workers=0, chunk_size=10)
+    persister.flush()
+    assert book.names() == ['Ann Lee']
+    reloaded = AddressBook()
+    reloaded.read_from_file()
+    assert reloaded.names() == ['Ann Lee']
@@ -0,0 +1,63 @@
+import io
+import json
+
+import cli
+from persistence import persister
+from record import AddressBook, Notebook, Record
+
+
+def batch(lines, output_format='json', book=None):
+    out = io.StringIO()
+    book = book if book is not None else AddressBook()
+    failed = cli.run_batch(cli.build_parser(cli._Parser), output_format, book, Notebook(), lines, out)
+    return failed, out.getvalue().splitlines()
+
+
+def namesakes():
+    book = AddressBook()
+    for phone in ('0501234567', '0671234567'):
+        record = Record('Ann Lee')
+        record.add_phone(phone)
+        book.add_record(record)
+    book.write_to_file()
+    persister.flush()
+    return book
+
+
+def test_batch_reports_every_failed_line_and_continues():
+    failed, output = batch([
+        'contacts add "Ann Lee" --phone 0501234567',
+        'contacts import missing.csv',
+        'contacts list --page-size 0',
+        'contacts add "unclosed --phone 0501234567',
+        'contacts frobnicate',
+        'contacts find "Ann Lee"',
+    ])
+    results = [json.loads(line) for line in output]
+    assert failed == 4
+    assert len(results) == 6
+    assert results[0]['name'] == results[5]['name'] == 'Ann Lee'
+    assert results[1]['error'].startswith('FileNotFoundError')
+    assert all('error' in result for result in results[1:5])
+
+
+def test_single_command_error_sets_exit_status(capsys):
+    assert cli.main(['contacts', 'import', 'missing.csv', '--format', 'json']) == 1
+    assert 'FileNotFoundError' in json.loads(capsys.readouterr().out)['error']
+
+
+def test_contacts_with_the_same_name_are_chosen_by_id():
+    book = namesakes()
+    failed, output = batch([
+        'contacts find "Ann Lee"',
+        'contacts find --id 2',
+        'contacts edit --id 2 --add-phone 0931234567',
+        'contacts delete --id 1',
+        'contacts find "Ann Lee"',
+    ], book=book)
+    results = [json.loads(line) for line in output]
+    assert failed == 1
+    assert 'choose one with --id: 1, 2' in results[0]['error']
+    assert results[1]['phones'] == ['0671234567']
+    assert results[2]['phones'] == ['0671234567', '0931234567']
+    assert results[4]['id'] == 2
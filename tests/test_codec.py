@@ -0,0 +1,134 @@
+import pickle
+
+import pytest
+
+import codec
+from persistence import persister
+from record import AddressBook, Note, Notebook, Record, _dump_book, _load_book
+
+
+def phones(record):
+    return [phone.value for phone in record.phones]
+
+
+def contact(record):
+    return (record.id, record.name.value, phones(record),
+            record.birthday.value if record.birthday else None,
+            record.email.value if record.email else None,
+            record.address.value if record.address else None)
+
+
+def sample_records():
+    empty = Record('Без полів')
+    full = Record('Олена Ковальчук 🎂')
+    full.add_phone('0001234567')
+    full.add_phone('0500000000')
+    full.add_birthday('2000.02.29')
+    full.add_email('olena_k@example.com')
+    full.add_address('Київ, вул. Хрещатик, 1')
+    spaces = Record('  ')
+    spaces.add_address('')
+    spaces.add_birthday('0001.01.01')
+    for key, record in enumerate([empty, full, spaces], 1):
+        record.id = key
+    return {record.id: record for record in [empty, full, spaces]}
+
+
+# стискання у фоні, поки інший потік дописує телефони: записи, яких ніхто не чіпав,
+# мають лишитись у знімку такими, як були
+def test_compaction_during_edits_keeps_untouched_records():
+    book = AddressBook()
+    with book.transaction():
+        for i in range(20000):
+            record = Record(f'Contact {i}')
+            record.add_phone(f'{i:010d}')
+            book.add_record(record)
+    persister.flush()
+    before = {key: phones(record) for key, record in book.data.items()}
+    edited = set()
+    book.compact()
+    for key in range(1, 20001, 2):
+        if not book._compacting and edited:
+            break
+        book.data[key].add_phone('0999999999')
+        edited.add(key)
+    persister.flush()
+    with open(book.file, 'rb') as file:
+        snapshot, _ = _load_book(file.read())
+    for key, record in snapshot.items():
+        if key not in edited:
+            assert phones(record) == before[key]
+    book.write_to_file()
+    persister.flush()
+    reloaded = AddressBook()
+    assert {key: phones(record) for key, record in reloaded.read_from_file().items()} == \
+        {key: phones(record) for key, record in book.data.items()}
+
+
+# порожні поля, не-ASCII (і символи поза BMP: довжини в символах, а не в байтах UTF-8),
+# 29 лютого, нулі на початку телефонів
+def test_book_columns_round_trip():
+    records = sample_records()
+    data = codec.encode_columns(codec.BookColumns.of(records.values(), 10))
+    assert codec.is_encoded(data)
+    decoded, next_id = codec.decode_book(data)
+    assert next_id == 10
+    assert [contact(record) for record in decoded.values()] == [contact(record) for record in records.values()]
+
+
+# стискання пише знімок і скорочує журнал; книга, прочитана з нього, та сама
+def test_compacted_snapshot_round_trip():
+    book = AddressBook()
+    book.compact_min_bytes = 0
+    for record in sample_records().values():
+        record.id = None
+        book.add_record(record)
+    book.write_to_file()
+    persister.flush()
+    with open(book.file, 'rb') as file:
+        assert codec.is_encoded(file.read())
+    assert book.journal.size() == 0
+    reloaded = AddressBook()
+    assert [contact(record) for record in reloaded.read_from_file().values()] == \
+        [contact(record) for record in book.data.values()]
+
+
+# телефон з цифрами не ASCII пройшов перевірку Phone, але в стовпець чисел не
+# лягає: знімок пишеться pickle і читається як раніше
+def test_snapshot_falls_back_to_pickle():
+    records = sample_records()
+    records[2].add_phone('٠٥٠١٢٣٤٥٦٧')
+    with pytest.raises(ValueError):
+        codec.encode_columns(codec.BookColumns.of(records.values()))
+    data = _dump_book(codec.BookColumns.of(records.values(), 7))
+    assert not codec.is_encoded(data)
+    decoded, next_id = _load_book(data)
+    assert next_id == 7
+    assert [contact(record) for record in decoded.values()] == [contact(record) for record in records.values()]
+    # файли старих версій - сам словник записів, без наступного номера
+    decoded, next_id = _load_book(pickle.dumps(records))
+    assert next_id == 0
+    assert [contact(record) for record in decoded.values()] == [contact(record) for record in records.values()]
+
+
+# теги - словник різних тегів і номери в ньому; нотатки старих файлів без номера
+def test_notes_round_trip():
+    notes = [Note('Купити хліб 🍞', ['дім', 'покупки'], 1), Note('', [], 2), Note('call Ann', ['дім', 'дім'], 3),
+             Note('старий формат', ['покупки'])]
+    decoded = codec.decode_notes(codec.encode_notes(notes))
+    assert [(note.id, note.content, note.tags) for note in decoded] == \
+        [(note.id, note.content, note.tags) for note in notes]
+    assert decoded[0].tags[0] is decoded[2].tags[0]
+
+
+def test_notebook_file_round_trip():
+    notebook = Notebook()
+    notebook.add_note('Зустріч о 10:00', ['робота', 'календар'])
+    notebook.add_note('без тегів')
+    notebook.write_to_file()
+    persister.flush()
+    reloaded = Notebook()
+    reloaded.read_from_file()
+    assert [(note.id, note.content, note.tags) for note in reloaded] == [(1, 'Зустріч о 10:00', ['робота', 'календар']),
+                                                                         (2, 'без тегів', [])]
+    assert [note.id for note in reloaded.search_notes_by_tag('робота')] == [1]
@@ -0,0 +1,51 @@
+import random
+
+from fuzzy import FuzzyIndex, distances_to, words
+from record import AddressBook, Record
+
+
+# звичайна таблиця Дамерау-Левенштейна (з перестановкою сусідніх літер)
+def plain_distance(a, b):
+    rows = [[i + j if not i or not j else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            rows[i][j] = min(rows[i - 1][j] + 1, rows[i][j - 1] + 1, rows[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                rows[i][j] = min(rows[i][j], rows[i - 2][j - 2] + 1)
+    return rows[-1][-1]
+
+
+def test_distances_match_plain_table():
+    rnd = random.Random(0)
+    for _ in range(300):
+        a = ''.join(rnd.choice('abc') for _ in range(rnd.randint(0, 6)))
+        texts = {''.join(rnd.choice('abc') for _ in range(rnd.randint(0, 8))) for _ in range(10)}
+        for text, (full, prefix) in distances_to(a, texts, 2).items():
+            assert full == min(plain_distance(a, text), 3)
+            assert prefix == (min(plain_distance(a, text[:len(a)]), 3) if len(text) >= len(a) else 3)
+
+
+def test_search_returns_best_scored_records():
+    rnd = random.Random(1)
+    first = ['anna', 'andrii', 'olena', 'oleh', 'iryna', 'ivan']
+    last = ['kravets', 'kravchenko', 'koval', 'kovalenko', 'shevchenko', 'shevchuk']
+    index = FuzzyIndex(lambda name: [name])
+    index.add_all((key, f'{rnd.choice(first)} {rnd.choice(last)}') for key in range(500))
+    for query in ['ana krav', 'olena kovalenk', 'ivna shevhcuk', 'kovl', 'iryna']:
+        matched = [index.matches(word) for word in dict.fromkeys(words(query))]
+        expected = []
+        for record_words in index.keys.values():
+            scores = [[found[word] for word in record_words if word in found] for found in matched]
+            if all(scores):
+                best = [min(score) for score in scores]
+                expected.append((sum(score[0] for score in best), sum(score[1] for score in best)))
+        assert sorted(score for _, score in index.search(query, 10)) == sorted(expected)[:10]
+
+
+def test_fuzzy_index_is_built_on_first_search():
+    book = AddressBook()
+    book.add_record(Record('Ann Lee'))
+    assert book._fuzzy_index is None
+    assert [record.name.value for record in book.fuzzy_search('Aan')] == ['Ann Lee']
+    book.add_record(Record('Anna Smith'))
+    assert [record.name.value for record in book.fuzzy_search('Smiht')] == ['Anna Smith']
@@ -0,0 +1,186 @@
+import os
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from persistence import persister
+from record import AddressBook, Record
+
+QUERIES = ['ann', 'lee', 'an', 'ОЛЕ', 'олена', '050', '123', 'xyz', '4567']
+
+
+def make_records(n, seed=0):
+    rnd = random.Random(seed)
+    first = ['Ann', 'Bob', 'Олена', 'Ivan', 'Zoe', 'ann', 'Lee']
+    last = ['Lee', 'Brown', 'Шевченко', 'Smith', 'Anders']
+    for i in range(n):
+        # однакові імена, спільні телефони, 29 лютого
+        record = Record(f'{rnd.choice(first)} {rnd.choice(last)}' + (f' {i}' if i % 3 else ''))
+        for _ in range(rnd.randint(0, 2)):
+            record.add_phone(f'050{rnd.randint(0, 9999999):07d}' if i % 5 else '0501234567')
+        if i % 4:
+            record.add_birthday(f'{1980 + i % 30}.{1 + i % 12:02d}.{1 + i % 28:02d}' if i % 29 else '1992.02.29')
+        if i % 2:
+            record.add_email(f'User{i % 50}@Example.com')
+        yield record
+
+
+# (книга з індексами з файлу, та сама книга з індексами в пам'яті)
+def books(n=300):
+    book = AddressBook()
+    book.index_min_records = 0
+    for record in make_records(n):
+        book.add_record(record)
+    book.write_to_file()
+    book.compact(wait=True)
+    disk, memory = AddressBook(), AddressBook()
+    disk.read_from_file()
+    memory.read_from_file()
+    memory._rebuild_indexes()
+    assert disk._index_file is not None and memory._index_file is None
+    return disk, memory
+
+
+def state(book):
+    records = list(book.data.values())
+    result = {
+        'search': {query: sorted(record.id for record in book.search(query)) for query in QUERIES if len(query) >= 3},
+        'pages': [[record.id for record in page] for page in book.iter_pages(7)],
+        'offset': [[record.id for record in book.page(5, offset)[0]] for offset in (0, 3, 40, 290)],
+        'names': sorted(book.names()),
+        'birthdays': [[record.id for record in book.birthdays_on(date(2023, 1, 1) + timedelta(days=i))]
+                      for i in range(0, 365, 5)],
+    }
+    for record in records[::7]:
+        result.setdefault('find', []).append([item.id for item in book.find_all(record.name.value)])
+        for phone in record.phones:
+            result.setdefault('phone', []).append(book.find_by_phone(phone.value).id)
+        if record.email:
+            result.setdefault('email', []).append(book.find_by_email(record.email.value.upper()).id)
+    return result
+
+
+def edit(book):
+    data = book.data
+    data[5].rename('Aaron Aardvark')
+    data[6].add_phone('0991234567')
+    data[7].remove_phone(data[7].phones[0].value) if data[7].phones else None
+    data[8].add_email('new@example.com')
+    data[9].add_birthday('2000.02.29')
+    book.delete_record(data[10])
+    book.delete_record(data[11])
+    record = Record('Ann Lee')
+    record.add_phone('0501234567')
+    book.add_record(record)
+    data[12].rename('Zzz Last')
+
+
+def test_index_file_answers_like_memory_indexes():
+    disk, memory = books()
+    assert state(disk) == state(memory)
+
+
+def test_edits_apply_on_top_of_index_file():
+    disk, memory = books()
+    edit(disk)
+    edit(memory)
+    assert disk._index_file is not None
+    assert state(disk) == state(memory)
+
+
+# зміни з журналу після знімка лягають поверх файлу індексів, а не перебудовують усе
+def test_journal_after_snapshot_applies_on_top_of_index_file():
+    disk, memory = books()
+    edit(disk)
+    disk.write_to_file()
+    persister.flush()
+    reloaded = AddressBook()
+    reloaded.read_from_file()
+    assert reloaded._index_file is not None
+    edit(memory)
+    assert state(reloaded) == state(memory)
+
+
+@pytest.mark.parametrize('damage', ['other snapshot', 'truncated', 'empty'])
+def test_stale_or_damaged_index_file_is_ignored(damage):
+    disk, memory = books()
+    if damage == 'other snapshot':
+        # знімок змінився, а файл індексів лишився від попереднього
+        memory.index_min_records = 10 ** 9
+        edit(memory)
+        memory.write_to_file()
+        memory.compact(wait=True)
+    else:
+        with open('Phone_Book.idx', 'r+b') as file:
+            file.truncate(0 if damage == 'empty' else 10)
+    reloaded = AddressBook()
+    reloaded.read_from_file()
+    assert reloaded._index_file is None
+    assert state(reloaded) == state(memory)
+    disk._close_index_file()
+    assert os.path.exists('Phone_Book.idx')
+
+
+# те саме, що search, перебором усіх записів
+def scan(book, query):
+    lower = query.lower()
+    return sorted(record.id for record in book.data.values()
+                  if lower in record.name.value.lower() or any(query in phone.value for phone in record.phones))
+
+
+@pytest.mark.parametrize('edited', [False, True])
+def test_search_matches_substring_scan(edited):
+    for book in books():
+        if edited:
+            edit(book)
+        rnd = random.Random(1)
+        records = list(book.data.values())
+        queries = [query for query in QUERIES if len(query) >= 3] + ['aardvark', 'zzz l', ' le', '0991']
+        for record in rnd.sample(records, 40):
+            name = record.name.value
+            start = rnd.randrange(max(len(name) - 2, 1))
+            queries += [name[start:start + rnd.randint(3, 6)], name.upper(), name.lower()[-4:]]
+            if record.phones:
+                queries.append(record.phones[0].value[rnd.randrange(8):][:rnd.randint(3, 10)])
+        for query in queries:
+            found = [record.id for record in book.search(query)]
+            # кожен запис не більше одного разу
+            assert len(found) == len(set(found))
+            assert sorted(found) == scan(book, query), query
+
+
+# власник номера або email перебором: перший за іменем
+def owner(book, matches):
+    owners = [record for record in book.data.values() if matches(record)]
+    return min(owners, key=lambda record: (record.name.value.lower(), record.name.value, record.id)).id \
+        if owners else None
+
+
+def test_phone_and_email_owners_after_edits():
+    for book in books():
+        data = book.data
+        # і номери та адреси, яких після змін уже ні в кого немає
+        phones = {phone.value for record in data.values() for phone in record.phones}
+        emails = {record.email.value for record in data.values() if record.email}
+        edit(book)
+        for key in (20, 21):
+            if data[key].phones:
+                data[key].edit_phone(data[key].phones[0].value, '0671112233')
+        data[22].add_email('USER3@example.com')
+        data[23].rename('Aaa First')
+        data[24].remove_email()
+        data[26].add_phone('0501234567')
+        book.delete_record(data[25])
+        phones |= {phone.value for record in data.values() for phone in record.phones}
+        emails |= {record.email.value for record in data.values() if record.email}
+        for phone in phones:
+            found = book.find_by_phone(phone)
+            assert (found.id if found else None) == \
+                owner(book, lambda record: any(item.value == phone for item in record.phones)), phone
+        for email in emails:
+            expected = owner(book, lambda record: record.email is not None and
+                             record.email.value.lower() == email.lower())
+            for query in (email, email.upper(), email.lower()):
+                found = book.find_by_email(query)
+                assert (found.id if found else None) == expected, query
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SESSION = '''
+import instrumentation
+import record
+instrumentation.install()
+book = record.get_phone_book()
+book.read_from_file()
+book.refresh()
+book.refresh()
+'''
+
+
+def test_summary_reports_book_cache_counters(tmp_path):
+    env = dict(os.environ, ASSISTANT_PROFILE='profile.json', PYTHONPATH=ROOT)
+    env.pop('ASSISTANT_STORAGE', None)
+    subprocess.run([sys.executable, '-c', SESSION], cwd=tmp_path, env=env, check=True)
+    with open(tmp_path / 'profile.json') as file:
+        counters = json.load(file)['counters']
+    assert counters == {'book.cache_hits': 2, 'book.cache_misses': 0}
+
+
+# час генератора - це час його перебору, без часу того, хто перебирає
+def test_generators_are_timed_while_consumed():
+    import time
+
+    import instrumentation
+
+    def slow():
+        for item in range(3):
+            time.sleep(0.02)
+            yield item
+
+    wrapped = instrumentation.timed('test.generator', slow)
+    for item in wrapped():
+        time.sleep(0.05)
+    for item in wrapped():
+        break
+    stats = instrumentation.summary()['timers']['test.generator']
+    instrumentation._timers.pop('test.generator')
+    assert stats['calls'] == 2
+    assert 75 <= stats['busy_ms'] < 140
+    assert stats['busy_ms'] == stats['total_ms']
@@ -0,0 +1,30 @@
+from persistence import persister
+from migrate_to_sqlite import migrate
+from record import AddressBook, Notebook, Record
+from sqlite_storage import SQLiteAddressBook, SQLiteNotebook
+
+
+def save_files():
+    book = AddressBook()
+    record = Record('Ann Lee')
+    record.add_phone('0501234567')
+    book.add_record(record)
+    book.write_to_file()
+    notebook = Notebook()
+    notebook.add_note('first', ['a'])
+    notebook.add_note('second', ['b'])
+    notebook.delete_note(1)
+    notebook.write_to_file()
+    persister.flush()
+
+
+def test_migration_keeps_ids_and_can_be_repeated():
+    save_files()
+    assert migrate('Phone_Book.bin', 'Save_Notes.bin', 'test.db') == (1, 1)
+    assert migrate('Phone_Book.bin', 'Save_Notes.bin', 'test.db') == (1, 1)
+    notes = SQLiteNotebook('test.db')
+    assert [(note.id, note.content, note.tags) for note in notes] == [(2, 'second', ['b'])]
+    book = SQLiteAddressBook('test.db')
+    assert [(record.id, record.name.value) for record in book._records()] == [(1, 'Ann Lee')]
+    notes.close()
+    book.close()
@@ -0,0 +1,30 @@
+from persistence import persister
+from record import Notebook
+
+
+def saved_notebook():
+    notebook = Notebook()
+    notebook.add_note('buy milk', ['shop'])
+    notebook.write_to_file()
+    persister.flush()
+    return notebook
+
+
+def test_unchanged_file_is_not_reloaded():
+    notebook = saved_notebook()
+    notebook.search_text('milk')
+    notes, text = notebook.notes, notebook._text
+    assert notebook.read_from_file() is notes
+    assert notebook._text is text
+
+
+def test_file_changed_elsewhere_is_reloaded():
+    notebook = saved_notebook()
+    other = Notebook()
+    other.read_from_file()
+    other.add_note('call mom', ['family'])
+    other.write_to_file()
+    persister.flush()
+    notebook.read_from_file()
+    assert [note.content for note in notebook.search_notes_by_tag('family')] == ['call mom']
+    assert [note.content for note in notebook.search_text('mom')] == ['call mom']
@@ -0,0 +1,246 @@
+from datetime import date
+
+import pytest
+
+from persistence import persister
+from record import AddressBook, Record
+
+
+def contact(record):
+    return (record.id, record.name.value, [phone.value for phone in record.phones],
+            str(record.birthday) if record.birthday else None,
+            record.email.value if record.email else None,
+            record.address.value if record.address else None)
+
+
+def saved_book():
+    book = AddressBook()
+    record = Record('Ann Lee')
+    record.add_phone('0501234567')
+    book.add_record(record)
+    book.write_to_file()
+    persister.flush()
+    return book, record
+
+
+def reloaded():
+    book = AddressBook()
+    book.read_from_file()
+    return book
+
+
+@pytest.mark.parametrize('edit', [
+    lambda record: record.add_phone('0661112233'),
+    lambda record: record.edit_phone('0501234567', '0979998877'),
+    lambda record: record.remove_phone('0501234567'),
+    lambda record: record.rename('Ann Smith'),
+    lambda record: record.add_email('ann@example.com'),
+    lambda record: record.add_address('Kyiv'),
+    lambda record: record.add_birthday('1990.02.28'),
+])
+def test_edits_of_existing_record_are_saved(edit):
+    book, record = saved_book()
+    edit(record)
+    book.write_to_file()
+    persister.flush()
+    assert [contact(item) for item in reloaded().data.values()] == [contact(record)]
+
+
+def test_rename_is_found_by_new_name_after_reload():
+    book, record = saved_book()
+    record.rename('Ann Smith')
+    book.write_to_file()
+    persister.flush()
+    book = reloaded()
+    assert book.find('Ann Lee') is None
+    assert book.find('Ann Smith').id == record.id
+
+
+def test_failed_transaction_leaves_book_unchanged():
+    book, record = saved_book()
+    before = [contact(item) for item in book.data.values()]
+    with pytest.raises(RuntimeError):
+        with book.transaction():
+            extra = Record('Bob Brown')
+            extra.add_phone('0671234567')
+            book.add_record(extra)
+            record.add_phone('0661112233')
+            book.delete('Ann Lee')
+            raise RuntimeError('abort')
+    book.write_to_file()
+    persister.flush()
+    assert [contact(item) for item in book.data.values()] == before
+    assert book.find('Bob Brown') is None
+    assert [contact(item) for item in reloaded().data.values()] == before
+
+
+def test_nested_transactions_commit_once():
+    book, record = saved_book()
+    with book.transaction():
+        with book.transaction():
+            record.add_phone('0661112233')
+        assert book._pending
+    persister.flush()
+    assert [contact(item) for item in reloaded().data.values()] == [contact(record)]
+
+
+def test_failed_transaction_restores_records_edited_in_place():
+    book, record = saved_book()
+    before = contact(record)
+    with pytest.raises(RuntimeError):
+        with book.transaction():
+            record.rename('Ann Smith')
+            record.edit_phone('0501234567', '0979998877')
+            record.add_email('ann@example.com')
+            raise RuntimeError('abort')
+    assert contact(record) == before
+    assert book.find('Ann Lee') is record
+    assert book.find('Ann Smith') is None
+    assert book.find_by_phone('0501234567') is record
+
+
+# стискання, запущене записом на початку транзакції, не може потрапити на її зміни
+def test_rollback_is_not_undone_by_compaction():
+    book, record = saved_book()
+    book.compact_min_bytes = 0
+    record.add_phone('0661112233')
+    with pytest.raises(RuntimeError):
+        with book.transaction():
+            book.add_record(Record('Ghost'))
+            persister.flush()
+            raise RuntimeError('abort')
+    persister.flush()
+    assert book.find('Ghost') is None
+    assert reloaded().find('Ghost') is None
+    assert [contact(item) for item in reloaded().data.values()] == [contact(record)]
+
+
+def add_names(book, *names):
+    records = [Record(name) for name in names]
+    for record in records:
+        book.add_record(record)
+    return records
+
+
+# номер видаленого запису не дістається новому ні після перечитування, ні після стискання
+@pytest.mark.parametrize('compact', [False, True])
+def test_ids_of_deleted_records_are_not_reused(compact):
+    book = AddressBook()
+    add_names(book, 'A', 'B', 'C')
+    book.delete('C')
+    book.write_to_file()
+    if compact:
+        book.compact(wait=True)
+    persister.flush()
+    book = reloaded()
+    [record] = add_names(book, 'D')
+    assert record.id == 4
+
+
+def test_sqlite_ids_of_deleted_records_are_not_reused():
+    from sqlite_storage import SQLiteAddressBook
+
+    book = SQLiteAddressBook('test.db')
+    add_names(book, 'A', 'B', 'C')
+    book.delete('C')
+    book.close()
+    book = SQLiteAddressBook('test.db')
+    [record] = add_names(book, 'D')
+    assert record.id == 4
+    book.close()
+
+
+# дві книги над тими самими файлами, як сервер і меню в різних процесах
+def test_new_id_is_not_taken_from_a_stale_book():
+    server, menu = reloaded(), reloaded()
+    [x] = add_names(menu, 'X')
+    menu.write_to_file()
+    persister.flush()
+    [y] = add_names(server, 'Y')
+    server.write_to_file()
+    persister.flush()
+    assert x.id != y.id
+    assert sorted(record.name.value for record in reloaded().data.values()) == ['X', 'Y']
+
+
+def test_compaction_keeps_journal_entries_written_by_another_book():
+    stale, other = reloaded(), reloaded()
+    add_names(other, 'X')
+    other.write_to_file()
+    persister.flush()
+    stale.compact(wait=True)
+    assert reloaded().find('X') is not None
+
+
+def birthday_book(kind, monkeypatch):
+    import birthday_columns
+    from sqlite_storage import SQLiteAddressBook
+
+    if kind == 'fallback':
+        monkeypatch.setattr(birthday_columns, 'np', None)
+    book = SQLiteAddressBook('test.db') if kind == 'sqlite' else AddressBook()
+    for name, birthday in [('A', '2000.02.29'), ('B', '1990.02.27'), ('C', '1985.03.01'), ('D', '1970.12.31')]:
+        record = Record(name)
+        record.add_birthday(birthday)
+        book.add_record(record)
+    return book
+
+
+# у вікні від року день народження трапляється двічі - кожен запис має бути один раз,
+# з найближчим днем, однаково в numpy, без нього і в SQLite
+@pytest.mark.parametrize('kind', ['numpy', 'fallback', 'sqlite'])
+@pytest.mark.parametrize('today, days, expected', [
+    (date(2023, 2, 27), 365, [('A', 1), ('B', 0), ('C', 2), ('D', 307)]),
+    (date(2023, 3, 1), 400, [('A', 365), ('B', 363), ('C', 0), ('D', 305)]),
+    (date(2024, 2, 28), 366, [('A', 1), ('B', 365), ('C', 2), ('D', 307)]),
+    (date(2023, 2, 27), 1, [('A', 1), ('B', 0)]),
+])
+def test_upcoming_birthdays_lists_each_record_once(kind, today, days, expected, monkeypatch):
+    if kind == 'numpy':
+        pytest.importorskip('numpy')
+    book = birthday_book(kind, monkeypatch)
+    found = sorted((record.name.value, left) for record, left in book.upcoming_birthdays(today, days))
+    assert found == expected
+    if kind == 'sqlite':
+        book.close()
+
+
+@pytest.fixture
+def today(monkeypatch):
+    import record
+
+    current = [date(2023, 3, 14)]
+    monkeypatch.setattr(record, 'clock', lambda: current[0])
+    return current
+
+
+def test_days_to_birthday_follow_the_clock(today):
+    record = Record('Ann Lee')
+    record.add_birthday('1990.03.15')
+    assert record.days_to_birthday() == 1
+    # наступний день: закешований на вчора результат не годиться
+    today[0] = date(2023, 3, 15)
+    assert record.days_to_birthday() == 'Birthday today'
+    assert str(record).endswith(', Birthday today')
+    today[0] = date(2023, 3, 16)
+    assert record.days_to_birthday() == 365
+    record.add_birthday('1990.03.20')
+    assert record.days_to_birthday() == 4
+    record.remove_birthday()
+    assert record.days_to_birthday() is None
+
+
+# 29 лютого в невисокосний рік святкується 28-го
+@pytest.mark.parametrize('day, expected', [
+    (date(2023, 2, 27), 1),
+    (date(2023, 2, 28), 'Birthday today'),
+    (date(2023, 3, 1), 365),
+    (date(2024, 2, 28), 1),
+    (date(2024, 2, 29), 'Birthday today'),
+    (date(2024, 3, 1), 364),
+])
+def test_february_29_birthday(today, day, expected):
+    record = Record('Ann Lee')
+    record.add_birthday('2000.02.29')
+    today[0] = day
+    assert record.days_to_birthday() == expected
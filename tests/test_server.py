@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from record import AddressBook, Notebook, Record
+from server import AssistantServer, HTTPError
+
+
+def request(server, method, target):
+    return asyncio.run(server.dispatch(method, target, b''))
+
+
+@pytest.fixture
+def server():
+    book = AddressBook()
+    for phone in ('0501234567', '0671234567'):
+        record = Record('Ann Lee')
+        record.add_phone(phone)
+        book.add_record(record)
+    server = AssistantServer(book, Notebook(), workers=1)
+    yield server
+    server.executor.shutdown()
+
+
+def test_ambiguous_name_lists_candidates(server):
+    with pytest.raises(HTTPError) as error:
+        request(server, 'GET', '/contacts/Ann%20Lee')
+    assert error.value.status == 409
+    assert [candidate['id'] for candidate in error.value.details['candidates']] == [1, 2]
+
+
+def test_contact_is_found_and_deleted_by_id(server):
+    assert request(server, 'GET', '/contacts/id/2')['phones'] == ['0671234567']
+    request(server, 'DELETE', '/contacts/id/1')
+    assert request(server, 'GET', '/contacts/Ann%20Lee')['id'] == 2
+    with pytest.raises(HTTPError) as error:
+        request(server, 'GET', '/contacts/id/1')
+    assert error.value.status == 404
+
+
+def test_mutations_see_contacts_added_by_another_process(server):
+    from persistence import persister
+
+    server.book.write_to_file()
+    persister.flush()
+    other = AddressBook()
+    other.read_from_file()
+    other.add_record(Record('Bob Brown'))
+    other.write_to_file()
+    persister.flush()
+    created = asyncio.run(server.dispatch('POST', '/contacts', b'{"name": "Cid Moss"}'))
+    assert created['id'] == 4
+    assert request(server, 'GET', '/contacts/Bob%20Brown')['id'] == 3
@@ -0,0 +1,149 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from record import AddressBook, Notebook, Record
+from sqlite_storage import SQLiteAddressBook, SQLiteNotebook
+
+QUERIES = ['ann', 'lee', 'ОЛЕ', 'олена', '050', '123', 'xyz', '4567', '100%', 'a_b']
+
+
+def make_records(n):
+    rnd = random.Random(0)
+    first = ['Ann', 'Bob', 'Олена', 'Ivan', 'Zoe', 'ann', 'a_b']
+    last = ['Lee', 'Brown', 'Шевченко', 'Smith', '100%']
+    for i in range(n):
+        # однакові імена, спільні телефони, 29 лютого
+        record = Record(f'{rnd.choice(first)} {rnd.choice(last)}' + (f' {i}' if i % 3 else ''))
+        for _ in range(rnd.randint(0, 2)):
+            record.add_phone(f'050{rnd.randint(0, 9999999):07d}' if i % 5 else '0501234567')
+        if i % 4:
+            record.add_birthday(f'{1980 + i % 30}.{1 + i % 12:02d}.{1 + i % 28:02d}' if i % 29 else '1992.02.29')
+        if i % 2:
+            record.add_email(f'User{i % 50}@Example.com')
+        yield record
+
+
+# (книга в пам'яті, та сама книга в SQLite)
+@pytest.fixture
+def books():
+    memory, database = AddressBook(), SQLiteAddressBook('test.db')
+    for book in (memory, database):
+        with book.transaction():
+            for record in make_records(200):
+                book.add_record(record)
+    yield memory, database
+    database.close()
+
+
+def ids(records):
+    return [record.id for record in records]
+
+
+def contacts(book):
+    return [(record.id, str(record)) for page in book.iter_pages(50) for record in page]
+
+
+def state(book):
+    result = {
+        'contacts': contacts(book),
+        'search': {query: sorted(ids(book.search(query))) for query in QUERIES},
+        'fuzzy': {query: ids(book.fuzzy_search(query))
+                  for query in ['An Le', 'olena shevh', 'Smiht', 'zoe', 'Aardvark']},
+        'pages': [ids(page) for page in book.iter_pages(7)],
+        'offset': [ids(book.page(5, offset)[0]) for offset in (0, 3, 40, 199, 250)],
+        'names': sorted(book.names()),
+        'birthdays': [ids(book.birthdays_on(date(2023, 1, 1) + timedelta(days=i))) for i in range(365)],
+        'upcoming': {today: sorted((record.id, days) for record, days in book.upcoming_birthdays(today, 365))
+                     for today in (date(2023, 2, 27), date(2024, 2, 28), date(2024, 12, 31))},
+    }
+    for name in ['Ann Lee', 'ann Smith', 'Нема']:
+        result[name] = (getattr(book.find(name), 'id', None), ids(book.find_all(name)))
+    for phone in ['0501234567', '0500000000']:
+        result[phone] = getattr(book.find_by_phone(phone), 'id', None)
+    for email in ['user1@example.com', 'USER3@EXAMPLE.COM', 'nobody@example.com']:
+        result[email] = getattr(book.find_by_email(email), 'id', None)
+    return result
+
+
+def records_of(book):
+    return book.get if isinstance(book, SQLiteAddressBook) else book.data.get
+
+
+def change(book):
+    get = records_of(book)
+    get(5).rename('Aaron Aardvark')
+    get(6).add_phone('0991234567')
+    get(8).add_email('new@example.com')
+    get(9).add_birthday('2000.02.29')
+    get(12).edit_phone(get(12).phones[0].value, '0671112233')
+    book.delete_record(get(10))
+    record = Record('Ann Lee')
+    record.add_phone('0501234567')
+    book.add_record(record)
+
+
+def test_sqlite_answers_like_memory_book(books):
+    memory, database = books
+    assert state(database) == state(memory)
+
+
+def test_sqlite_edits_answer_like_memory_book(books):
+    memory, database = books
+    change(memory)
+    change(database)
+    assert state(database) == state(memory)
+
+
+# виняток у транзакції скасовує всі її зміни, і в пам'яті, і в базі
+def test_sqlite_transaction_rolls_back_like_memory_book(books):
+    memory, database = books
+    # індекси в пам'яті вже побудовані до транзакції
+    before = state(memory)
+    assert state(database) == before
+    for book in books:
+        with pytest.raises(RuntimeError):
+            with book.transaction():
+                change(book)
+                raise RuntimeError
+    assert state(memory) == before
+    assert state(database) == before
+    # номер скасованого запису видається знову, як і в пам'яті
+    for book in books:
+        book.add_record(Record('After Rollback'))
+    assert state(database) == state(memory)
+
+
+def notes_state(notebook):
+    return {
+        'notes': [(note.id, note.content, note.tags) for note in notebook],
+        'tags': {tag: ids(notebook.search_notes_by_tag(tag)) for tag in ['дім', 'робота', 'a', 'нема']},
+        'sorted': [note.id for note in notebook.search_and_sort_notes('дім')],
+        'text': {query: ids(notebook.search_text(query)) for query in ['хліб', 'зустріч', 'call*', '"call ann"']},
+    }
+
+
+def test_sqlite_notes_answer_like_notebook():
+    memory, database = Notebook(), SQLiteNotebook('test.db')
+    for notebook in (memory, database):
+        notebook.add_note('Купити хліб', ['дім', 'покупки'])
+        notebook.add_note('Зустріч о 10:00', ['робота'])
+        notebook.add_note('call Ann', ['дім', 'a'])
+        notebook.add_note('без тегів')
+        notebook.add_note('зустріч з Ann', ['робота', 'дім'])
+    assert notes_state(database) == notes_state(memory)
+    for notebook in (memory, database):
+        notebook.edit_note(2, tags=['дім'])
+        notebook.edit_note(4, 'call Bob')
+        notebook.delete_note(3)
+        assert notebook.edit_note_content('робота', 'Зустріч перенесено') == 1
+        assert notebook.delete_notes_by_tag('покупки') == 1
+    assert notes_state(database) == notes_state(memory)
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.add_note('скасовано', ['дім'])
+            database.delete_note(2)
+            raise RuntimeError
+    assert notes_state(database) == notes_state(memory)
+    database.close()